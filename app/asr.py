@@ -0,0 +1,376 @@
+import os
+import time
+import platform
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from tuning import get_budget, load_tuning, save_tuning
+from audio_channel import as_float32
+
+SAMPLE_RATE = 16000
+
+# Stage profiles: candidates are ordered most-accurate first. The selector
+# walks the list and keeps the first engine whose measured latency on a
+# typical clip for that stage fits the target.
+STAGE_PROFILES = {
+    # The wake check only has to spot a handful of words, so it gets its own
+    # small CPU-only model. It never shares the query model's GPU/MLX stream
+    # or CTranslate2 thread pool.
+    "wake": {
+        "clip_seconds": 2.0,
+        "latency_target": 0.25,
+        "candidates": ["fw-base.en-wake", "fw-tiny.en-wake"],
+        "options": {"max_new_tokens": 8},
+    },
+    "query": {
+        "clip_seconds": 6.0,
+        "latency_target": 2.0,
+        "candidates": ["mlx-large-v3-turbo", "fw-distil-large-v3-cuda",
+                       "fw-distil-medium.en-int8", "fw-base.en-int8"],
+    },
+}
+
+
+def synthetic_clip(seconds: float) -> np.ndarray:
+    """Deterministic voice-band test signal for RTF probes (no mic needed)."""
+    t = np.arange(int(SAMPLE_RATE * seconds), dtype=np.float32) / SAMPLE_RATE
+    rng = np.random.default_rng(0)
+    clip = 0.1 * np.sin(2 * np.pi * 220 * t) + 0.01 * rng.standard_normal(t.shape)
+    return clip.astype(np.float32)
+
+
+def cuda_available() -> bool:
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count() > 0
+    except Exception:
+        return False
+
+
+# --- ENGINES ---
+
+class ASREngine(ABC):
+    """
+    Common interface for speech-to-text backends. Models load lazily on the
+    first transcribe() call; transcribe() always returns plain text.
+    """
+    name = "base"
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                start = time.perf_counter()
+                self._model = self._load()
+                print(f"[ASR] Loaded {self.name} in {time.perf_counter() - start:.1f}s")
+
+    def unload(self):
+        with self._lock:
+            self._model = None
+
+    def preload(self) -> threading.Thread:
+        """Loads the model on a background thread (e.g. while the user is still talking)."""
+        t = threading.Thread(target=self.load, daemon=True)
+        t.start()
+        return t
+
+    @abstractmethod
+    def _load(self):
+        """Builds and returns the backend's model object."""
+
+    @abstractmethod
+    def transcribe(self, audio, beam_size=1, language="en", vad_filter=False, initial_prompt=None,
+                   hotwords=None, max_new_tokens=None) -> str:
+        """
+        hotwords biases decoding towards the given words; max_new_tokens caps
+        the decode length. Backends that cannot honour them ignore them.
+        """
+
+
+class FasterWhisperEngine(ASREngine):
+    # stage is the ThreadBudget entry ("asr_wake" / "asr_query") whose CPU
+    # threads the model gets; there is no default, so every registration
+    # states which budget it draws from
+    def __init__(self, size, *, stage, device="cpu", compute_type="int8", name=None):
+        super().__init__()
+        self.size = size
+        self.device = device
+        self.compute_type = compute_type
+        self.stage = stage
+        self.name = name or (f"fw-{size}-{compute_type}" if device == "cpu" else f"fw-{size}-{device}")
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import faster_whisper  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _load(self):
+        from faster_whisper import WhisperModel
+        kwargs = {}
+        if self.device == "cpu":
+            kwargs["cpu_threads"] = get_budget().threads_for(self.stage)
+        return WhisperModel(self.size, device=self.device, compute_type=self.compute_type, **kwargs)
+
+    def transcribe(self, audio, beam_size=1, language="en", vad_filter=False, initial_prompt=None,
+                   hotwords=None, max_new_tokens=None) -> str:
+        self.load()
+        audio = as_float32(audio)
+        options = {}
+        if max_new_tokens:
+            # Short constrained decode: one pass, no temperature fallback
+            # retries, no timestamp tokens.
+            options.update(max_new_tokens=max_new_tokens, temperature=0.0, without_timestamps=True)
+        segments, _ = self._model.transcribe(
+            audio,
+            beam_size=beam_size,
+            language=language,
+            condition_on_previous_text=False,
+            vad_filter=vad_filter,
+            vad_parameters=dict(min_silence_duration_ms=500) if vad_filter else None,
+            initial_prompt=initial_prompt,
+            hotwords=hotwords,
+            **options
+        )
+        return " ".join(s.text for s in segments).strip()
+
+
+class CudaWhisperEngine(FasterWhisperEngine):
+    @classmethod
+    def available(cls) -> bool:
+        return FasterWhisperEngine.available() and cuda_available()
+
+
+class MLXEngine(ASREngine):
+    def __init__(self, repo="mlx-community/whisper-large-v3-turbo"):
+        super().__init__()
+        self.repo = repo
+        self.name = "mlx-" + repo.split("whisper-")[-1]
+
+    @classmethod
+    def available(cls) -> bool:
+        if platform.system() != "Darwin":
+            return False
+        try:
+            import mlx_whisper  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _load(self):
+        import mlx_whisper
+        # mlx_whisper loads weights on first call; warm it up here so the
+        # first real utterance does not pay for it.
+        try:
+            mlx_whisper.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), path_or_hf_repo=self.repo)
+        except Exception:
+            pass
+        return mlx_whisper
+
+    def transcribe(self, audio, beam_size=1, language="en", vad_filter=False, initial_prompt=None,
+                   hotwords=None, max_new_tokens=None) -> str:
+        self.load()
+        audio = as_float32(audio)
+        # MLX uses different params than Faster-Whisper, we map the critical ones
+        result = self._model.transcribe(
+            audio,
+            path_or_hf_repo=self.repo,
+            language=language,
+            initial_prompt=initial_prompt,
+            verbose=False
+        )
+        return result.get("text", "").strip()
+
+
+class StubEngine(ASREngine):
+    """Scripted engine for tests and benchmarks: returns queued replies, then ''."""
+    name = "stub"
+
+    def __init__(self, replies=None, rtf=0.0):
+        super().__init__()
+        self.replies = list(replies or [])
+        self.rtf = rtf
+        self.calls = 0
+
+    def _load(self):
+        return True
+
+    def transcribe(self, audio, beam_size=1, language="en", vad_filter=False, initial_prompt=None,
+                   hotwords=None, max_new_tokens=None) -> str:
+        self.load()
+        self.calls += 1
+        if self.rtf:
+            time.sleep(len(audio) / SAMPLE_RATE * self.rtf)
+        return self.replies.pop(0) if self.replies else ""
+
+
+# --- REGISTRY ---
+
+_REGISTRY = {}
+_instances = {}   # name -> [engine, refcount]
+_measured = {}    # name -> engine select_engine() kept loaded for the next acquire()
+_registry_lock = threading.Lock()
+
+
+def register(name, cls, /, **kwargs):
+    _REGISTRY[name] = (cls, kwargs)
+
+
+register("fw-tiny.en-wake", FasterWhisperEngine, size="tiny.en", stage="asr_wake", name="fw-tiny.en-wake")
+register("fw-base.en-wake", FasterWhisperEngine, size="base.en", stage="asr_wake", name="fw-base.en-wake")
+register("fw-tiny.en-int8", FasterWhisperEngine, size="tiny.en", stage="asr_query")
+register("fw-base.en-int8", FasterWhisperEngine, size="base.en", stage="asr_query")
+register("fw-small.en-int8", FasterWhisperEngine, size="small.en", stage="asr_query")
+register("fw-distil-medium.en-int8", FasterWhisperEngine, size="distil-medium.en", stage="asr_query")
+register("fw-distil-large-v3-cuda", CudaWhisperEngine, size="distil-large-v3", stage="asr_query",
+         device="cuda", compute_type="float16")
+register("mlx-large-v3-turbo", MLXEngine, repo="mlx-community/whisper-large-v3-turbo")
+register("stub", StubEngine)
+
+
+def registered() -> list:
+    return list(_REGISTRY)
+
+
+def is_available(name: str) -> bool:
+    if name not in _REGISTRY:
+        return False
+    cls, _ = _REGISTRY[name]
+    return cls.available()
+
+
+def acquire(name: str) -> ASREngine:
+    """
+    Returns the shared instance for `name`, creating it (but not loading the
+    model) on first use. Every acquire() must be paired with release().
+    """
+    with _registry_lock:
+        if name in _measured:
+            # Take over the reference measure_rtf() kept, model already loaded
+            return _measured.pop(name)
+        if name in _instances:
+            _instances[name][1] += 1
+            return _instances[name][0]
+        if name not in _REGISTRY:
+            raise KeyError(f"Unknown ASR engine: {name}")
+        cls, kwargs = _REGISTRY[name]
+        engine = cls(**kwargs)
+        _instances[name] = [engine, 1]
+        return engine
+
+
+def release(engine: ASREngine):
+    """Drops one reference; the model is unloaded when nobody holds it."""
+    with _registry_lock:
+        for name, entry in list(_instances.items()):
+            if entry[0] is engine:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    engine.unload()
+                    del _instances[name]
+                return
+
+
+def refcount(name: str) -> int:
+    entry = _instances.get(name)
+    return entry[1] if entry else 0
+
+
+# --- SELECTION ---
+
+def measure_rtf(name: str, seconds: float = 4.0, keep: bool = False, **options) -> float:
+    """
+    Real-time factor of `name` on this host (processing time / audio time).
+    keep=True leaves the engine loaded for the next acquire(name) instead of
+    unloading a model that is about to be loaded again.
+    """
+    engine = acquire(name)
+    kept = False
+    try:
+        engine.load()
+        clip = synthetic_clip(seconds)
+        engine.transcribe(clip[:SAMPLE_RATE], **options)   # warm-up pass, not timed
+        start = time.perf_counter()
+        engine.transcribe(clip, **options)
+        rtf = (time.perf_counter() - start) / seconds
+        if keep:
+            with _registry_lock:
+                kept = name not in _measured
+                if kept:
+                    _measured[name] = engine
+        return rtf
+    finally:
+        if not kept:
+            release(engine)
+
+
+def _drop_measured(names):
+    """Releases engines measure_rtf(keep=True) held that nobody is going to acquire."""
+    with _registry_lock:
+        dropped = [_measured.pop(name) for name in names if name in _measured]
+    for engine in dropped:
+        release(engine)
+
+
+def cached_rtf(name: str, force: bool = False, keep: bool = False, **options) -> float:
+    tuning = load_tuning()
+    table = tuning.setdefault("asr_rtf", {})
+    if force or name not in table:
+        print(f"[ASR] Measuring real-time factor for {name}...")
+        table[name] = measure_rtf(name, keep=keep, **options)
+        save_tuning(tuning)
+    return table[name]
+
+
+def select_engine(stage: str, latency_target: float = None) -> str:
+    """
+    Picks the engine for a pipeline stage. BEARNARD_ASR_<STAGE> forces a
+    specific engine; otherwise the first available candidate whose measured
+    RTF keeps a typical clip under the latency target wins, falling back to
+    the fastest one measured. A winner measured just now stays loaded for
+    the caller's acquire(); the losers are unloaded.
+    """
+    override = os.environ.get(f"BEARNARD_ASR_{stage.upper()}")
+    if override:
+        return override
+
+    profile = STAGE_PROFILES[stage]
+    target = latency_target if latency_target is not None else profile["latency_target"]
+    measured = []
+
+    for name in profile["candidates"]:
+        if not is_available(name):
+            continue
+        try:
+            rtf = cached_rtf(name, keep=True, **profile.get("options", {}))
+        except Exception as e:
+            print(f"[ASR] {name} unusable: {e}")
+            continue
+        latency = rtf * profile["clip_seconds"]
+        measured.append((latency, name))
+        if latency <= target:
+            print(f"[ASR] {stage}: {name} (~{latency:.2f}s per {profile['clip_seconds']:.0f}s clip, target {target:.2f}s)")
+            _drop_measured(n for _, n in measured if n != name)
+            return name
+
+    if not measured:
+        raise RuntimeError(f"No ASR engine available for stage '{stage}'")
+    latency, name = min(measured)
+    print(f"[ASR] {stage}: nothing meets {target:.2f}s, using fastest {name} (~{latency:.2f}s)")
+    _drop_measured(n for _, n in measured if n != name)
+    return name
@@ -0,0 +1,194 @@
+import queue
+import threading
+import collections
+
+import numpy as np
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+_channels = []
+
+
+class AudioChannel:
+    """
+    Bounded hand-off between a sounddevice callback (producer) and a worker
+    thread (consumer). put() never blocks the audio thread; when the channel
+    is full the drop policy decides what is lost:
+
+      drop_oldest - discard the oldest block (keep the most recent audio)
+      drop_newest - discard the incoming block (keep a contiguous start)
+
+    Every drop is counted, as are PortAudio input overflows reported through
+    the callback `status`, so silent audio loss shows up in the logs.
+    """
+
+    def __init__(self, name: str, maxsize: int, policy: str = DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+        self.produced = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.overflows = 0
+        _channels.append(self)
+
+    def put(self, block, status=None):
+        """Producer side, safe to call from the audio callback."""
+        if status is not None and getattr(status, "input_overflow", False):
+            self.overflows += 1
+        with self._cond:
+            self.produced += 1
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return
+                self._items.popleft()
+            self._items.append(block)
+            if len(self._items) > self.max_depth:
+                self.max_depth = len(self._items)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Consumer side. Raises queue.Empty on timeout (timeout=0: don't wait)."""
+        with self._cond:
+            if not self._items:
+                if timeout == 0 or not self._cond.wait_for(lambda: self._items, timeout):
+                    raise queue.Empty
+            self.consumed += 1
+            return self._items.popleft()
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        return {
+            "produced": self.produced,
+            "consumed": self.consumed,
+            "dropped": self.dropped,
+            "max_depth": self.max_depth,
+            "overflows": self.overflows,
+            "depth": len(self._items),
+        }
+
+    def describe(self) -> str:
+        st = self.stats()
+        return (f"{self.name}: produced={st['produced']} consumed={st['consumed']} "
+                f"dropped={st['dropped']} overflows={st['overflows']} "
+                f"depth={st['depth']}/{self.maxsize} (max {st['max_depth']})")
+
+
+def all_channels() -> list:
+    return list(_channels)
+
+
+def loss_counters() -> dict:
+    """{channel name: dropped + overflows}, used to spot new audio loss."""
+    return {ch.name: ch.dropped + ch.overflows for ch in _channels}
+
+
+class LevelMeter:
+    """
+    Mic level for the GUI. Audio callbacks push their per-block RMS with
+    update() (no Python wakeups, no Qt signals); the GUI polls read() at
+    display rate. read() returns the held peak and lets it fall off, so the
+    bar stays smooth between 100-200 ms blocks and drops to 0 once the mic
+    is quiet or closed.
+    """
+
+    def __init__(self, decay: float = 0.8):
+        self.decay = decay
+        self._peak = 0.0
+
+    def update(self, rms: float):
+        if rms > self._peak:
+            self._peak = rms
+
+    def read(self) -> float:
+        peak = self._peak
+        self._peak = peak * self.decay
+        return peak
+
+
+# One shared meter: whichever stream currently owns the mic feeds it.
+mic_meter = LevelMeter()
+
+
+class PCMBuffer:
+    """
+    Growable float32 recording buffer. Blocks are written in place (no
+    per-block copies, no list + concatenate); view() hands out a slice of the
+    same memory. The storage is reused across recordings, so a view is only
+    valid until the next reset().
+    """
+
+    def __init__(self, initial_samples: int, max_samples: int = None):
+        self._data = np.zeros(initial_samples, dtype=np.float32)
+        self.max_samples = max_samples
+        self.length = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    def reset(self):
+        self.length = 0
+
+    def append(self, block) -> int:
+        """Copies `block` in; returns how many samples fit (less only at max_samples)."""
+        n = len(block)
+        needed = self.length + n
+        if needed > len(self._data):
+            new_cap = max(needed, 2 * len(self._data))
+            if self.max_samples:
+                new_cap = min(new_cap, self.max_samples)
+            if new_cap > len(self._data):
+                grown = np.zeros(new_cap, dtype=np.float32)
+                grown[:self.length] = self._data[:self.length]
+                self._data = grown
+            n = min(n, len(self._data) - self.length)
+        self._data[self.length:self.length + n] = block[:n]
+        self.length += n
+        return n
+
+    def view(self) -> np.ndarray:
+        return self._data[:self.length]
+
+
+def as_float32(audio) -> np.ndarray:
+    """
+    ndarray / memoryview / bytes of float32 samples -> 1-D float32 ndarray,
+    without copying when the input already is float32. The result is
+    read-only when the input is (bytes, read-only memoryview).
+    """
+    if isinstance(audio, (memoryview, bytes, bytearray)):
+        return np.frombuffer(audio, dtype=np.float32)
+    return np.asarray(audio, dtype=np.float32).reshape(-1)
+
+
+def normalize_peak_inplace(audio: np.ndarray) -> np.ndarray:
+    """
+    Scales audio to peak 1.0 (no abs() temporary). Writable arrays are
+    scaled in place and returned; read-only ones get a scaled copy.
+    """
+    if len(audio) == 0:
+        return audio
+    peak = max(float(audio.max()), -float(audio.min()))
+    if peak > 0:
+        if not audio.flags.writeable:
+            return audio * np.float32(1.0 / peak)
+        audio *= 1.0 / peak
+    return audio
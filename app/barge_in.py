@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+import sounddevice as sd
+
+
+class BargeInDetector:
+    """
+    Listens on the live mic while Bearnard is talking and fires when the user
+    talks over him.
+
+    ECHO GATE: the mic also hears our own speaker. For the first moments of
+    playback we only learn how loud that echo is, then require the user to be
+    clearly louder than it (echo_margin x) for min_speech seconds in a row.
+    With a `reference` (callable returning the output envelope level right
+    now) the learned echo is scaled by what we are actually playing, so the
+    gate drops back to `threshold` in the gaps between our words.
+    """
+
+    def __init__(self, device=None, sample_rate=16000, threshold=0.01,
+                 min_speech=0.35, echo_margin=2.5, learn_seconds=0.4, reference=None):
+        self.reference = reference
+        self.device = device
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.min_speech = min_speech
+        self.echo_margin = echo_margin
+        self.learn_seconds = learn_seconds
+
+        self.block_duration = 0.05
+        self.stream = None
+        self.on_barge_in = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.echo_floor = 0.0
+        self.echo_gain = 0.0
+        self.elapsed = 0.0
+        self.speech_run = 0.0
+        self.fired = False
+
+    def _callback(self, indata, frames, time, status):
+        vol = float(np.sqrt(np.mean(indata ** 2)))
+        ref = self.reference() if self.reference else None
+        self.elapsed += self.block_duration
+
+        if self.elapsed <= self.learn_seconds:
+            self.echo_floor = max(self.echo_floor, vol)
+            if ref:
+                self.echo_gain = max(self.echo_gain, vol / max(ref, 0.05))
+            return
+
+        if ref is not None:
+            gate = self.threshold + self.echo_gain * ref * self.echo_margin
+        else:
+            gate = max(self.threshold, self.echo_floor * self.echo_margin)
+
+        if vol > gate:
+            self.speech_run += self.block_duration
+        else:
+            self.speech_run = 0.0
+            # Slowly follow the echo as the speech gets louder/softer
+            self.echo_floor = 0.95 * self.echo_floor + 0.05 * vol
+
+        if self.speech_run >= self.min_speech and not self.fired:
+            self.fired = True
+            if self.on_barge_in:
+                self.on_barge_in()
+
+    def arm(self):
+        """Starts listening (call when playback starts)."""
+        with self._lock:
+            if self.stream:
+                return
+            self._reset()
+            try:
+                self.stream = sd.InputStream(
+                    samplerate=self.sample_rate,
+                    device=self.device,
+                    channels=1,
+                    dtype='float32',
+                    blocksize=int(self.sample_rate * self.block_duration),
+                    callback=self._callback
+                )
+                self.stream.start()
+            except Exception as e:
+                print(f"Barge-in stream error: {e}")
+                self.stream = None
+
+    def disarm(self):
+        """Stops listening (call when playback ends)."""
+        with self._lock:
+            if self.stream:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
@@ -0,0 +1,141 @@
+"""
+Ingest-time clean-up, between the chunker and the embedder.
+
+1. normalize_chunk(): collapses whitespace, drops lines that repeat an
+   earlier line of the same chunk up to case / plural / punctuation
+   ("Closed on Monday and Sunday" vs "Closed on Mondays and Sundays"), and
+   repeated ", and ..." clauses inside a line.
+2. ChunkDeduper: SimHash fingerprint per chunk; a chunk within
+   max_distance bits of one already kept is dropped, so near-identical
+   chunks do not take several context slots.
+
+Everything that was changed or dropped is recorded in `provenance`
+(written next to the index as provenance.jsonl).
+"""
+import re
+import json
+import hashlib
+
+# Hamming distance (out of 64 bits) at or below which two chunks count as
+# near-duplicates
+DEDUP_MAX_DISTANCE = 3
+SHINGLE = 3
+_BANDS = 4   # 4 x 16-bit bands: distance <= 3 guarantees one band matches exactly
+
+_WS = re.compile(r"[ \t\f\v]+")
+_NON_WORD = re.compile(r"[^\w\s:]")
+
+
+def _key(text: str) -> str:
+    """Comparison key: lower case, no punctuation, collapsed spaces, naive singular."""
+    words = _NON_WORD.sub(" ", text.lower()).split()
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words)
+
+
+def _dedup_clauses(line: str) -> str:
+    clauses = line.split(", and ")
+    if len(clauses) < 2:
+        return line
+    seen, kept = set(), []
+    for c in clauses:
+        k = _key(c)
+        if k and k in seen:
+            continue
+        seen.add(k)
+        kept.append(c)
+    return ", and ".join(kept)
+
+
+def normalize_chunk(text: str):
+    """Returns (clean text, number of lines or clauses removed)."""
+    out, seen, removed = [], set(), 0
+    for raw in text.split("\n"):
+        line = _WS.sub(" ", raw).strip()
+        if line:
+            deduped = _dedup_clauses(line)
+            if deduped != line:
+                removed += 1
+                line = deduped
+            k = _key(line)
+            if k in seen:
+                removed += 1
+                continue
+            seen.add(k)
+        elif out and not out[-1]:
+            continue
+        out.append(line)
+    return "\n".join(out).strip(), removed
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word shingles of the comparison key."""
+    words = _key(text).split()
+    if len(words) < SHINGLE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)]
+    weights = [0] * 64
+    for sh in shingles:
+        h = int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+class ChunkDeduper:
+    """
+    Streaming filter over (chunk, id, metadata) items. Keeps only the
+    fingerprints of kept chunks (banded for lookup), so memory stays small
+    however large the stream is.
+    """
+
+    def __init__(self, max_distance: int = DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._bands = [dict() for _ in range(_BANDS)]
+        self.provenance = []
+        self.kept = 0
+        self.dropped = 0
+        self.lines_removed = 0
+
+    def _near(self, fp: int):
+        width = 64 // _BANDS
+        for b, band in enumerate(self._bands):
+            for other, other_id in band.get((fp >> (b * width)) & 0xFFFF, ()):
+                distance = bin(fp ^ other).count("1")
+                if distance <= self.max_distance:
+                    return other_id, distance
+        return None, None
+
+    def _remember(self, fp: int, chunk_id: str):
+        width = 64 // _BANDS
+        for b, band in enumerate(self._bands):
+            band.setdefault((fp >> (b * width)) & 0xFFFF, []).append((fp, chunk_id))
+
+    def filter(self, items):
+        for chunk, chunk_id, meta in items:
+            clean, removed = normalize_chunk(chunk)
+            if not clean:
+                continue
+            fp = simhash(clean)
+            duplicate_of, distance = self._near(fp)
+            if duplicate_of is not None:
+                self.dropped += 1
+                self.provenance.append({"action": "dropped", "id": chunk_id, **meta,
+                                        "duplicate_of": duplicate_of, "distance": distance})
+                continue
+            if removed:
+                self.lines_removed += removed
+                self.provenance.append({"action": "normalized", "id": chunk_id, **meta,
+                                        "removed": removed})
+            self._remember(fp, chunk_id)
+            self.kept += 1
+            yield clean, chunk_id, meta
+
+    def describe(self) -> str:
+        return (f"Dedup: kept {self.kept} chunks, dropped {self.dropped} near-duplicates, "
+                f"removed {self.lines_removed} repeated lines/clauses")
+
+    def write_provenance(self, path: str):
+        with open(path, "w", encoding="utf-8") as fh:
+            for record in self.provenance:
+                fh.write(json.dumps(record) + "\n")
@@ -0,0 +1,164 @@
+import os
+import gc
+import sys
+import time
+import ctypes
+import threading
+
+# Inactivity (no wake word, no question) before the kiosk drops to idle mode
+IDLE_AFTER = float(os.environ.get("BEARNARD_IDLE_AFTER", "600"))
+
+# What idle mode releases:
+#   "unload"  free the LLM, the query Whisper model and the embedding encoder
+#             (the GGUF is mmapped, so the reload mostly comes from page cache)
+#   "kv"      keep every model, only drop the LLM's KV cache / conversation
+#   "off"     never go idle
+IDLE_POLICY = os.environ.get("BEARNARD_IDLE_POLICY", "unload")
+
+IDLE_METER_REFRESH_MS = 250   # volume bar at 4 fps instead of 30
+
+
+def current_rss_mb() -> float:
+    """Resident set size right now (not the peak)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1 << 20)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def _trim_heap():
+    """Hands freed malloc arenas back to the OS (glibc keeps them otherwise)."""
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+class IdleGovernor:
+    """
+    Tracks activity and switches the kiosk between ACTIVE and IDLE.
+
+    Going idle runs every registered resource's release function and the
+    on_change(idle) callbacks (wake detector to low power, slower meter).
+    wake() switches back at once and reloads the resources on a background
+    thread, in registration order, so the reload overlaps with recording
+    the question; wait_ready() blocks only if it has not finished by the
+    time the answer needs it. Each switch logs the CPU share and RSS of the
+    mode that just ended.
+    """
+
+    def __init__(self, idle_after: float = IDLE_AFTER, policy: str = IDLE_POLICY, log=None):
+        self.idle_after = idle_after
+        self.policy = policy
+        self.log = log or (lambda msg: print(f"[POWER] {msg}"))
+        self.idle = False
+        self.resources = []   # (name, release, reload)
+        self.on_change = []
+        self.last_activity = time.monotonic()
+        self._reload_thread = None
+        self._mode_start = (time.monotonic(), _cpu_seconds())
+        self._lock = threading.Lock()
+
+    def add(self, name: str, release, reload=None):
+        """release() frees the resource when idle; reload() (optional) brings it back on wake."""
+        self.resources.append((name, release, reload))
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def _mode_report(self) -> str:
+        wall0, cpu0 = self._mode_start
+        wall, cpu = time.monotonic(), _cpu_seconds()
+        self._mode_start = (wall, cpu)
+        share = (cpu - cpu0) / max(wall - wall0, 1e-6) * 100
+        return (f"{'idle' if self.idle else 'active'} for {(wall - wall0) / 60:.1f} min: "
+                f"CPU {share:.1f}% of one core, RSS {current_rss_mb():.0f} MB")
+
+    def poll(self):
+        """Call from the main loop; goes idle once nothing happened for idle_after seconds."""
+        if self.policy == "off" or self.idle:
+            return
+        if time.monotonic() - self.last_activity < self.idle_after:
+            return
+        self.wait_ready()
+        with self._lock:
+            report = self._mode_report()
+            self.idle = True
+            for name, release, _ in self.resources:
+                try:
+                    release()
+                except Exception as e:
+                    self.log(f"Could not release {name}: {e}")
+            _trim_heap()
+        for cb in self.on_change:
+            cb(True)
+        self.log(f"Going idle ({self.policy}). Was {report}; now RSS {current_rss_mb():.0f} MB")
+
+    def wake(self):
+        """Back to ACTIVE; reloads what idle mode released, in the background."""
+        self.touch()
+        with self._lock:
+            if not self.idle:
+                return
+            report = self._mode_report()
+            self.idle = False
+            reloads = [(name, fn) for name, _, fn in self.resources if fn is not None]
+            self._reload_thread = threading.Thread(target=self._reload, args=(reloads,), daemon=True)
+            self._reload_thread.start()
+        for cb in self.on_change:
+            cb(False)
+        self.log(f"Waking up. Was {report}")
+
+    def _reload(self, reloads):
+        start = time.perf_counter()
+        for name, fn in reloads:
+            try:
+                fn()
+            except Exception as e:
+                self.log(f"Could not reload {name}: {e}")
+        self.log(f"Models back in {time.perf_counter() - start:.1f}s, RSS {current_rss_mb():.0f} MB")
+
+    def wait_ready(self, timeout: float = None):
+        t = self._reload_thread
+        if t is not None and t.is_alive():
+            t.join(timeout)
+
+    def describe(self) -> str:
+        wall0, cpu0 = self._mode_start
+        wall = time.monotonic() - wall0
+        share = (_cpu_seconds() - cpu0) / max(wall, 1e-6) * 100
+        return (f"Power: {'IDLE' if self.idle else 'ACTIVE'} ({self.policy}, after {self.idle_after:.0f}s), "
+                f"CPU {share:.1f}% over {wall / 60:.1f} min, RSS {current_rss_mb():.0f} MB")
+
+
+def register_models(governor: IdleGovernor, llm=None, query_engine=None, wake_engine=None,
+                    embedder=None, session=None):
+    """Wires the usual Bearnard models into the governor according to its policy."""
+    if governor.policy == "kv":
+        if llm is not None:
+            governor.add("LLM KV cache", llm.drop_kv)
+    elif governor.policy == "unload":
+        # Reload order = what the next question needs first
+        if query_engine is not None and query_engine is not wake_engine:
+            governor.add("query ASR", query_engine.unload, query_engine.load)
+        if embedder is not None:
+            governor.add("embedding encoder", embedder.unload, embedder.load)
+        if llm is not None:
+            governor.add("LLM", llm.unload, llm.load)
+    if session is not None:
+        governor.add("conversation", session.reset)
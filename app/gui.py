@@ -1,37 +1,29 @@
 import sys
+import html
 import time
+import asyncio
+import threading
 import datetime
-import platform
-import torch
+from collections import deque
 import sounddevice as sd
 import traceback 
 
-# ENGINE IMPORTS 
-from faster_whisper import WhisperModel
-
-# Graceful MLX Import
-HAS_MLX = False
-try:
-    if platform.system() == "Darwin":
-        from mlx_wrapper import MLXWhisperWrapper
-        import mlx_whisper 
-        HAS_MLX = True
-except (ImportError, ModuleNotFoundError):
-    pass
-
-from rag import Rag
-from llm import LLM
-from voice_input import VoiceInput
-from voice_output import VoiceOutput
-from wake_word import WakeWordDetector
+# Heavy engines (torch, chromadb, llama_cpp, faster_whisper) are imported
+# lazily inside Pipeline.load / the engine classes, so the mic dialog shows up
+# before any of them load. Track this with bench/import_time.py.
+from pipeline import Pipeline, PipelineListener
+from audio_channel import mic_meter
+from governor import IDLE_METER_REFRESH_MS
+import profiler
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QLineEdit, 
-                             QScrollArea, QFrame, QGraphicsDropShadowEffect,
-                             QDialog, QComboBox, QDialogButtonBox, QProgressBar, QTextEdit,
-                             QStackedLayout, QSizePolicy) 
-from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QSize
-from PyQt6.QtGui import QPixmap, QColor, QIcon, QResizeEvent, QPainter
+                             QFrame, QGraphicsDropShadowEffect,
+                             QDialog, QComboBox, QDialogButtonBox, QProgressBar, QPlainTextEdit,
+                             QStackedLayout, QSizePolicy, QListView, QStyledItemDelegate)
+from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QSize, QAbstractListModel, QModelIndex
+from PyQt6.QtGui import (QPixmap, QColor, QIcon, QResizeEvent, QPainter, QTextDocument,
+                         QShortcut, QKeySequence)
 
 # VISUAL CONSTANTS 
 WHITE_PANEL = "#ffffff"     
@@ -40,6 +32,15 @@ BUTTON_BG = "#1f1f1f"
 ACTIVE_BTN_BG = "#3b82f6"   
 TEXT_COLOR = "#333333"      
 
+METER_REFRESH_MS = 33   # ~30 fps, plenty for a volume bar
+
+# BOUNDED UI STORES: a kiosk runs all day, so neither the chat nor the log
+# may keep every line it was ever shown
+CHAT_HISTORY_LIMIT = 200
+TRANSCRIPT_MAX_LINES = 2000
+TRANSCRIPT_FLUSH_MS = 250
+METRICS_PANEL_REFRESH_MS = 1000   # the panel re-reads metrics.registry once a second
+
 STYLESHEET = f"""
     QMainWindow {{
         background: qradialgradient(
@@ -93,9 +94,7 @@ STYLESHEET = f"""
         margin-bottom: 5px;
     }}
 
-    QScrollArea {{ border: none; background-color: transparent; }}
-    QWidget#ChatContent {{ background-color: transparent; }}
-    QLabel.ChatMessage {{ color: {TEXT_COLOR}; font-size: 14px; padding: 5px; }}
+    QListView#ChatList {{ border: none; background-color: transparent; color: {TEXT_COLOR}; font-size: 14px; }}
 
     QFrame#InputPill {{ background-color: {INPUT_BG}; border-radius: 25px; }}
     QLineEdit {{ background-color: transparent; color: white; font-size: 14px; border: none; }}
@@ -142,13 +141,23 @@ class DeviceSelectionDialog(QDialog):
 
 # TRANSCRIPT LOG WINDOW 
 class TranscriptWindow(QMainWindow):
+    """
+    Log lines go into a ring buffer and are flushed to the widget in one
+    append per timer tick, so a burst of HEARD lines costs one relayout.
+    The widget itself keeps at most TRANSCRIPT_MAX_LINES blocks.
+
+    Above the log, a live panel shows the pipeline's metrics (stage
+    latencies, LLM rate, queues, audio loss, caches, memory), re-read on
+    its own slow timer and only re-laid out when the text changed.
+    """
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Live Transcript Log")
         self.resize(500, 400)
         self.setStyleSheet("""
             QMainWindow { background-color: #0d1117; }
-            QTextEdit { 
+            QPlainTextEdit { 
                 background-color: #0d1117; 
                 color: #00ff00; 
                 font-family: 'Consolas', 'Courier New', monospace; 
@@ -156,11 +165,40 @@ class TranscriptWindow(QMainWindow):
                 border: none;
                 padding: 10px;
             }
+            #MetricsPanel {
+                background-color: #161b22;
+                color: #58a6ff;
+                font-family: 'Consolas', 'Courier New', monospace;
+                font-size: 11px;
+                padding: 8px 10px;
+            }
         """)
-        self.log_area = QTextEdit()
+        self.metrics_panel = QLabel("Loading...")
+        self.metrics_panel.setObjectName("MetricsPanel")
+        self.metrics_panel.setTextFormat(Qt.TextFormat.PlainText)
+        self.metrics_source = None
+
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
-        self.setCentralWidget(self.log_area)
+        self.log_area.setMaximumBlockCount(TRANSCRIPT_MAX_LINES)
+        self.log_area.setUndoRedoEnabled(False)
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.metrics_panel)
+        layout.addWidget(self.log_area, 1)
+        self.setCentralWidget(container)
         self.last_log = "" 
+        self.pending = deque(maxlen=TRANSCRIPT_MAX_LINES)
+        self.dropped = 0
+
+        self.flush_timer = QTimer()
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(TRANSCRIPT_FLUSH_MS)
+        self.panel_timer = QTimer()
+        self.panel_timer.timeout.connect(self.refresh_metrics)
+        self.panel_timer.start(METRICS_PANEL_REFRESH_MS)
         self.log("--- SYSTEM INITIALIZED ---")
 
     def log(self, text, prefix="INFO"):
@@ -168,136 +206,139 @@ class TranscriptWindow(QMainWindow):
             return
             
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        formatted = f"[{timestamp}] [{prefix}] {text}"
-        self.log_area.append(formatted)
-        sb = self.log_area.verticalScrollBar()
-        sb.setValue(sb.maximum())
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(f"[{timestamp}] [{prefix}] {text}")
         self.last_log = text
 
+    def flush(self):
+        if not self.pending:
+            return
+        lines = list(self.pending)
+        self.pending.clear()
+        if self.dropped:
+            lines.insert(0, f"... {self.dropped} older lines dropped ...")
+            self.dropped = 0
+        sb = self.log_area.verticalScrollBar()
+        at_bottom = sb.value() >= sb.maximum() - 4
+        self.log_area.appendPlainText("\n".join(lines))
+        if at_bottom:
+            sb.setValue(sb.maximum())
+
+    def set_metrics_source(self, source):
+        """source() -> panel text, e.g. Pipeline.metrics_panel."""
+        self.metrics_source = source
+
+    def refresh_metrics(self):
+        if self.metrics_source is None or not self.isVisible():
+            return
+        try:
+            text = self.metrics_source()
+        except Exception as e:
+            text = f"Metrics unavailable: {e}"
+        if text != self.metrics_panel.text():
+            self.metrics_panel.setText(text)
+
+    def set_refresh(self, ms):
+        self.flush_timer.setInterval(ms)
+        # Idle: the log flush slows down 4x, the panel with it
+        self.panel_timer.setInterval(METRICS_PANEL_REFRESH_MS * ms // TRANSCRIPT_FLUSH_MS)
+
+# CHAT HISTORY (model/view)
+class ChatModel(QAbstractListModel):
+    """Last CHAT_HISTORY_LIMIT messages as (sender, text); the oldest fall off."""
+
+    def __init__(self, limit=CHAT_HISTORY_LIMIT):
+        super().__init__()
+        self.messages = deque(maxlen=limit)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.messages)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.messages):
+            return None
+        sender, text = self.messages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{sender}: {text}"
+        if role == Qt.ItemDataRole.UserRole:
+            return f"<b>{html.escape(sender)}:</b> {html.escape(text)}"
+        return None
+
+    def append(self, sender, text):
+        if len(self.messages) == self.messages.maxlen:
+            self.beginRemoveRows(QModelIndex(), 0, 0)
+            self.messages.popleft()
+            self.endRemoveRows()
+        row = len(self.messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.messages.append((sender, text))
+        self.endInsertRows()
+
+
+class ChatDelegate(QStyledItemDelegate):
+    """Lays out one message as wrapped rich text, only when the view asks for it."""
+
+    PADDING = 5
+
+    def _document(self, option, index):
+        # option.rect is not set when the view asks for a size hint, so wrap
+        # at the viewport width (ResizeMode.Adjust relayouts on resize)
+        width = self.parent().viewport().width() if self.parent() else option.rect.width()
+        doc = QTextDocument()
+        doc.setDefaultFont(option.font)
+        doc.setDefaultStyleSheet(f"body {{ color: {TEXT_COLOR}; }}")
+        doc.setHtml(index.data(Qt.ItemDataRole.UserRole))
+        doc.setTextWidth(max(width - 2 * self.PADDING, 50))
+        return doc
+
+    def sizeHint(self, option, index):
+        doc = self._document(option, index)
+        return QSize(int(doc.idealWidth()), int(doc.size().height()) + 2 * self.PADDING)
+
+    def paint(self, painter, option, index):
+        doc = self._document(option, index)
+        painter.save()
+        painter.translate(option.rect.left() + self.PADDING, option.rect.top() + self.PADDING)
+        doc.drawContents(painter)
+        painter.restore()
+
 # AI WORKER 
-class AIWorker(QThread):
+class AIWorker(QThread, PipelineListener):
+    """Runs the shared pipeline (pipeline.py) and turns what it reports into Qt signals."""
     response_ready = pyqtSignal(str)
     state_changed = pyqtSignal(str)
-    mic_volume = pyqtSignal(int)
     transcribed_text = pyqtSignal(str)
     log_message = pyqtSignal(str, str)
+    speech_envelope = pyqtSignal(object, float)
+    power_mode = pyqtSignal(bool)   # True = idle
     
     def __init__(self, mic_index=None):
         super().__init__()
         self.mode = "chat"
-        self.is_running = True
-        self.input_queue = None
         self.mic_index = mic_index 
-        self.manual_trigger_active = False 
+        self.pipeline = Pipeline(mic_index=mic_index, listener=self, mode=self.mode)
 
     def set_mode(self, mode):
         self.mode = mode
+        self.pipeline.set_mode(mode)
         self.log_message.emit(f"Switched to {mode.upper()} mode.", "MODE")
 
     def trigger_wake(self):
         if self.mode == "voice":
-            self.manual_trigger_active = True
             self.log_message.emit("Manual 'Tap to Speak' triggered.", "INPUT")
+            # Tapping while Bearnard talks cuts him off
+            self.pipeline.trigger()
 
     def process_text(self, text):
-        self.input_queue = text
+        self.pipeline.submit_text(text)
 
     def run(self):
+        # Named for the profiler's per-thread stacks
+        threading.current_thread().name = "AIWorker"
         try:
-            self.state_changed.emit("LOADING")
-            print(f"Loading Models... (Mic Index: {self.mic_index})")
-            
-            # ENGINE SELECTION LOGIC 
-            os_name = platform.system()
-            shared_whisper = None
-            
-            if os_name == "Darwin" and HAS_MLX:
-                msg = "Apple Silicon (M4) Detected. Using MLX Engine."
-                print(msg)
-                self.log_message.emit(msg, "SYS")
-                shared_whisper = MLXWhisperWrapper("mlx-community/whisper-large-v3-turbo")
-                
-            elif torch.cuda.is_available():
-                msg = "NVIDIA GPU Detected. Using Faster-Whisper (Float16)."
-                print(msg)
-                self.log_message.emit(msg, "SYS")
-                shared_whisper = WhisperModel("distil-large-v3", device="cuda", compute_type="float16")
-                
-            else:
-                msg = "Standard CPU Detected. Using Faster-Whisper (Int8)."
-                print(msg)
-                self.log_message.emit(msg, "SYS")
-                shared_whisper = WhisperModel("distil-medium.en", device="cpu", compute_type="int8", cpu_threads=4)
-
-            self.rag = Rag(build_if_empty=True)
-            try:
-                self.llm = LLM()
-            except Exception as e:
-                self.log_message.emit(f"LLM Error: {e}", "ERROR")
-                self.llm = None 
-
-            self.ear = VoiceInput(model=shared_whisper, device=self.mic_index)
-            self.wake = WakeWordDetector(model=shared_whisper, device=self.mic_index)
-            self.mouth = VoiceOutput()
-            
-            self.state_changed.emit("CALIBRATING")
-            self.log_message.emit("Calibrating Microphone...", "CALIB")
-            self.ear.adjust_for_ambient_noise()
-            
-            self.wake.energy_threshold = self.ear.silence_threshold
-            self.log_message.emit(f"VAD Threshold Synced: {self.wake.energy_threshold:.4f}", "SYS")
-
-            self.state_changed.emit("IDLE")
-            self.log_message.emit("AI Ready.", "READY")
-
-            while self.is_running:
-                if self.input_queue:
-                    text = self.input_queue
-                    self.input_queue = None
-                    self.log_message.emit(f"User typed: {text}", "CHAT")
-                    self.generate_response(text)
-                    continue
-
-                if self.mode == "voice":
-                    wake_heard = self.wake.listen_for_wake_word(
-                        timeout=0.1, 
-                        volume_callback=lambda vol: self.mic_volume.emit(int(vol * 500)),
-                        transcript_callback=lambda text: self.log_message.emit(f"'{text}'", "HEARD")
-                    )
-                    
-                    if wake_heard or self.manual_trigger_active:
-                        self.wake.stop_stream()
-                        
-                        if wake_heard:
-                            self.log_message.emit("Wake Word Detected!", "WAKE")
-                        
-                        self.manual_trigger_active = False 
-                        
-                        self.state_changed.emit("LISTENING")
-                        self.mic_volume.emit(50) 
-                        self.log_message.emit("Recording...", "REC")
-                        
-                        audio = self.ear.record_until_silence(
-                            callback=lambda vol: self.mic_volume.emit(int(vol * 500))
-                        )
-                        
-                        self.state_changed.emit("THINKING")
-                        self.mic_volume.emit(0) 
-                        self.log_message.emit("Transcribing...", "PROC")
-                        
-                        user_text = self.ear.transcribe(audio)
-                        
-                        if user_text.strip():
-                            self.log_message.emit(f"Heard: '{user_text}'", "VOICE")
-                            self.transcribed_text.emit(user_text)
-                            self.generate_response(user_text)
-                        else:
-                            self.log_message.emit("Heard nothing.", "INFO")
-                            self.state_changed.emit("IDLE")
-                
-                else:
-                    time.sleep(0.1)
-        
+            self.pipeline.load()
+            asyncio.run(self.pipeline.run())
         except Exception as e:
             err_msg = f"CRASH: {str(e)}"
             print(err_msg)
@@ -305,73 +346,28 @@ class AIWorker(QThread):
             self.log_message.emit(err_msg, "CRITICAL")
             self.state_changed.emit("IDLE")
 
-    def generate_response(self, user_text):
-        self.state_changed.emit("THINKING")
-    
-        docs = self.rag.search(user_text, n_results=15)
-        
-        if docs:
-            print(f"\n [CONTEXT] Found {len(docs)} relevant documents:")
-            for i, doc in enumerate(docs, 1):
-                print(f"  [{i}] {doc[:100].replace('\n', ' ')}..." if len(doc) > 100 else f"  [{i}] {doc}")
-            print()
-            formatted_context = "\n---\n".join(docs)
-        else:
-            print(" [CONTEXT] No relevant documents found.\n")
-            formatted_context = "NO_DATA_FOUND"
-
-        current_time = datetime.datetime.now().strftime("%A, %I:%M %p")
-        
-        prompt = f"""[INST] You are Bearnard, the AI Concierge of iACADEMY (The Nexus), You are located at the Ground Floor - Lobby. 
-Current Time: {current_time}
-
-SPECIAL RULES:
-- If asked about NEAREST location, answer based on your location at Ground Floor - Lobby.
-- If asked for actions (greet, say hello), respond with a short greeting only.
-- If asked for the time, respond with the current time only.
+    # PIPELINE LISTENER: called from the pipeline's threads, so only emit
 
-### INSTRUCTIONS:
-1. **SOURCE OF TRUTH:** Answer questions using ONLY the information in the [CONTEXT] block below. Check for slang words or abbrevations used in iACADEMY. (CR for Comfort Room, CL for Computer Lab, etc.). check for lower case of the abreveations as well. the CONTEXT is your only source of truth. you must base your answers SOLELY on that information.
-2. **UNKNOWN INFO:** If the [CONTEXT] contains "NO_DATA_FOUND", say: "I'm sorry, I don't have that information in my current records." or If the [CONTEXT] doesn't make sense or logical, answer based on your knowledge regarding the CONTEXT. Make sure to analyze the CONTEXT properly and follows the appropriate questions. avoid making up answers. This doesn't apply on Special Rules.
-3. **OFF-TOPIC:** If the user asks about math, coding, or general world trivia (not related to iACADEMY), politely decline.
-4. **VOICE OPTIMIZATION:** You are speaking to the user.
-    - Keep answers **short** (under 2 sentences if possible).
-    - Do NOT use lists, bullet points, or markdown formatting.
-    - If listing items, separate them with commas for natural speech.
+    def on_state(self, state):
+        self.state_changed.emit(state.name)
 
+    def on_log(self, text, tag="INFO"):
+        self.log_message.emit(text, tag)
 
-### [CONTEXT]
-{formatted_context}
+    def on_wake_transcript(self, text):
+        self.log_message.emit(f"'{text}'", "HEARD")
 
-### [USER QUESTION]
-{user_text}
+    def on_heard(self, text):
+        self.transcribed_text.emit(text)
 
-### [BEARNARD'S ANSWER]
-[/INST]"""
-
-
-        token_limit = 1024 if "list" in user_text.lower() else 512
-        
-        try:
-            answer = self.llm.ask(prompt, max_tokens=token_limit)
-            self.response_ready.emit(answer)
-            
-            # --- SYNC FIX ---
-            # 1. Start Animation
-            self.state_changed.emit("SPEAKING")
-            
-            # 2. Blocking Speak (Animation continues while this runs)
-            self.mouth.speak(answer)
-            
-            # 3. Clear buffer immediately (No sleep needed)
-            if hasattr(self.wake, 'audio_buffer'):
-                self.wake.audio_buffer.clear()
+    def on_answer(self, text):
+        self.response_ready.emit(text)
 
-        except Exception as e:
-            print(f"Error generating response: {e}")
+    def on_envelope(self, envelope, hop):
+        self.speech_envelope.emit(envelope, hop)
 
-        # 4. Stop Animation immediately after speech is done
-        self.state_changed.emit("IDLE")
+    def on_power(self, idle):
+        self.power_mode.emit(idle)
 
 
 # Bearnard Image in Chat Window
@@ -416,9 +412,14 @@ class AnimatedBearAvatar(QWidget):
         self.offset_y = 0
         
         self.is_mouth_open = False
-        
+
+        # MOUTH SYNC: the TTS publishes an RMS envelope per sentence; we
+        # sample it against a clock started when the sentence starts playing.
+        self.envelope = None
+        self.envelope_hop = 0.02
+        self.envelope_start = 0.0
         self.talk_timer = QTimer()
-        self.talk_timer.timeout.connect(self.toggle_mouth)
+        self.talk_timer.timeout.connect(self.update_mouth)
 
     def resizeEvent(self, event):
         """Calculates scaling to FILL the window (Crop edges if needed)"""
@@ -455,15 +456,33 @@ class AnimatedBearAvatar(QWidget):
         
         painter.drawPixmap(self.offset_x, self.offset_y, current_img)
 
-    def toggle_mouth(self):
-        self.is_mouth_open = not self.is_mouth_open
-        self.update() 
-        
+    MOUTH_OPEN_LEVEL = 0.35
+    MOUTH_CLOSE_LEVEL = 0.2
+
+    def set_envelope(self, envelope, hop):
+        self.envelope = envelope
+        self.envelope_hop = hop
+        self.envelope_start = time.perf_counter()
+        if not self.talk_timer.isActive():
+            self.talk_timer.start(33)
+
+    def update_mouth(self):
+        level = 0.0
+        if self.envelope is not None:
+            idx = int((time.perf_counter() - self.envelope_start) / self.envelope_hop)
+            if idx < len(self.envelope):
+                level = self.envelope[idx]
+
+        # Hysteresis so the jaw doesn't flutter around one threshold
+        is_open = level > (self.MOUTH_CLOSE_LEVEL if self.is_mouth_open else self.MOUTH_OPEN_LEVEL)
+        if is_open != self.is_mouth_open:
+            self.is_mouth_open = is_open
+            self.update()
+
     def set_state(self, state):
-        if state == "SPEAKING":
-            if not self.talk_timer.isActive(): self.talk_timer.start(150)
-        else:
+        if state != "SPEAKING":
             self.talk_timer.stop()
+            self.envelope = None
             self.is_mouth_open = False
             self.update()
 
@@ -562,14 +581,21 @@ class ChatWindow(QMainWindow):
         card_layout = QVBoxLayout(card)
         card_layout.setContentsMargins(20, 20, 20, 20)
         
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.chat_content = QWidget()
-        self.chat_content.setObjectName("ChatContent")
-        self.msg_layout = QVBoxLayout(self.chat_content)
-        self.msg_layout.addStretch()
-        self.scroll.setWidget(self.chat_content)
-        card_layout.addWidget(self.scroll)
+        # Only the visible rows are laid out and painted; the model drops
+        # the oldest messages past CHAT_HISTORY_LIMIT
+        self.chat_model = ChatModel()
+        self.chat_view = QListView()
+        self.chat_view.setObjectName("ChatList")
+        self.chat_view.setModel(self.chat_model)
+        self.chat_view.setItemDelegate(ChatDelegate(self.chat_view))
+        self.chat_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.chat_view.setBatchSize(20)
+        self.chat_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.chat_view.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.chat_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.chat_view.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.chat_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        card_layout.addWidget(self.chat_view)
         
         input_pill = QFrame()
         input_pill.setObjectName("InputPill")
@@ -621,14 +647,8 @@ class ChatWindow(QMainWindow):
             self.btn_chat.setStyleSheet(active_style)
 
     def add_message(self, sender, text):
-        msg_lbl = QLabel(f"<b>{sender}:</b> {text}")
-        msg_lbl.setProperty("class", "ChatMessage")
-        msg_lbl.setWordWrap(True)
-        self.msg_layout.addWidget(msg_lbl)
-        
-        QTimer.singleShot(10, lambda: self.scroll.verticalScrollBar().setValue(
-            self.scroll.verticalScrollBar().maximum()
-        ))
+        self.chat_model.append(sender, text)
+        QTimer.singleShot(10, self.chat_view.scrollToBottom)
     
     def send_text(self):
         text = self.txt_input.text().strip()
@@ -741,14 +761,27 @@ class MainController:
         self.chat_window = ChatWindow(self)
         self.voice_window = VoiceWindow(self)
         self.transcript_window = TranscriptWindow()
+        self.transcript_window.set_metrics_source(self.worker.pipeline.metrics_panel)
         
         self.worker.state_changed.connect(self.chat_window.update_ui_state)
         self.worker.state_changed.connect(self.voice_window.update_ui_state)
         self.worker.response_ready.connect(lambda t: self.chat_window.add_message("Bearnard", t))
-        self.worker.mic_volume.connect(self.chat_window.update_volume)
         self.worker.transcribed_text.connect(lambda t: self.chat_window.add_message("You", t))
         self.worker.log_message.connect(self.transcript_window.log)
+        self.worker.speech_envelope.connect(self.voice_window.bear.set_envelope)
+        self.worker.power_mode.connect(self.on_power_mode)
         
+        # MIC METER: polled at display rate instead of one Qt signal per audio block
+        self.meter_timer = QTimer()
+        self.meter_timer.timeout.connect(lambda: self.chat_window.update_volume(int(mic_meter.read() * 500)))
+        self.meter_timer.start(METER_REFRESH_MS)
+
+        # HIDDEN PROFILER TRIGGERS: Ctrl+Shift+P in any window, or kill -USR1 <pid>
+        self.profile_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self.chat_window)
+        self.profile_shortcut.setContext(Qt.ShortcutContext.ApplicationShortcut)
+        self.profile_shortcut.activated.connect(self.start_profile)
+        profiler.control.install_signal()
+
         self.chat_window.show()
         self.voice_window.show()
         self.transcript_window.show()
@@ -763,5 +796,13 @@ class MainController:
         self.worker.set_mode(mode)
         self.chat_window.set_active_mode(mode)
 
+    def start_profile(self):
+        if not profiler.control.start():
+            self.transcript_window.log("A profile is already running.", "PROFILE")
+
+    def on_power_mode(self, idle):
+        self.meter_timer.setInterval(IDLE_METER_REFRESH_MS if idle else METER_REFRESH_MS)
+        self.transcript_window.set_refresh(IDLE_METER_REFRESH_MS * 4 if idle else TRANSCRIPT_FLUSH_MS)
+
 if __name__ == "__main__":
     MainController()
\ No newline at end of file
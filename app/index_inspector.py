@@ -0,0 +1,242 @@
+"""
+Index inspector (replaces view_chromadb.py).
+
+Pages through the index in fixed-size batches, so it never pulls every
+document or embedding into memory at once, and works on either store Rag
+can fill from: the chroma collection or an embedding snapshot.
+
+Usage (from the repo root):
+    python app/index_inspector.py list  [--source Directory.txt] [--page-size 100] [--limit 20] [--full]
+    python app/index_inspector.py stats [--source Directory.txt] [--page-size 500]
+    python app/index_inspector.py query "where is the clinic?" [-k 5] [--source Concerns.txt] [--repeat 3]
+
+    --index chroma|snapshot   which store to read (default chroma)
+    --path PATH               chroma folder or snapshot file
+"""
+import os
+import time
+import hashlib
+import argparse
+
+import numpy as np
+
+from rag import CHROMA_PATH, COLLECTION_NAME, CHUNK_SIZE
+from snapshot import SNAPSHOT_PATH
+from dedup import ChunkDeduper
+
+
+def _dir_bytes(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+class ChromaIndex:
+    def __init__(self, path: str = CHROMA_PATH, collection: str = COLLECTION_NAME):
+        import chromadb
+        self.path = path
+        self.col = chromadb.PersistentClient(path=path).get_collection(collection)
+
+    def describe(self) -> str:
+        meta = self.col.metadata or {}
+        return (f"chroma {self.path} / {self.col.name}: encoder {meta.get('embed_model', '(untagged)')}, "
+                f"chunker {meta.get('chunker', '(untagged)')}")
+
+    def pages(self, page_size: int, source: str = None, embeddings: bool = False):
+        """Yields lists of (id, document, metadata, embedding or None)."""
+        include = ["documents", "metadatas"] + (["embeddings"] if embeddings else [])
+        where = {"source_file": source} if source else None
+        offset = 0
+        while True:
+            batch = self.col.get(include=include, where=where, limit=page_size, offset=offset)
+            ids = batch["ids"]
+            if not len(ids):
+                return
+            embs = batch.get("embeddings") if embeddings else None
+            yield [(ids[i], batch["documents"][i], batch["metadatas"][i],
+                    np.asarray(embs[i], dtype=np.float32) if embs is not None else None)
+                   for i in range(len(ids))]
+            offset += len(ids)
+
+    def disk_bytes(self) -> int:
+        return _dir_bytes(self.path)
+
+
+class SnapshotIndex:
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        from snapshot import EmbeddingSnapshot
+        self.path = path
+        self.snap = EmbeddingSnapshot(path)
+
+    def describe(self) -> str:
+        return "snapshot " + self.snap.describe()
+
+    def pages(self, page_size: int, source: str = None, embeddings: bool = False):
+        rows = [i for i, r in enumerate(self.snap.records) if not source or r["source_file"] == source]
+        for b in range(0, len(rows), page_size):
+            page = rows[b:b + page_size]
+            vecs = self.snap.vectors_for(page) if embeddings else [None] * len(page)
+            yield [(self.snap.records[row]["id"], self.snap.text(row),
+                    {"source_file": self.snap.records[row]["source_file"],
+                     "chunk_index": self.snap.records[row]["chunk_index"]}, vec)
+                   for row, vec in zip(page, vecs)]
+
+    def disk_bytes(self) -> int:
+        return _dir_bytes(self.path)
+
+
+def open_index(kind: str, path: str = None):
+    if kind == "snapshot":
+        return SnapshotIndex(path or SNAPSHOT_PATH)
+    return ChromaIndex(path or CHROMA_PATH)
+
+
+def cmd_list(index, args):
+    shown = 0
+    for page in index.pages(args.page_size, args.source):
+        for _id, doc, meta, _ in page:
+            shown += 1
+            text = doc if args.full else doc[:160].replace("\n", " ") + ("..." if len(doc) > 160 else "")
+            print(f"--- {shown}. {meta.get('source_file')}#{meta.get('chunk_index')}  {_id[:12]}  ({len(doc)} chars)")
+            print(f"    {text}")
+            if args.limit and shown >= args.limit:
+                return
+    print(f"\n{shown} chunks")
+
+
+def cmd_stats(index, args):
+    per_file = {}
+    lengths = []
+    norms = []
+    hashes = set()
+    exact_dups = 0
+    deduper = ChunkDeduper()
+    dim = None
+
+    for page in index.pages(args.page_size, args.source, embeddings=True):
+        items = []
+        for _id, doc, meta, emb in page:
+            src = meta.get("source_file", "?")
+            per_file[src] = per_file.get(src, 0) + 1
+            lengths.append(len(doc))
+            if emb is not None:
+                dim = len(emb)
+                norms.append(float(np.linalg.norm(emb)))
+            h = hashlib.sha1(doc.encode("utf-8")).digest()
+            if h in hashes:
+                exact_dups += 1
+            hashes.add(h)
+            items.append((doc, _id, meta))
+        for _ in deduper.filter(items):
+            pass
+
+    total = len(lengths)
+    print(index.describe())
+    print(f"On disk: {index.disk_bytes() / 1e6:.1f} MB")
+    if not total:
+        print("No chunks.")
+        return
+
+    print(f"\nChunks: {total} in {len(per_file)} files" + (f", dim {dim}" if dim else ""))
+    for src, n in sorted(per_file.items(), key=lambda kv: -kv[1]):
+        print(f"  {n:>6}  {src}")
+
+    print("\nChunk length (chars)")
+    lengths_arr = np.asarray(lengths)
+    print(f"  min {lengths_arr.min()}  p50 {int(np.median(lengths_arr))}  mean {lengths_arr.mean():.0f}  "
+          f"max {lengths_arr.max()}")
+    edges = list(range(0, CHUNK_SIZE + 1, CHUNK_SIZE // 10)) + [max(CHUNK_SIZE + 1, lengths_arr.max() + 1)]
+    counts, _ = np.histogram(lengths_arr, bins=edges)
+    peak = max(counts.max(), 1)
+    for lo, hi, n in zip(edges[:-1], edges[1:], counts):
+        print(f"  {lo:>5}-{hi - 1:<5} {n:>6} {'#' * int(40 * n / peak)}")
+
+    if norms:
+        norms_arr = np.asarray(norms)
+        print(f"\nEmbedding norm: min {norms_arr.min():.4f}  mean {norms_arr.mean():.4f}  "
+              f"max {norms_arr.max():.4f}" + ("  (normalised)" if abs(norms_arr.mean() - 1) < 1e-2 else ""))
+
+    print(f"\nDuplicates: {exact_dups} exact, {deduper.dropped} near (SimHash <= {deduper.max_distance} bits), "
+          f"{deduper.lines_removed} repeated lines/clauses inside chunks")
+
+
+def cmd_query(index, args):
+    from rag import Rag, select_context
+
+    if not isinstance(index, ChromaIndex):
+        print("Queries run against the chroma index; use --index chroma.")
+        return
+    # Rag rebuilds an index tagged with another encoder or chunker; never do
+    # that from here
+    from rag import get_backend, chunker_tag, LEGACY_INDEX_TAG, CHUNK_SIZE, OVERLAP
+    meta = index.col.metadata or {}
+    index_tag = meta.get("embed_model", LEGACY_INDEX_TAG)
+    if index_tag != get_backend(args.backend).tag:
+        print(f"Index was built with {index_tag}; pick that encoder with --backend.")
+        return
+    if meta.get("chunker", chunker_tag(CHUNK_SIZE, OVERLAP, dedup=False)) != chunker_tag():
+        print(f"Index was built with chunker {meta.get('chunker', '(untagged)')}, not {chunker_tag()}; "
+              f"query it through Rag with matching settings.")
+        return
+
+    start = time.perf_counter()
+    rag = Rag(chroma_path=index.path, backend=args.backend)
+    print(f"Loaded encoder {rag.emb.tag} in {time.perf_counter() - start:.2f}s")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        q_emb = rag.emb.encode_query(args.text)
+        encoded = time.perf_counter()
+        results = rag.col.query(query_embeddings=[q_emb.tolist()], n_results=args.k,
+                                where={"source_file": args.source} if args.source else None)
+        timings.append((encoded - start, time.perf_counter() - encoded))
+    encode_ms = sorted(t[0] for t in timings)[len(timings) // 2] * 1000
+    search_ms = sorted(t[1] for t in timings)[len(timings) // 2] * 1000
+    print(f"Query encode {encode_ms:.1f} ms, vector search {search_ms:.1f} ms (median of {args.repeat})\n")
+
+    hits = list(zip(results["documents"][0], results["distances"][0], results["metadatas"][0]))
+    for rank, (doc, dist, meta) in enumerate(hits, start=1):
+        print(f"{rank:>2}. {dist:.3f}  {meta.get('source_file')}#{meta.get('chunk_index')}  "
+              f"{doc[:120].replace(chr(10), ' ')}")
+    delivered = select_context(hits)
+    print(f"\nRag.search would deliver {len(delivered)} chunks ({sum(len(d) for d in delivered)} chars)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", choices=["chroma", "snapshot"], default="chroma")
+    parser.add_argument("--path", default=None)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="page through chunks")
+    p_list.add_argument("--source", default=None, help="only this source_file")
+    p_list.add_argument("--page-size", type=int, default=100)
+    p_list.add_argument("--limit", type=int, default=None)
+    p_list.add_argument("--full", action="store_true", help="print whole chunks")
+
+    p_stats = sub.add_parser("stats", help="per-file counts, length histogram, norms, duplicates, size")
+    p_stats.add_argument("--source", default=None)
+    p_stats.add_argument("--page-size", type=int, default=500)
+
+    p_query = sub.add_parser("query", help="run a query with timings")
+    p_query.add_argument("text")
+    p_query.add_argument("-k", type=int, default=5)
+    p_query.add_argument("--source", default=None)
+    p_query.add_argument("--repeat", type=int, default=3)
+    p_query.add_argument("--backend", default=None, help="embedding backend (default: BEARNARD_EMBED or st-mpnet)")
+
+    args = parser.parse_args()
+    index = open_index(args.index, args.path)
+    {"list": cmd_list, "stats": cmd_stats, "query": cmd_query}[args.command](index, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,254 @@
+import os
+import time
 import platform
-from llama_cpp import Llama
+import threading
+from tuning import get_budget, llm_gpu_layers, LLM_MODEL_PATH
+
+# Speculative decoding: "lookup" drafts n-gram continuations from the prompt
+# (answers mostly copy phrases from the retrieved context), a path to a small
+# GGUF with the same vocabulary drafts with that model, "off" disables it.
+# Drafts are verified by one batched forward pass of the main model and a
+# token is only kept if the main model samples it anyway, so answers are
+# unchanged; only decode speed is.
+SPECULATIVE_MODE = os.environ.get("BEARNARD_SPECULATIVE", "lookup")
+DRAFT_TOKENS = 10
+LOOKUP_NGRAM = 2
+
+# Verifying a long draft costs more than decoding one token on CPU. When too
+# few drafted tokens are accepted, speculation is switched off for good.
+MIN_ACCEPTANCE = 0.15
+ACCEPTANCE_WARMUP = 200   # drafted tokens before the rate is trusted
+
+
+class _CountingDraft:
+    """Wraps a llama-cpp draft model and counts what it proposes."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.calls = 0
+        self.proposed = 0
+
+    def __call__(self, input_ids, /, **kwargs):
+        draft = self.inner(input_ids, **kwargs)
+        self.calls += 1
+        self.proposed += len(draft)
+        return draft
+
+
+class GGUFDraftModel:
+    """Greedy draft from a small GGUF (must share the main model's vocabulary)."""
+
+    def __init__(self, model_path: str, n_threads: int, num_pred_tokens: int = DRAFT_TOKENS):
+        import numpy as np
+        from llama_cpp import Llama
+        self._np = np
+        self.num_pred_tokens = num_pred_tokens
+        self.model = Llama(model_path=model_path, n_ctx=8192, n_threads=n_threads, verbose=False)
+
+    def __call__(self, input_ids, /, **kwargs):
+        out = []
+        # generate() keeps the longest common prefix, so the draft model only
+        # evaluates what was added since the last proposal
+        for token in self.model.generate(input_ids.tolist(), top_k=1, temp=0.0, reset=True):
+            out.append(token)
+            if len(out) >= self.num_pred_tokens or token == self.model.token_eos():
+                break
+        return self._np.array(out, dtype=self._np.intc)
+
+
+def make_draft_model(mode: str, n_threads: int):
+    """
+    Returns (draft model or None, description). Never raises: speculation is
+    optional. Built before the main model, which must be constructed with it.
+    """
+    if mode in ("", "off", "0", "none"):
+        return None, "off"
+    try:
+        if mode == "lookup":
+            from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+            return (LlamaPromptLookupDecoding(num_pred_tokens=DRAFT_TOKENS, max_ngram_size=LOOKUP_NGRAM),
+                    f"prompt lookup ({LOOKUP_NGRAM}-gram, {DRAFT_TOKENS} tokens)")
+        return GGUFDraftModel(mode, n_threads), f"draft model {os.path.basename(mode)}"
+    except Exception as e:
+        return None, f"off ({e})"
+
 
 class LLM:
-    def __init__(self):
+    def __init__(self, speculative: str = SPECULATIVE_MODE):
+        self.model = None
+        self.draft = None
+        self.speculative_mode = speculative
+        self.speculative = "off"
+        self.accepted = 0
+        self.drafted = 0
+        self.last_stats = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def load(self):
+        with self._lock:
+            if self.model is None:
+                self._load()
+
+    def unload(self):
+        """Frees the weights and KV cache; the next ask() loads them again."""
+        with self._lock:
+            if self.model is not None:
+                self.model.draft_model = None
+                close = getattr(self.model, "close", None)
+                if close:
+                    close()
+                self.model = None
+                self.draft = None
+
+    def drop_kv(self):
+        """Forgets the cached prompt; the next ask() prefills from scratch."""
+        with self._lock:
+            if self.model is not None:
+                self.model.reset()
+
+    def _load(self):
+        from llama_cpp import Llama
+
         system = platform.system()
-        
+
         ctx = 8192
+        budget = get_budget()
+        n_threads = budget.threads_for("llm")
+        n_batch = budget.llm_batch()
 
-        if system == "Darwin":  
+        if system == "Darwin":
             print("macOS detected – using Metal GPU acceleration")
-            self.model = Llama(
-                model_path="models/mistral-7b-instruct-v0.1.Q4_K_M.gguf",
-                n_ctx=ctx,
-                n_threads=6,
-                n_gpu_layers=-1
-            )
         elif system == "Windows":
             print("Windows detected")
-            self.model = Llama(
-                model_path="models/mistral-7b-instruct-v0.1.Q4_K_M.gguf",
-                n_ctx=ctx,
-                n_threads=8,
-                n_gpu_layers=0 
-            )
         else:
             print("Linux/Other detected")
-            self.model = Llama(
-                model_path="models/mistral-7b-instruct-v0.1.Q4_K_M.gguf",
-                n_ctx=ctx,
-                n_threads=6,
-                n_gpu_layers=0
-            )
-
-    def ask(self, prompt: str, max_tokens: int = 256) -> str: 
-        response = self.model(
+        n_gpu_layers = llm_gpu_layers()
+
+        start = time.perf_counter()
+        print(f"LLM threads={n_threads}, batch={n_batch}")
+        # The draft has to go to the constructor: that is where llama-cpp
+        # switches on logits for every position, which verifying a draft
+        # needs. Attached afterwards, it would check drafts against garbage.
+        draft, self.speculative = make_draft_model(self.speculative_mode, n_threads)
+        self.draft = _CountingDraft(draft) if draft is not None else None
+        self.model = Llama(
+            model_path=LLM_MODEL_PATH,
+            n_ctx=ctx,
+            n_threads=n_threads,
+            n_batch=n_batch,
+            n_gpu_layers=n_gpu_layers,
+            draft_model=self.draft
+        )
+        if isinstance(draft, GGUFDraftModel) and draft.model.n_vocab() != self.model.n_vocab():
+            self._disable_speculation(f"{os.path.basename(self.speculative_mode)} has a different vocabulary")
+            self.draft = None
+        print(f"LLM loaded in {time.perf_counter() - start:.1f}s, speculative decoding: {self.speculative}")
+
+    def count_tokens(self, text: str) -> int:
+        self.load()
+        return len(self.model.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+    def _reusable_prefix(self, prompt: str):
+        """(prompt tokens, how many of them are already in the KV cache)."""
+        tokens = self.model.tokenize(prompt.encode("utf-8"), special=True)
+        try:
+            from llama_cpp import Llama
+            return len(tokens), Llama.longest_token_prefix(self.model._input_ids.tolist(), tokens)
+        except Exception:
+            return len(tokens), 0
+
+    @property
+    def acceptance(self) -> float:
+        return self.accepted / self.drafted if self.drafted else 0.0
+
+    def _generate(self, prompt: str, max_tokens: int):
+        return self.model(
             prompt,
             max_tokens=max_tokens,
-            temperature=0.3,  
+            temperature=0.3,
             top_p=0.95,
             repeat_penalty=1.1,
-            stop=["[/INST]", "[INST]", "User:", "QUESTION:", "\n\n\n"]  
+            stop=["[/INST]", "[INST]", "User:", "QUESTION:", "\n\n\n"],
+            stream=True
         )
-        return response["choices"][0]["text"].strip()
\ No newline at end of file
+
+    def _disable_speculation(self, reason: str):
+        self.model.draft_model = None
+        self.speculative_mode = "off"
+        self.speculative = f"off ({reason})"
+
+    def stream(self, prompt: str, max_tokens: int = 256):
+        """
+        Yields the answer piece by piece (about one token each). Closing the
+        generator early stops decoding.
+        """
+        # llama-cpp-python keeps the longest common token prefix of the
+        # previous call in its KV cache, so a prompt that extends the last
+        # one only prefills the new tokens.
+        self.load()
+        n_prompt, reused = self._reusable_prefix(prompt)
+        self.last_stats = {"prompt_tokens": n_prompt, "reused_tokens": reused}
+
+        draft = self.draft if self.model.draft_model is not None else None
+        calls, proposed = (draft.calls, draft.proposed) if draft else (0, 0)
+        start = time.perf_counter()
+        pieces = self._generate(prompt, max_tokens)
+        n_out = 0
+        text = []
+        try:
+            while True:
+                try:
+                    chunk = next(pieces, None)
+                except Exception as e:
+                    if draft is None:
+                        raise
+                    # The prompt is plain text, so generation can resume from
+                    # what was already said; the KV cache still holds it.
+                    print(f"Speculative decoding failed ({e}); decoding normally from now on.")
+                    self._disable_speculation("failed")
+                    draft = None
+                    pieces.close()
+                    pieces = self._generate(prompt + "".join(text), max(max_tokens - n_out, 1))
+                    continue
+                if chunk is None:
+                    break
+                n_out += 1
+                piece = chunk["choices"][0]["text"]
+                text.append(piece)
+                yield piece
+        finally:
+            pieces.close()
+            self.last_stats["completion_tokens"] = n_out
+            self.last_stats["seconds"] = time.perf_counter() - start
+            if draft:
+                # Every verify pass keeps its accepted draft tokens plus the
+                # one token the main model sampled itself
+                drafted = draft.proposed - proposed
+                accepted = min(max(n_out - (draft.calls - calls), 0), drafted)
+                self.accepted += accepted
+                self.drafted += drafted
+                self.last_stats["drafted"] = drafted
+                self.last_stats["accepted"] = accepted
+                if self.drafted >= ACCEPTANCE_WARMUP and self.acceptance < MIN_ACCEPTANCE:
+                    print(f"Speculative acceptance {self.acceptance:.0%} < {MIN_ACCEPTANCE:.0%}; "
+                          f"decoding normally from now on.")
+                    self._disable_speculation(f"acceptance {self.acceptance:.0%}")
+
+    def ask(self, prompt: str, max_tokens: int = 256) -> str:
+        return "".join(self.stream(prompt, max_tokens=max_tokens)).strip()
+
+    def describe(self) -> str:
+        s = self.last_stats
+        if not s.get("seconds"):
+            return f"LLM: speculative {self.speculative}"
+        text = (f"LLM: {s['completion_tokens']} tokens in {s['seconds']:.2f}s "
+                f"({s['completion_tokens'] / s['seconds']:.1f} tok/s incl. prefill), speculative {self.speculative}")
+        if "drafted" in s:
+            text += (f", accepted {s['accepted']}/{s['drafted']} drafted "
+                     f"(overall {self.acceptance:.0%})")
+        return text
@@ -0,0 +1,51 @@
+import os
+import tracemalloc
+
+# tracemalloc slows allocation down, so it only runs when asked for
+ENABLED = os.environ.get("BEARNARD_TRACE_MEM", "0") == "1"
+
+
+class MemoryProbe:
+    """
+    Python/NumPy heap high-water mark for one block of work:
+
+        with MemoryProbe("interaction") as probe:
+            audio = ear.record_until_silence()
+            text = ear.transcribe(audio)
+        print(probe.describe())
+
+    NumPy reports its buffers to tracemalloc, so redundant float32 copies of
+    a recording show up directly in the peak. No-op unless
+    BEARNARD_TRACE_MEM=1 (or enabled=True).
+    """
+
+    def __init__(self, label: str, enabled: bool = None):
+        self.label = label
+        self.enabled = ENABLED if enabled is None else enabled
+        self.peak_bytes = 0
+        self.net_bytes = 0
+        self._started_here = False
+
+    def __enter__(self):
+        if self.enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_here = True
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak_bytes = peak - self._base
+            self.net_bytes = current - self._base
+            if self._started_here:
+                tracemalloc.stop()
+        return False
+
+    def describe(self) -> str:
+        if not self.enabled:
+            return f"{self.label}: memory tracing off (BEARNARD_TRACE_MEM=1)"
+        return (f"{self.label}: peak +{self.peak_bytes / 1e6:.1f} MB, "
+                f"retained {self.net_bytes / 1e6:+.1f} MB")
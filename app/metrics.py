@@ -0,0 +1,205 @@
+"""
+In-process metrics: counters, gauges and histograms in one registry, read
+by the GUI's live panel and served as Prometheus text on localhost.
+
+Hot paths only ever do a dict update under a per-metric lock (a few
+hundred nanoseconds, once per stage or turn, never per audio block).
+Numbers that already exist elsewhere (audio channel drops, TTS cache hits,
+RSS) are not copied on every change: such metrics take a `fn` that is
+called when somebody reads them.
+
+    registry.histogram("bearnard_stage_seconds", "Stage latency", label="stage").observe(0.4, "asr")
+    registry.gauge("bearnard_rss_bytes", "Resident memory", fn=lambda: rss())
+    serve(registry)   # http://127.0.0.1:9464/metrics
+"""
+import os
+import bisect
+import threading
+
+# Prometheus endpoint; port 0 turns it off. Bind to 0.0.0.0 (or the screen's
+# LAN address) to let a central Prometheus scrape every lobby screen.
+METRICS_PORT = int(os.environ.get("BEARNARD_METRICS_PORT", "9464"))
+METRICS_ADDR = os.environ.get("BEARNARD_METRICS_ADDR", "127.0.0.1")
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+
+def _format(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, label: str = None, fn=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        # fn() -> number, or {label value: number} for a labelled metric
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def values(self) -> dict:
+        if self.fn is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.fn()
+        return value if isinstance(value, dict) else {"": value}
+
+    def value(self, label: str = ""):
+        return self.values().get(label, 0)
+
+    def _series(self, label_value: str, extra: str = "") -> str:
+        parts = [f'{self.label}="{label_value}"'] if self.label else []
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_value, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{self._series(label_value)} {_format(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, label: str = ""):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, label: str = ""):
+        with self._lock:
+            self._values[label] = value
+
+
+class Histogram(_Metric):
+    """Fixed buckets; quantiles are interpolated within the bucket they fall in."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label: str = None, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, label)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, label: str = ""):
+        with self._lock:
+            series = self._values.get(label)
+            if series is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                series = self._values[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def values(self) -> dict:
+        with self._lock:
+            return {k: ([*v[0]], v[1], v[2]) for k, v in self._values.items()}
+
+    def count(self, label: str = "") -> int:
+        series = self.values().get(label)
+        return series[2] if series else 0
+
+    def quantile(self, q: float, label: str = "") -> float:
+        series = self.values().get(label)
+        if not series or not series[2]:
+            return 0.0
+        counts, _, total = series
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else lo * 2 or 1.0
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total_sum, total) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _format(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._series(label_value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._series(label_value)} {_format(total_sum)}")
+            lines.append(f"{self.name}_count{self._series(label_value)} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            elif "fn" in kwargs:
+                # Re-registration (e.g. a second Pipeline) points at the new source
+                metric.fn = kwargs["fn"]
+            return metric
+
+    def counter(self, name: str, help: str, label: str = None, fn=None) -> Counter:
+        return self._add(Counter, name, help, label, fn=fn)
+
+    def gauge(self, name: str, help: str, label: str = None, fn=None) -> Gauge:
+        return self._add(Gauge, name, help, label, fn=fn)
+
+    def histogram(self, name: str, help: str, label: str = None, buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram, name, help, label, buckets=buckets)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def serve(reg: Registry = registry, port: int = METRICS_PORT, addr: str = METRICS_ADDR):
+    """Serves GET /metrics on a daemon thread. Returns the server, or None if disabled."""
+    if not port:
+        return None
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = reg.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass   # one line per scrape would flood the console
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,630 @@
+"""
+Conversation pipeline shared by the CLI (main.py) and the GUI (gui.py).
+
+    capture -> endpoint -> asr -> retrieve -> generate -> speak
+    (wake)    (record)
+
+Every stage is an asyncio task reading its inbox, a bounded channel; the
+blocking work (audio, Whisper, chroma, llama.cpp) runs in worker threads.
+Stages overlap where the conversation allows it:
+
+  - generate streams the answer and hands each finished sentence to speak,
+    so sentence N plays while sentence N+1 is generated
+  - capture is re-armed as soon as the answer is generated, while it is
+    still playing: the wake stream runs, transcription waits for silence,
+    and talking over Bearnard (barge-in) goes straight to recording
+
+The front-ends only load the pipeline, feed it text / taps / mode changes
+and present what a PipelineListener receives.
+
+Inbox depth and worker count per stage come from STAGE_DEFAULTS and can be
+overridden with BEARNARD_PIPELINE, e.g. "speak.depth=4,retrieve.workers=2".
+describe() reports per-stage throughput, busy time and queue depths; the
+same numbers, stage latencies and turn timings go to metrics.registry
+(GUI panel, Prometheus endpoint).
+"""
+import os
+import time
+import asyncio
+import itertools
+import threading
+import traceback
+import collections
+
+import asr
+from state import State
+from voice_input import VoiceInput
+from voice_output import VoiceOutput, SENTENCE_SPLIT
+from wake_word import WakeWordDetector
+from barge_in import BargeInDetector
+from tts_cache import load_phrase_list
+from memprobe import MemoryProbe
+from tuning import ensure_tuned
+from audio_channel import all_channels, loss_counters
+from session import ConversationSession, SYSTEM_PROMPT
+from governor import IdleGovernor, register_models, current_rss_mb
+import metrics
+import profiler
+
+RETRIEVE_CANDIDATES = 15
+
+STAGES = ["endpoint", "asr", "retrieve", "generate", "speak"]   # capture is the source
+STAGE_DEFAULTS = {
+    "endpoint": {"depth": 1, "workers": 1},
+    "asr":      {"depth": 2, "workers": 1},
+    "retrieve": {"depth": 2, "workers": 1},
+    "generate": {"depth": 2, "workers": 1},
+    "speak":    {"depth": 8, "workers": 1},
+}
+# One mic, one model, one speaker: these stages keep order with one worker
+ORDERED_STAGES = {"endpoint", "generate", "speak"}
+
+
+def answer_token_limit(question: str) -> int:
+    return 1024 if "list" in question.lower() else 512
+
+
+def stage_config(spec: str = None) -> dict:
+    """STAGE_DEFAULTS with "stage.depth=N" / "stage.workers=N" overrides applied."""
+    config = {name: dict(values) for name, values in STAGE_DEFAULTS.items()}
+    spec = os.environ.get("BEARNARD_PIPELINE", "") if spec is None else spec
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.partition("=")
+        stage, _, field = key.strip().partition(".")
+        if stage not in config or field not in ("depth", "workers"):
+            raise ValueError(f"Unknown pipeline setting: {item}")
+        config[stage][field] = max(1, int(value))
+    for stage in ORDERED_STAGES:
+        config[stage]["workers"] = 1
+    return config
+
+
+class Channel:
+    """Bounded asyncio queue between two stages, with depth / back-pressure stats."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = asyncio.Queue(maxsize)
+        self.puts = 0
+        self.max_depth = 0
+        self.blocked = 0.0   # seconds producers waited for room
+
+    async def put(self, item):
+        start = time.perf_counter()
+        await self._queue.put(item)
+        self.blocked += time.perf_counter() - start
+        self.puts += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    async def get(self):
+        return await self._queue.get()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+
+class StageStats:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.errors = 0
+        self.active = 0
+        self.busy = 0.0
+
+
+class Job:
+    """One question travelling through the stages."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, source: str, text: str = ""):
+        self.id = next(Job._ids)
+        self.source = source          # "voice" or "text"
+        self.text = text
+        self.audio = None
+        self.docs = []
+        self.answer = ""
+        self.cancelled = False        # barge-in: stop generating / speaking it
+        self.started = time.perf_counter()
+        self.marks = {}               # stage -> seconds since start when it finished
+
+    def mark(self, stage: str):
+        self.marks[stage] = time.perf_counter() - self.started
+
+    def describe(self) -> str:
+        steps = ", ".join(f"{k} {v:.2f}s" for k, v in self.marks.items())
+        return f"Turn {self.id} ({self.source}): {steps}"
+
+
+class PipelineListener:
+    """
+    What a front-end gets to see. May be called from any thread. The
+    defaults print, which is all the CLI needs.
+    """
+
+    def on_state(self, state: State):
+        pass
+
+    def on_log(self, text: str, tag: str = "INFO"):
+        print(f"[{tag}] {text}")
+
+    def on_wake_transcript(self, text: str):
+        pass
+
+    def on_heard(self, text: str):
+        print(f"You said: {text}")
+
+    def on_answer(self, text: str):
+        print(f"\nBearnard: {text}\n")
+
+    def on_envelope(self, envelope, hop: float):
+        pass
+
+    def on_power(self, idle: bool):
+        pass
+
+
+class Pipeline:
+    def __init__(self, mic_index=None, listener: PipelineListener = None, mode: str = "voice",
+                 use_mic: bool = True, config: dict = None, rearm_during_playback: bool = True):
+        self.mic_index = mic_index
+        self.listener = listener or PipelineListener()
+        self.mode = mode
+        self.use_mic = use_mic
+        self.config = config or stage_config()
+        self.rearm_during_playback = rearm_during_playback
+
+        self.turn_done = threading.Event()   # set whenever a turn has been fully answered
+        self._texts = collections.deque()
+        self._manual = threading.Event()
+        self._barge_job = None
+        self._speaking = None       # job whose answer is being played
+        self._audio_loss = {}
+        self._loop = None
+        self._stopped = None
+        self.channels = {}
+        self.stats = {}
+        self.metrics_server = None
+
+    # --- FRONT-END API (thread-safe) ---
+
+    def set_mode(self, mode: str):
+        self.mode = mode
+
+    def submit_text(self, text: str):
+        self.turn_done.clear()
+        self._texts.append(text)
+
+    def trigger(self):
+        """Tap to speak: record right away, cutting Bearnard off if he is talking."""
+        self._manual.set()
+        mouth = getattr(self, "mouth", None)
+        if mouth and mouth.is_busy:
+            mouth.stop()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    # --- LOADING ---
+
+    def load(self):
+        """Loads every model and device. Blocking; call before run()."""
+        from rag import Rag
+        from llm import LLM
+
+        log = self.listener.on_log
+        self.listener.on_state(State.LOADING)
+        print(f"Loading Models... (Mic Index: {self.mic_index})")
+
+        budget = ensure_tuned()
+        log(budget.describe(), "SYS")
+
+        # ENGINE SELECTION LOGIC
+        # Each stage gets the most accurate engine that meets its latency
+        # target on this host. Same name -> same shared instance.
+        wake_name = asr.select_engine("wake")
+        query_name = asr.select_engine("query")
+        log(f"ASR engines: wake={wake_name}, query={query_name}", "SYS")
+        wake_engine = asr.acquire(wake_name)
+        query_engine = asr.acquire(query_name)
+
+        self.rag = Rag(build_if_empty=True)
+        try:
+            self.llm = LLM()
+        except Exception as e:
+            log(f"LLM Error: {e}", "ERROR")
+            self.llm = None
+        self.session = ConversationSession(self.llm, SYSTEM_PROMPT)
+
+        self.ear = VoiceInput(engine=query_engine, device=self.mic_index)
+        self.wake = WakeWordDetector(engine=wake_engine, device=self.mic_index)
+        self.mouth = VoiceOutput()
+        self.mouth.prewarm(load_phrase_list())
+        self.barge_in = BargeInDetector(device=self.mic_index, reference=self.mouth.current_level)
+        self.barge_in.on_barge_in = self._on_barge_in
+        self.mouth.on_playback_start = self._on_playback_start
+        self.mouth.on_playback_end = self.barge_in.disarm
+        self.wake.suppress = lambda: self.mouth.is_busy
+
+        self.governor = IdleGovernor(log=lambda msg: log(msg, "POWER"))
+        register_models(self.governor, llm=self.llm, query_engine=query_engine, wake_engine=wake_engine,
+                        embedder=self.rag.emb, session=self.session)
+        self.governor.on_change.append(self.wake.set_low_power)
+        self.governor.on_change.append(self.listener.on_power)
+        self._register_metrics()
+        profiler.control.tag = self.current_stage
+        profiler.control.log = lambda msg: log(msg, "PROFILE")
+
+        if self.use_mic:
+            self.listener.on_state(State.CALIBRATING)
+            log("Calibrating Microphone...", "CALIB")
+            self.ear.adjust_for_ambient_noise()
+            self.wake.energy_threshold = self.ear.silence_threshold
+            self.barge_in.threshold = self.ear.silence_threshold * 2
+            log(f"VAD Threshold Synced: {self.wake.energy_threshold:.4f}", "SYS")
+
+        try:
+            self.metrics_server = metrics.serve()
+            if self.metrics_server:
+                host, port = self.metrics_server.server_address[:2]
+                log(f"Metrics at http://{host}:{port}/metrics", "SYS")
+        except OSError as e:
+            log(f"Metrics endpoint off: {e}", "SYS")
+        try:
+            if profiler.control.serve():
+                log(f"Profiler control on 127.0.0.1:{profiler.CONTROL_PORT}", "SYS")
+        except OSError as e:
+            log(f"Profiler control socket off: {e}", "SYS")
+
+        self.listener.on_state(State.IDLE)
+        log("AI Ready.", "READY")
+
+    def _register_metrics(self, reg: metrics.Registry = metrics.registry):
+        # Pushed from the stages (once per item / turn)
+        self._m_stage = reg.histogram("bearnard_stage_seconds", "Time a stage spent on one item", "stage")
+        self._m_response = reg.histogram("bearnard_response_seconds",
+                                         "End of question to first answer sentence ready", "source")
+        self._m_turn = reg.histogram("bearnard_turn_seconds", "Whole turn, wake to end of playback", "source")
+        self._m_turns = reg.counter("bearnard_turns_total", "Answered turns", "source")
+        self._m_tokens = reg.counter("bearnard_llm_tokens_total", "Generated tokens")
+        self._m_tps = reg.gauge("bearnard_llm_tokens_per_second", "Decode rate of the last answer (incl. prefill)")
+        self._m_reuse = reg.gauge("bearnard_llm_kv_reuse_ratio", "Share of the last prompt reused from the KV cache")
+
+        # Pulled when read: these counters already exist elsewhere
+        stats = lambda field: (lambda: {n: getattr(st, field) for n, st in self.stats.items()})
+        reg.counter("bearnard_stage_errors_total", "Items a stage failed on", "stage", fn=stats("errors"))
+        reg.counter("bearnard_stage_busy_seconds_total", "Time a stage spent working", "stage", fn=stats("busy"))
+        reg.gauge("bearnard_queue_depth", "Items waiting in a stage's inbox", "stage",
+                  fn=lambda: {n: ch.depth for n, ch in self.channels.items()})
+        reg.gauge("bearnard_queue_capacity", "Size of a stage's inbox", "stage",
+                  fn=lambda: {n: ch.maxsize for n, ch in self.channels.items()})
+        reg.counter("bearnard_queue_blocked_seconds_total", "Time producers waited for room", "stage",
+                    fn=lambda: {n: ch.blocked for n, ch in self.channels.items()})
+        reg.counter("bearnard_audio_dropped_blocks_total", "Audio blocks dropped by a full channel", "channel",
+                    fn=lambda: {ch.name: ch.dropped for ch in all_channels()})
+        reg.counter("bearnard_audio_overflows_total", "PortAudio input overflows", "channel",
+                    fn=lambda: {ch.name: ch.overflows for ch in all_channels()})
+        reg.counter("bearnard_tts_cache_hits_total", "Sentences played from the TTS cache",
+                    fn=lambda: self.mouth.cache.hits)
+        reg.counter("bearnard_tts_cache_misses_total", "Sentences synthesised",
+                    fn=lambda: self.mouth.cache.misses)
+        reg.gauge("bearnard_tts_cache_hit_ratio", "TTS cache hit rate",
+                  fn=lambda: self.mouth.cache.stats()["hit_rate"])
+        reg.gauge("bearnard_llm_speculative_acceptance_ratio", "Accepted / drafted tokens",
+                  fn=lambda: self.llm.acceptance if self.llm else 0.0)
+        reg.gauge("bearnard_idle", "1 while the kiosk is in idle mode", fn=lambda: int(self.governor.idle))
+        reg.gauge("bearnard_process_resident_memory_bytes", "Resident set size",
+                  fn=lambda: int(current_rss_mb() * (1 << 20)))
+        self.metrics = reg
+
+    # --- RUNNING ---
+
+    async def run(self):
+        """Runs the stages until stop()."""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._turn_free = asyncio.Event()
+        self._turn_free.set()
+        self.channels = {name: Channel(name, cfg["depth"]) for name, cfg in self.config.items()}
+        self.stats = {name: StageStats(name, cfg["workers"]) for name, cfg in self.config.items()}
+        handlers = {"endpoint": self._endpoint, "asr": self._asr, "retrieve": self._retrieve,
+                    "generate": self._generate, "speak": self._speak}
+
+        tasks = [asyncio.create_task(self._capture(), name="capture")]
+        for name in STAGES:
+            for i in range(self.config[name]["workers"]):
+                tasks.append(asyncio.create_task(self._run_stage(name, handlers[name]), name=f"{name}-{i}"))
+        try:
+            await self._stopped.wait()
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.mouth.stop()
+            self.wake.stop_stream()
+
+    async def _run_stage(self, name: str, handler):
+        inbox, stats = self.channels[name], self.stats[name]
+        while True:
+            item = await inbox.get()
+            stats.active += 1
+            start = time.perf_counter()
+            try:
+                await handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.errors += 1
+                traceback.print_exc()
+                self.listener.on_log(f"{name} failed: {e}", "ERROR")
+                self._end_turn()
+            finally:
+                elapsed = time.perf_counter() - start
+                stats.active -= 1
+                stats.processed += 1
+                stats.busy += elapsed
+                self._m_stage.observe(elapsed, name)
+
+    def _end_turn(self):
+        """Lets capture take the next question and tells waiting front-ends."""
+        self._turn_free.set()
+        self.turn_done.set()
+        self.listener.on_state(State.IDLE)
+
+    # --- STAGES ---
+
+    async def _capture(self):
+        while True:
+            await self._turn_free.wait()
+
+            if self._texts:
+                text = self._texts.popleft()
+                self.listener.on_log(f"User typed: {text}", "CHAT")
+                self.governor.wake()
+                self._turn_free.clear()
+                await self.channels["retrieve"].put(Job("text", text))
+                continue
+
+            if self.mode != "voice":
+                await asyncio.to_thread(self.governor.poll)
+                await asyncio.sleep(0.1)
+                continue
+
+            if not self.rearm_during_playback and self.mouth.is_busy:
+                await asyncio.sleep(0.05)
+                continue
+
+            heard = await asyncio.to_thread(self.wake.listen_for_wake_word, 0.1,
+                                            self.listener.on_wake_transcript)
+            self._check_audio_loss()
+            if self.session.expired():
+                self.session.reset()
+                self.listener.on_log("No wake word for a while, conversation cleared.", "SESSION")
+
+            if heard or self._manual.is_set():
+                self._manual.clear()
+                self.wake.stop_stream()
+                # Idle mode released the models: reload them while the user talks
+                self.governor.wake()
+                # Query model loads (first time only) while the user is still talking
+                self.ear.engine.preload()
+                if heard:
+                    self.listener.on_log("Wake Word Detected!", "WAKE")
+                self._turn_free.clear()
+                await self.channels["endpoint"].put(Job("voice"))
+            else:
+                await asyncio.to_thread(self.governor.poll)
+
+    async def _endpoint(self, job: Job):
+        self.listener.on_state(State.LISTENING)
+        self.listener.on_log("Recording...", "REC")
+        with MemoryProbe("Record") as probe:
+            # The recording buffer is reused by the next question, which can
+            # only start after this one has been transcribed and answered
+            job.audio = await asyncio.to_thread(self.ear.record_until_silence)
+        if probe.enabled:
+            self.listener.on_log(probe.describe(), "PERF")
+        job.mark("endpoint")
+        await self.channels["asr"].put(job)
+
+    async def _asr(self, job: Job):
+        self.listener.on_state(State.THINKING)
+        self.listener.on_log("Transcribing...", "PROC")
+        self._check_audio_loss()
+        with MemoryProbe("Transcribe") as probe:
+            job.text = await asyncio.to_thread(self.ear.transcribe, job.audio)
+        if probe.enabled:
+            self.listener.on_log(probe.describe(), "PERF")
+        job.audio = None
+        job.mark("asr")
+
+        if not job.text.strip():
+            self.listener.on_log("Heard nothing.", "INFO")
+            self._end_turn()
+            return
+        self.listener.on_log(f"Heard: '{job.text}'", "VOICE")
+        self.listener.on_heard(job.text)
+        await self.channels["retrieve"].put(job)
+
+    async def _retrieve(self, job: Job):
+        self.listener.on_state(State.THINKING)
+        if self.session.expired():
+            self.listener.on_log("Idle timeout, starting a new conversation.", "SESSION")
+            self.session.reset()
+        await asyncio.to_thread(self.governor.wait_ready)
+        query = self.session.retrieval_query(job.text)
+        job.docs = await asyncio.to_thread(self.rag.search, query, RETRIEVE_CANDIDATES)
+
+        if job.docs:
+            print(f"\n [CONTEXT] Found {len(job.docs)} relevant documents:")
+            for i, doc in enumerate(job.docs, 1):
+                snippet = doc[:100].replace("\n", " ")
+                print(f"  [{i}] {snippet}..." if len(doc) > 100 else f"  [{i}] {doc}")
+            print()
+        else:
+            print(" [CONTEXT] No relevant documents found.\n")
+        job.mark("retrieve")
+        await self.channels["generate"].put(job)
+
+    def _stream_sentences(self, job: Job):
+        """Worker thread: generates the answer and posts each finished sentence to speak."""
+        speak = self.channels["speak"]
+        pieces = self.session.ask_stream(job.text, job.docs, max_tokens=answer_token_limit(job.text))
+        parts, pending = [], ""
+        try:
+            for piece in pieces:
+                if job.cancelled:
+                    break
+                parts.append(piece)
+                pending += piece
+                sentences = SENTENCE_SPLIT.split(pending.lstrip())
+                for sentence in sentences[:-1]:
+                    if "first sentence" not in job.marks:
+                        job.mark("first sentence")
+                    # Blocks this thread (not the loop) while speak is full
+                    asyncio.run_coroutine_threadsafe(speak.put((job, sentence)), self._loop).result()
+                pending = sentences[-1]
+        finally:
+            pieces.close()
+        if pending.strip() and not job.cancelled:
+            asyncio.run_coroutine_threadsafe(speak.put((job, pending.strip())), self._loop).result()
+        return "".join(parts).strip()
+
+    async def _generate(self, job: Job):
+        self.listener.on_state(State.THINKING)
+        try:
+            job.answer = await asyncio.to_thread(self._stream_sentences, job)
+        except Exception as e:
+            print(f"Error generating response: {e}")
+        job.mark("generate")
+        if job.answer:
+            self._record_answer(job)
+            self.listener.on_answer(job.answer)
+            self.listener.on_log(self.session.describe(), "PERF")
+            self.listener.on_log(self.llm.describe(), "PERF")
+        await self.channels["speak"].put((job, None))
+        # Re-arm capture while the answer is still playing
+        self._turn_free.set()
+
+    async def _speak(self, item):
+        job, sentence = item
+        if sentence is not None:
+            if not job.cancelled:
+                self._speaking = job
+                self.mouth.say(sentence)
+            return
+
+        # End of this answer: wait for playback, then tidy up
+        await asyncio.to_thread(self.mouth.wait)
+        self._speaking = None
+        self.wake.clear_buffer()
+        self.governor.touch()
+        job.mark("speak")
+        self._m_turn.observe(job.marks["speak"], job.source)
+        self.turn_done.set()
+        if self._turn_free.is_set():
+            self.listener.on_state(State.IDLE)
+        self.listener.on_log(job.describe(), "PERF")
+        self.listener.on_log(self.mouth.cache.describe(), "PERF")
+        self.listener.on_log(self.describe(), "PERF")
+
+        # User talked over us: skip the wake word and listen right away
+        if self._barge_job is job:
+            self._barge_job = None
+            self.listener.on_log("Barge-in: user interrupted, listening.", "INPUT")
+            self._manual.set()
+
+    # --- CALLBACKS (audio / TTS threads) ---
+
+    def _on_playback_start(self, utterance):
+        # Called from the TTS playback thread for every sentence
+        if self.mode == "voice":
+            self.barge_in.arm()
+        self.listener.on_state(State.SPEAKING)
+        self.listener.on_envelope(utterance.envelope, utterance.hop)
+
+    def _on_barge_in(self):
+        # Called from the audio callback thread: just flag and cut playback
+        job = self._speaking
+        if job is not None:
+            job.cancelled = True
+            self._barge_job = job
+        self.mouth.stop()
+
+    def _check_audio_loss(self):
+        """Logs a warning whenever a capture channel dropped blocks or overflowed."""
+        current = loss_counters()
+        if current != self._audio_loss:
+            for ch in all_channels():
+                if current.get(ch.name, 0) > self._audio_loss.get(ch.name, 0):
+                    self.listener.on_log(f"Audio lost! {ch.describe()}", "AUDIO")
+            self._audio_loss = current
+
+    # --- OBSERVABILITY ---
+
+    def _record_answer(self, job: Job):
+        self._m_turns.inc(1, job.source)
+        if "first sentence" in job.marks:
+            self._m_response.observe(job.marks["first sentence"] - job.marks.get("endpoint", 0.0), job.source)
+        s = self.llm.last_stats
+        self._m_tokens.inc(s.get("completion_tokens", 0))
+        if s.get("seconds"):
+            self._m_tps.set(s["completion_tokens"] / s["seconds"])
+        if s.get("prompt_tokens"):
+            self._m_reuse.set(s["reused_tokens"] / s["prompt_tokens"])
+
+    def current_stage(self) -> str:
+        """Stages working right now, e.g. "generate+speak"; "capture" while only listening."""
+        busy = [name for name, st in self.stats.items() if st.active]
+        return "+".join(busy) if busy else ("capture" if self._loop is not None else "loading")
+
+    def metrics_panel(self) -> str:
+        """A few lines for an operator: stage latencies, LLM rate, queues, audio loss, cache, memory."""
+        m = getattr(self, "metrics", None)
+        if m is None:
+            return "Loading..."
+        stage = m.get("bearnard_stage_seconds")
+        timed = [n for n in STAGES if stage.count(n)]
+        lines = ["Stages   " + ("  ".join(f"{n} {stage.quantile(0.5, n):.2f}/{stage.quantile(0.95, n):.2f}s"
+                                         for n in timed) + "  (p50/p95)" if timed else "-")]
+        response = m.get("bearnard_response_seconds")
+        turns = sum(response.count(src) for src in ("voice", "text"))
+        lines.append("Answer   " + "  ".join(
+            f"{src} p50 {response.quantile(0.5, src):.2f}s p95 {response.quantile(0.95, src):.2f}s"
+            for src in ("voice", "text") if response.count(src)) + f"  to first sentence, {turns} turns")
+        lines.append(f"LLM      {m.get('bearnard_llm_tokens_per_second').value():.1f} tok/s, "
+                     f"KV reuse {m.get('bearnard_llm_kv_reuse_ratio').value():.0%}, "
+                     f"speculative {m.get('bearnard_llm_speculative_acceptance_ratio').value():.0%}")
+        depth, cap = m.get("bearnard_queue_depth").values(), m.get("bearnard_queue_capacity").values()
+        lines.append("Queues   " + "  ".join(f"{n} {depth[n]}/{cap[n]}" for n in depth))
+        dropped = m.get("bearnard_audio_dropped_blocks_total").values()
+        overflows = m.get("bearnard_audio_overflows_total").values()
+        lines.append("Audio    " + "  ".join(f"{n} dropped {dropped[n]} overflow {overflows.get(n, 0)}"
+                                             for n in dropped))
+        lines.append(f"TTS      cache {m.get('bearnard_tts_cache_hit_ratio').value():.0%} hits    "
+                     f"RSS {current_rss_mb():.0f} MB, {'IDLE' if self.governor.idle else 'ACTIVE'}")
+        return "\n".join(lines)
+
+    def snapshot(self) -> dict:
+        """Per-stage counters and queue depths."""
+        return {
+            name: {
+                "workers": st.workers, "processed": st.processed, "errors": st.errors,
+                "active": st.active, "busy_s": st.busy,
+                "depth": self.channels[name].depth, "max_depth": self.channels[name].max_depth,
+                "capacity": self.channels[name].maxsize, "blocked_s": self.channels[name].blocked,
+            }
+            for name, st in self.stats.items()
+        }
+
+    def describe(self) -> str:
+        parts = []
+        for name, s in self.snapshot().items():
+            parts.append(f"{name} x{s['workers']}: {s['processed']} done, busy {s['busy_s']:.1f}s, "
+                         f"queue {s['depth']}/{s['capacity']} (max {s['max_depth']}, "
+                         f"blocked {s['blocked_s']:.1f}s)")
+        return "Pipeline: " + "; ".join(parts)
@@ -0,0 +1,238 @@
+"""
+On-demand sampling profiler for a running kiosk.
+
+Every 1/PROFILE_HZ seconds a background thread snapshots the Python stack of
+every thread (sys._current_frames: the Qt main thread, the AI worker, the
+asyncio loop, TTS playback, audio callbacks while they run Python) and
+counts identical stacks. Nothing is traced, so the profiled code runs at
+full speed; the cost is the sampler's own walk of a few dozen frames.
+
+Each sample is tagged with the pipeline stage(s) busy at that moment, so
+"stage:retrieve" stacks show what Rag.search spends its time on under real
+load. Output goes to PROFILE_DIR as either:
+  - collapsed stacks ("stage:asr;thread:MainThread;file.py:func:line;... 42"),
+    for flamegraph.pl / speedscope / inferno
+  - speedscope JSON (one sampled profile per thread, https://speedscope.app)
+
+Ways to start one while the kiosk runs:
+  - kill -USR1 <pid>                      (POSIX; PROFILE_SECONDS, collapsed)
+  - Ctrl+Shift+P in any GUI window        (hidden shortcut)
+  - echo "profile 30 speedscope" | nc 127.0.0.1 9465
+                                          (BEARNARD_CONTROL_PORT, 0 = off)
+"""
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import datetime
+
+PROFILE_HZ = float(os.environ.get("BEARNARD_PROFILE_HZ", "100"))
+PROFILE_SECONDS = float(os.environ.get("BEARNARD_PROFILE_SECONDS", "20"))
+PROFILE_DIR = os.environ.get("BEARNARD_PROFILE_DIR", "profiles")
+CONTROL_PORT = int(os.environ.get("BEARNARD_CONTROL_PORT", "9465"))
+MAX_STACK_DEPTH = 128
+
+FORMATS = ("collapsed", "speedscope")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """Samples every thread's stack for `seconds`, then writes one file."""
+
+    def __init__(self, seconds: float = PROFILE_SECONDS, hz: float = PROFILE_HZ, fmt: str = "collapsed",
+                 tag=None, out_dir: str = PROFILE_DIR):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format: {fmt} (known: {', '.join(FORMATS)})")
+        self.seconds = seconds
+        self.interval = 1.0 / hz
+        self.fmt = fmt
+        self.tag = tag            # tag() -> current pipeline stage(s), e.g. "generate+speak"
+        self.out_dir = out_dir
+        self.stacks = {}          # (stage, thread name, frames root first) -> samples
+        self.samples = 0
+        self.sample_cost = 0.0    # seconds the sampler itself spent walking stacks
+        self.path = None
+
+    def _sample(self, own_ident: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stage = "-"
+        if self.tag is not None:
+            try:
+                stage = self.tag() or "-"
+            except Exception:
+                pass
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            frames = []
+            while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                frames.append(_frame_name(frame))
+                frame = frame.f_back
+            key = (stage, names.get(ident, f"thread-{ident}"), tuple(reversed(frames)))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def run(self) -> str:
+        """Blocks for `seconds`, then writes the profile and returns its path."""
+        own = threading.get_ident()
+        deadline = time.perf_counter() + self.seconds
+        next_at = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            self._sample(own)
+            self.sample_cost += time.perf_counter() - now
+            next_at += self.interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_at = time.perf_counter()   # fell behind: don't burst to catch up
+        return self.write()
+
+    def write(self) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        ext = "collapsed.txt" if self.fmt == "collapsed" else "speedscope.json"
+        self.path = os.path.join(self.out_dir, f"bearnard-{os.getpid()}-{stamp}.{ext}")
+        with open(self.path, "w", encoding="utf-8") as fh:
+            if self.fmt == "collapsed":
+                for (stage, thread, frames), n in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+                    fh.write(";".join((f"stage:{stage}", f"thread:{thread}") + frames) + f" {n}\n")
+            else:
+                json.dump(self._speedscope(), fh)
+        return self.path
+
+    def _speedscope(self) -> dict:
+        frames, index = [], {}
+
+        def frame_id(name):
+            if name not in index:
+                index[name] = len(frames)
+                frames.append({"name": name})
+            return index[name]
+
+        per_thread = {}
+        for (stage, thread, stack), n in self.stacks.items():
+            ids = [frame_id(f"stage:{stage}")] + [frame_id(f) for f in stack]
+            samples, weights = per_thread.setdefault(thread, ([], []))
+            samples.append(ids)
+            weights.append(n * self.interval)
+        profiles = [{
+            "type": "sampled", "name": thread, "unit": "seconds",
+            "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+        } for thread, (samples, weights) in sorted(per_thread.items())]
+        return {"$schema": "https://www.speedscope.app/file-format-schema.json",
+                "shared": {"frames": frames}, "profiles": profiles,
+                "name": f"Bearnard {datetime.datetime.now():%Y-%m-%d %H:%M}", "exporter": "bearnard"}
+
+    def describe(self) -> str:
+        per_sample = self.sample_cost / self.samples * 1000 if self.samples else 0.0
+        return (f"Profile: {self.samples} samples over {self.seconds:.0f}s, {len(self.stacks)} distinct stacks, "
+                f"{per_sample:.2f} ms per sample -> {self.path}")
+
+
+class ProfilerControl:
+    """
+    One profile at a time, started from any thread. The pipeline sets `tag`
+    and `log`; the front-ends install the signal handler / shortcut.
+    """
+
+    def __init__(self):
+        self.tag = None
+        self.log = lambda msg: print(f"[PROFILE] {msg}")
+        self.current = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def running(self) -> bool:
+        return self.current is not None
+
+    def start(self, seconds: float = PROFILE_SECONDS, fmt: str = "collapsed", done=None):
+        """Starts a profile in the background; returns False if one is already running."""
+        with self._lock:
+            if self.current is not None:
+                return False
+            prof = self.current = SamplingProfiler(seconds, fmt=fmt, tag=self.tag)
+        threading.Thread(target=self._run, args=(prof, done), name="profiler", daemon=True).start()
+        self.log(f"Sampling all threads for {seconds:.0f}s at {PROFILE_HZ:.0f} Hz ({fmt})...")
+        return True
+
+    def _run(self, prof: SamplingProfiler, done):
+        try:
+            prof.run()
+            self.log(prof.describe())
+        except Exception as e:
+            self.log(f"Profile failed: {e}")
+        finally:
+            with self._lock:
+                self.current = None
+            if done is not None:
+                done(prof)
+
+    def install_signal(self) -> bool:
+        """SIGUSR1 starts a profile. Must be called from the main thread; no-op on Windows."""
+        import signal
+        if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+            return False
+        # The handler runs on the main thread between two bytecodes, possibly
+        # inside start() itself; hand off instead of taking the lock there
+        signal.signal(signal.SIGUSR1,
+                      lambda signum, frame: threading.Thread(target=self.start, daemon=True).start())
+        return True
+
+    def serve(self, port: int = CONTROL_PORT):
+        """
+        Line-based control socket on localhost:
+            profile [seconds] [collapsed|speedscope]  -> path of the written file
+            status                                     -> idle / running
+        """
+        if not port or self._server is not None:
+            return None
+        server = socket.create_server(("127.0.0.1", port))
+        self._server = server
+        threading.Thread(target=self._accept, args=(server,), name="profiler-control", daemon=True).start()
+        return server
+
+    def _accept(self, server):
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn, conn.makefile("rw", encoding="utf-8") as fh:
+            words = (fh.readline().strip().split() or ["status"])
+            if words[0] == "status":
+                fh.write(("running" if self.running else "idle") + "\n")
+            elif words[0] == "profile":
+                try:
+                    seconds = float(words[1]) if len(words) > 1 else PROFILE_SECONDS
+                    fmt = words[2] if len(words) > 2 else "collapsed"
+                    if fmt not in FORMATS:
+                        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+                except ValueError as e:
+                    fh.write(f"error: {e}\n")
+                    return
+                finished = threading.Event()
+                result = []
+                if not self.start(seconds, fmt, done=lambda prof: (result.append(prof.path), finished.set())):
+                    fh.write("error: a profile is already running\n")
+                    return
+                finished.wait()
+                fh.write(f"{result[0] or 'error: profile failed'}\n")
+            else:
+                fh.write("error: commands are 'profile [seconds] [collapsed|speedscope]' and 'status'\n")
+
+
+control = ProfilerControl()
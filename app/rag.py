@@ -1,13 +1,17 @@
-from sentence_transformers import SentenceTransformer
-import chromadb
 import os
+import time
 import hashlib
-import pypdf
-from typing import List
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List
+from tuning import apply_torch_threads
+from dedup import ChunkDeduper
 
 CHROMA_PATH = "chroma_db"
 COLLECTION_NAME = "school"
 EMBED_MODEL = "sentence-transformers/all-mpnet-base-v2"
+# Query/ingest encoder; BEARNARD_EMBED picks another registered backend
+DEFAULT_EMBED_BACKEND = "st-mpnet"
+ONNX_DIR = "models/onnx"
 DATA_FOLDER = "data"
 
 # Using the larger chunk size (1000) from your fallback code 
@@ -15,58 +19,518 @@ DATA_FOLDER = "data"
 CHUNK_SIZE = 1000   
 OVERLAP = 200         
 
+# Rag.search: fetch n_results candidates, keep the best MAX_CONTEXT_DOCS
+# within STRICT_DISTANCE, else everything within FALLBACK_DISTANCE.
+# Measure changes with bench/retrieval.py.
+STRICT_DISTANCE = 1.5
+FALLBACK_DISTANCE = 1.8
+MAX_CONTEXT_DOCS = 5
+
+# Written next to the index: which chunks dedup dropped or cleaned, and why
+PROVENANCE_FILE = "provenance.jsonl"
+
+# Chunks per collection.add() call (capped by the client's own limit)
+INDEX_WRITE_BATCH = 1000
+# Ingestion holds at most this many encode batches of chunks at a time; they
+# are length-sorted within the window to cut padding.
+EMBED_WINDOW_BATCHES = 8
+# Text files are read in pieces of this many characters
+TEXT_READ_SIZE = 1 << 16
+
 def _chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP) -> List[str]:
     """
     SMART CHUNKER: Splits by 'blocks' (double newlines) first.
     This keeps headers (LOCATION:) attached to their contents.
     """
-    # 1. Normalize line endings
-    text = text.replace("\r\n", "\n")
-    
-    # 2. Split by empty lines (Double Newline = New Block)
-    blocks = text.split("\n\n")
-    
-    chunks = []
-    for block in blocks:
-        block = block.strip()
+    return list(_iter_chunks([text], chunk_size, overlap))
+
+def _iter_chunks(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP) -> Iterator[str]:
+    """
+    Streaming form of _chunk_text: same chunks, but the text arrives in pieces
+    (pages, file reads) and only the current block is buffered. A block that
+    is already known to be longer than chunk_size is cut into its
+    overlapping windows as the text comes in, so a PDF without a single
+    blank line is not held in memory either.
+    """
+    step = chunk_size - overlap
+    buf = ""          # unconsumed text of the current block
+    windowed = False  # current block is a big one and buf starts at a window
+    pending_cr = False
+
+    def finish(rest: str, windowed: bool):
+        block = rest.strip() if not windowed else rest.rstrip()
         if not block:
-            continue
-            
+            return
         # A) If the block fits in one chunk, keep it whole
-        if len(block) < chunk_size:
-            chunks.append(block)
-        
+        if not windowed and len(block) < chunk_size:
+            yield block
+            return
         # B) If block is huge, split it the old way
-        else:
-            start = 0
-            while start < len(block):
-                end = start + chunk_size
-                sub_chunk = block[start:end].strip()
+        start = 0
+        while start < len(block):
+            sub_chunk = block[start:start + chunk_size].strip()
+            if sub_chunk:
+                yield sub_chunk
+            start += step
+
+    for piece in pieces:
+        # 1. Normalize line endings (a \r\n pair can straddle two pieces)
+        if pending_cr:
+            piece = "\r" + piece
+        pending_cr = piece.endswith("\r")
+        if pending_cr:
+            piece = piece[:-1]
+        buf += piece.replace("\r\n", "\n")
+
+        # 2. Split by empty lines (Double Newline = New Block)
+        while True:
+            idx = buf.find("\n\n")
+            if idx < 0:
+                break
+            yield from finish(buf[:idx], windowed)
+            buf = buf[idx + 2:]
+            windowed = False
+
+        # Emit the windows of an unfinished big block that later text can no
+        # longer change (trailing whitespace might still be stripped).
+        if not windowed:
+            if len(buf) < chunk_size:
+                continue
+            buf = buf.lstrip()
+        settled = len(buf.rstrip())
+        if settled >= chunk_size:
+            windowed = True
+            offset = 0
+            while offset + chunk_size <= settled:
+                sub_chunk = buf[offset:offset + chunk_size].strip()
                 if sub_chunk:
-                    chunks.append(sub_chunk)
-                start = end - overlap
-                
-    return chunks
+                    yield sub_chunk
+                offset += step
+            buf = buf[offset:]
+
+    if pending_cr:
+        buf += "\r"
+    yield from finish(buf, windowed)
 
 def _id_for(text: str) -> str:
     return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
+def _iter_text(path: str) -> Iterator[str]:
+    """
+    Text of a PDF (page by page, joined by newlines) or text file (in
+    TEXT_READ_SIZE pieces). Raises UnicodeDecodeError for binaries.
+    """
+    if path.lower().endswith(".pdf"):
+        import pypdf
+        reader = pypdf.PdfReader(path)
+        first = True
+        for page in reader.pages:
+            extracted = page.extract_text()
+            if not extracted:
+                continue
+            if not first:
+                yield "\n"
+            first = False
+            yield extracted
+        return
+
+    with open(path, "r", encoding="utf-8") as fh:
+        while True:
+            piece = fh.read(TEXT_READ_SIZE)
+            if not piece:
+                break
+            yield piece
+
+def _parse_file(fname: str, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP):
+    """Worker entry point: (fname, chunks, error message or None)."""
+    try:
+        chunks = list(_iter_chunks(_iter_text(os.path.join(DATA_FOLDER, fname)), chunk_size, overlap))
+    except UnicodeDecodeError:
+        return fname, [], "skipped binary file"
+    except Exception as e:
+        return fname, [], f"read error: {e}"
+    return fname, chunks, None
+
+def _iter_file_chunks(files: List[str], workers: int = None, report: "IngestReport" = None,
+                      chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP):
+    """
+    Yields (chunk, id, metadata) for every file. With one worker the file is
+    streamed page by page in-process; otherwise files are parsed on a process
+    pool with at most two files per worker in flight.
+    """
+    workers = workers or min(len(files), os.cpu_count() or 1)
+
+    def emit(fname, chunks, error):
+        if report:
+            report.file_done(fname, len(chunks), error)
+        for i, c in enumerate(chunks):
+            yield c, _id_for(fname + ":" + str(i)), {"source_file": fname, "chunk_index": i}
+
+    if workers <= 1:
+        for fname in files:
+            path = os.path.join(DATA_FOLDER, fname)
+            n = 0
+            try:
+                for c in _iter_chunks(_iter_text(path), chunk_size, overlap):
+                    yield c, _id_for(fname + ":" + str(n)), {"source_file": fname, "chunk_index": n}
+                    n += 1
+            except UnicodeDecodeError:
+                if report:
+                    report.file_done(fname, n, "skipped binary file")
+                continue
+            except Exception as e:
+                if report:
+                    report.file_done(fname, n, f"read error: {e}")
+                continue
+            if report:
+                report.file_done(fname, n)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        todo = list(files)
+        running = set()
+        while todo or running:
+            while todo and len(running) < 2 * workers:
+                running.add(pool.submit(_parse_file, todo.pop(0), chunk_size, overlap))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield from emit(*fut.result())
+
+def _iter_index_chunks(files: List[str], workers: int = None, report: "IngestReport" = None,
+                       chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP, deduper=None):
+    """_iter_file_chunks, normalised and near-deduplicated when a ChunkDeduper is given."""
+    chunks = _iter_file_chunks(files, workers, report, chunk_size, overlap)
+    return deduper.filter(chunks) if deduper is not None else chunks
+
+def _windows(items: Iterable, size: int) -> Iterator[list]:
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+class IngestReport:
+    """Progress + throughput printout for build_from_data_folder."""
+
+    def __init__(self, n_files: int):
+        self.n_files = n_files
+        self.files_done = 0
+        self.n_docs = 0
+        self.n_chunks = 0
+        self.n_embedded = 0
+        self.n_reused = 0
+        self.start = time.perf_counter()
+        self.stages = {"embed": 0.0, "write": 0.0}
+
+    def file_done(self, fname: str, n_chunks: int, error: str = None):
+        self.files_done += 1
+        if error:
+            print(f"  [{self.files_done}/{self.n_files}] {fname}: {error}")
+            return
+        self.n_docs += 1
+        self.n_chunks += n_chunks
+        print(f"  [{self.files_done}/{self.n_files}] {fname}: {n_chunks} chunks")
+
+    def add_time(self, stage: str, seconds: float):
+        self.stages[stage] += seconds
+
+    def embedded(self, n: int, reused: int = 0):
+        self.n_embedded += n
+        self.n_reused += reused
+        rate = self.n_embedded / max(time.perf_counter() - self.start, 1e-9)
+        from_snapshot = f", {self.n_reused} from snapshot" if self.n_reused else ""
+        print(f"  Embedded {self.n_embedded} chunks ({rate:.0f} chunks/s{from_snapshot})")
+
+    def summary(self):
+        total = time.perf_counter() - self.start
+        parse = total - sum(self.stages.values())
+        parts = ", ".join(f"{k} {v:.1f}s" for k, v in [("parse", parse)] + list(self.stages.items()))
+        print(f"Ingested {self.n_docs} docs / {self.n_embedded} chunks in {total:.1f}s "
+              f"({self.n_docs / total:.1f} docs/s, {self.n_embedded / total:.1f} chunks/s; {parts})")
+
+# --- EMBEDDING BACKENDS ---
+
+class EmbeddingBackend(ABC):
+    """
+    Common interface for text encoders. encode() returns float32 rows, one
+    per text, L2-normalised. `tag` identifies model + version and is stored
+    on the index, so vectors from different encoders are never mixed.
+    """
+
+    name = ""
+    model = ""
+    version = "1"
+
+    def __init__(self):
+        self._loaded = False
+
+    @property
+    def tag(self) -> str:
+        return f"{self.name}:{self.model}:v{self.version}"
+
+    def is_available(self) -> bool:
+        return True
+
+    def load(self):
+        if not self._loaded:
+            self._load()
+            self._loaded = True
+        return self
+
+    @abstractmethod
+    def _load(self):
+        """Loads the model; called once by load()."""
+
+    def unload(self):
+        """Frees the model; the next encode() loads it again."""
+        if self._loaded:
+            self._unload()
+            self._loaded = False
+
+    def _unload(self):
+        pass
+
+    @property
+    @abstractmethod
+    def dim(self) -> int:
+        """Width of the vectors encode() returns."""
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32):
+        """float32 rows, one per text, L2-normalised."""
+
+    def encode_query(self, text: str):
+        return self.encode([text], batch_size=1)[0]
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Full PyTorch sentence-transformers model (the original encoder)."""
+
+    def __init__(self, name: str, model: str, version: str = "1"):
+        super().__init__()
+        self.name, self.model, self.version = name, model, version
+        self._st = None
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        apply_torch_threads("embed")
+        self._st = SentenceTransformer(self.model)
+
+    def _unload(self):
+        self._st = None
+
+    @property
+    def dim(self) -> int:
+        return self.load()._st.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32):
+        return self.load()._st.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+
+
+class OnnxInt8Backend(EmbeddingBackend):
+    """
+    Same transformer exported to ONNX with int8 dynamic quantisation, run by
+    ONNX Runtime with mean pooling + normalisation (what the sentence-
+    transformers pipeline does for these models). No torch at runtime.
+    Produce the files with `python app/rag.py export-onnx <backend>`.
+    """
+
+    def __init__(self, name: str, model: str, max_length: int = 384, version: str = "1"):
+        super().__init__()
+        self.name, self.model, self.version = name, model, version
+        self.max_length = max_length
+        self.folder = os.path.join(ONNX_DIR, name)
+        self._session = None
+        self._tokenizer = None
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.folder, "model_int8.onnx")
+
+    def is_available(self) -> bool:
+        try:
+            import onnxruntime  # noqa: F401
+            import tokenizers  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.exists(self.model_path) and os.path.exists(os.path.join(self.folder, "tokenizer.json"))
+
+    def _load(self):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        from tuning import get_budget
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = get_budget().threads_for("embed")
+        self._session = ort.InferenceSession(self.model_path, opts, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = Tokenizer.from_file(os.path.join(self.folder, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=self.max_length)
+        self._tokenizer.enable_padding()
+
+    def _unload(self):
+        self._session = None
+        self._tokenizer = None
+
+    @property
+    def dim(self) -> int:
+        return self.load()._session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts: List[str], batch_size: int = 32):
+        import numpy as np
+        self.load()
+        out = []
+        for b in range(0, len(texts), batch_size):
+            encoded = self._tokenizer.encode_batch(texts[b:b + batch_size])
+            ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self._session.run(None, feeds)[0]
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            out.append(pooled.astype(np.float32))
+        return np.concatenate(out) if out else np.zeros((0, self.dim), dtype=np.float32)
+
+
+def export_onnx_int8(backend: OnnxInt8Backend):
+    """Exports backend.model to ONNX and quantises the weights to int8 (needs torch + transformers)."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(backend.folder, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(backend.model)
+    model = AutoModel.from_pretrained(backend.model).eval()
+    sample = tokenizer(["Where is the OSAS office?"], return_tensors="pt")
+    fp32_path = os.path.join(backend.folder, "model.onnx")
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (sample["input_ids"], sample["attention_mask"]), fp32_path,
+            input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "tokens"},
+                          "attention_mask": {0: "batch", 1: "tokens"},
+                          "last_hidden_state": {0: "batch", 1: "tokens"}},
+            opset_version=14,
+        )
+    quantize_dynamic(fp32_path, backend.model_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    tokenizer.save_pretrained(backend.folder)
+    print(f"Wrote {backend.model_path} ({os.path.getsize(backend.model_path) / 1e6:.0f} MB)")
+
+
+_backends = {}
+
+
+def register_backend(backend: EmbeddingBackend):
+    _backends[backend.name] = backend
+
+
+register_backend(SentenceTransformerBackend("st-mpnet", EMBED_MODEL))
+register_backend(OnnxInt8Backend("onnx-mpnet-int8", EMBED_MODEL, max_length=384))
+register_backend(OnnxInt8Backend("onnx-minilm-int8", "sentence-transformers/all-MiniLM-L6-v2", max_length=256))
+
+# Indexes built before backends were tagged used the original encoder
+LEGACY_INDEX_TAG = _backends[DEFAULT_EMBED_BACKEND].tag
+
+
+def registered_backends() -> List[str]:
+    return list(_backends)
+
+
+def get_backend(name: str = None) -> EmbeddingBackend:
+    """Named backend, else BEARNARD_EMBED, else the default; falls back if not installed."""
+    name = name or os.environ.get("BEARNARD_EMBED") or DEFAULT_EMBED_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown embedding backend: {name} (known: {', '.join(_backends)})")
+    if not backend.is_available():
+        print(f"Embedding backend {name} is not available, using {DEFAULT_EMBED_BACKEND}")
+        backend = _backends[DEFAULT_EMBED_BACKEND]
+    return backend
+
+
+def chunker_tag(chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP, dedup: bool = True) -> str:
+    """Chunker settings as stored on the index and in snapshots, e.g. '1000/200+dedup'."""
+    return f"{chunk_size}/{overlap}" + ("+dedup" if dedup else "")
+
+def _open_snapshot(tag: str, chunker: str = None, path: str = None):
+    """The shipped EmbeddingSnapshot if it exists, is intact and matches our encoder/chunker."""
+    from snapshot import EmbeddingSnapshot, SNAPSHOT_PATH
+    path = path or SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        snap = EmbeddingSnapshot(path)
+        snap.verify()
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring embedding snapshot: {e}")
+        return None
+    chunker = chunker or chunker_tag()
+    if (snap.model, snap.chunker) != (tag, chunker):
+        print(f"Ignoring embedding snapshot: built for {snap.model} ({snap.chunker}), not {tag} ({chunker})")
+        return None
+    print(f"Using embedding snapshot {snap.describe()}")
+    return snap
+
 class Rag:
-    def __init__(self, build_if_empty: bool = False):
+    def __init__(self, build_if_empty: bool = False, backend: str = None, chroma_path: str = CHROMA_PATH,
+                 chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP, dedup: bool = True):
         print("Loading RAG Model...")
-        self.emb = SentenceTransformer(EMBED_MODEL)
-        self.client = chromadb.PersistentClient(path=CHROMA_PATH)
+        # Imported here: the encoder may pull in torch, chromadb is not light
+        # either, and neither is needed before the first question.
+        import chromadb
+
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.dedup = dedup
+        self.chroma_path = chroma_path
+        self.emb = get_backend(backend).load()
+        self.client = chromadb.PersistentClient(path=chroma_path)
         
         try:
             self.col = self.client.get_collection(COLLECTION_NAME)
         except Exception:
-            self.col = self.client.create_collection(COLLECTION_NAME)
+            self.col = self._create_collection()
+
+        # The index remembers which encoder and chunker filled it; vectors
+        # from another model are meaningless to this one, so a mismatch
+        # means a rebuild. Only callers that build (build_if_empty) may
+        # drop it; read-only users such as the inspector just get a warning.
+        meta = self.col.metadata or {}
+        index_tag = meta.get("embed_model", LEGACY_INDEX_TAG)
+        index_chunker = meta.get("chunker", chunker_tag(CHUNK_SIZE, OVERLAP, dedup=False))
+        if (index_tag, index_chunker) != (self.emb.tag, self._chunker_tag):
+            if build_if_empty:
+                print(f"Index was built with {index_tag} ({index_chunker}), "
+                      f"now {self.emb.tag} ({self._chunker_tag}): rebuilding.")
+                self.client.delete_collection(COLLECTION_NAME)
+                self.col = self._create_collection()
+            else:
+                print(f"Warning: index was built with {index_tag} ({index_chunker}), not "
+                      f"{self.emb.tag} ({self._chunker_tag}); leaving it as is, search results will be off.")
             
         if build_if_empty and self._is_collection_empty():
             print("Indexing data folder...")
-            self.build_from_data_folder()
+            self.build_from_data_folder(snapshot=_open_snapshot(self.emb.tag, self._chunker_tag))
             print("RAG Indexing Complete.")
 
+    @property
+    def _chunker_tag(self) -> str:
+        return chunker_tag(self.chunk_size, self.overlap, self.dedup)
+
+    def _create_collection(self):
+        return self.client.create_collection(
+            COLLECTION_NAME, metadata={"embed_model": self.emb.tag, "chunker": self._chunker_tag}
+        )
+
     def _is_collection_empty(self) -> bool:
         try:
             meta = self.col.count()
@@ -74,64 +538,85 @@ class Rag:
         except Exception:
             return True
 
-    def build_from_data_folder(self, file_list: List[str] = None):
+    def build_from_data_folder(self, file_list: List[str] = None, workers: int = None, snapshot=None):
+        """
+        Streaming ingestion: pages -> blocks -> chunks -> embedding batches ->
+        index writes. Files are parsed on a process pool (or streamed page by
+        page with workers=1), and chunks from all files flow through one
+        bounded window that is length-sorted (similar lengths per batch = less
+        padding), embedded and written before the next window is read.
+
+        With an EmbeddingSnapshot, chunks whose id and content hash match the
+        snapshot take its vectors; only new or changed chunks are embedded.
+        """
+        import numpy as np
+        from tuning import get_budget
+
         files = file_list or sorted(
             [f for f in os.listdir(DATA_FOLDER) if os.path.isfile(os.path.join(DATA_FOLDER, f))]
         )
-        
-        for fname in files:
-            path = os.path.join(DATA_FOLDER, fname)
-            text = ""
-            
-            # PDF SUPPORT
-            if fname.lower().endswith(".pdf"):
-                try:
-                    print(f"Processing PDF: {fname}")
-                    reader = pypdf.PdfReader(path)
-                    for page in reader.pages:
-                        extracted = page.extract_text()
-                        if extracted:
-                            text += extracted + "\n"
-                except Exception as e:
-                    print(f"Error reading PDF {fname}: {e}")
-                    continue
-            
-            # TEXT SUPPORT
-            else:
-                try:
-                    with open(path, "r", encoding="utf-8") as fh:
-                        text = fh.read().strip()
-                except UnicodeDecodeError:
-                    print(f"Skipping binary file: {fname}")
-                    continue
+        if not files:
+            return
+        report = IngestReport(len(files))
+        batch_size = get_budget().embed_batch()
 
-            if not text:
-                continue
+        write_batch = INDEX_WRITE_BATCH
+        try:
+            write_batch = min(write_batch, self.client.get_max_batch_size())
+        except Exception:
+            pass
 
-            chunks = _chunk_text(text)
-            docs = []
-            embeddings = []
-            ids = []
-            metas = []
-            
-            if chunks:
-                chunk_embeddings = self.emb.encode(chunks).tolist()
-                for i, c in enumerate(chunks):
-                    docs.append(c)
-                    embeddings.append(chunk_embeddings[i])
-                    _id = _id_for(fname + ":" + str(i))
-                    ids.append(_id)
-                    metas.append({"source_file": fname, "chunk_index": i})
-                
+        deduper = ChunkDeduper() if self.dedup else None
+        chunks = _iter_index_chunks(files, workers, report, self.chunk_size, self.overlap, deduper)
+        for window in _windows(chunks, batch_size * EMBED_WINDOW_BATCHES):
+            window.sort(key=lambda item: len(item[0]))
+            docs = [doc for doc, _, _ in window]
+
+            start = time.perf_counter()
+            if snapshot is None:
+                embeddings = self.emb.encode(docs, batch_size=batch_size)
+                reused = 0
+            else:
+                rows = [snapshot.row_for(_id, _id_for(doc)) for doc, _id, _ in window]
+                hits = [k for k, row in enumerate(rows) if row is not None]
+                misses = [k for k, row in enumerate(rows) if row is None]
+                embeddings = np.empty((len(docs), snapshot.dim), dtype=np.float32)
+                if hits:
+                    embeddings[hits] = snapshot.vectors_for([rows[k] for k in hits])
+                if misses:
+                    embeddings[misses] = self.emb.encode([docs[k] for k in misses], batch_size=batch_size)
+                reused = len(hits)
+            report.add_time("embed", time.perf_counter() - start)
+            report.embedded(len(docs), reused)
+
+            start = time.perf_counter()
+            for b in range(0, len(window), write_batch):
+                part = window[b:b + write_batch]
                 try:
-                    if docs:
-                        self.col.add(documents=docs, embeddings=embeddings, ids=ids, metadatas=metas)
+                    self.col.add(documents=docs[b:b + write_batch],
+                                 embeddings=embeddings[b:b + write_batch].tolist(),
+                                 ids=[_id for _, _id, _ in part],
+                                 metadatas=[meta for _, _, meta in part])
                 except Exception as e:
-                    print(f"Error adding {fname} to DB: {e}")
+                    print(f"Error adding {len(part)} chunks to DB: {e}")
+            report.add_time("write", time.perf_counter() - start)
+
+        if deduper is not None:
+            print(deduper.describe())
+            try:
+                deduper.write_provenance(os.path.join(self.chroma_path, PROVENANCE_FILE))
+            except OSError as e:
+                print(f"Could not write provenance: {e}")
+        report.summary()
 
-    def search(self, query: str, n_results: int = 15, distance_threshold: float = 1.6) -> List[str]:
-        print(f"[DEBUG] Searching for: '{query}'")
-    def search(self, query: str, n_results: int = 15) -> List[str]:
+    def retrieve(self, query: str, n_results: int = 15) -> list:
+        """Nearest chunks as (document, distance, metadata), closest first."""
+        q_emb = self.emb.encode_query(query).tolist()
+        results = self.col.query(query_embeddings=[q_emb], n_results=n_results)
+        return list(zip(results["documents"][0], results["distances"][0], results["metadatas"][0]))
+
+    def search(self, query: str, n_results: int = 15, strict_limit: float = STRICT_DISTANCE,
+               fallback_limit: float = FALLBACK_DISTANCE, max_docs: int = MAX_CONTEXT_DOCS) -> List[str]:
         """
         Hybrid Search Strategy:
         1. Fetch 15 candidates (Deep Search).
@@ -141,45 +626,40 @@ class Rag:
         print(f"🔍 [DEBUG] Searching for: '{query}'")
         
         try:
-            q_emb = self.emb.encode(query).tolist()
-            results = self.col.query(query_embeddings=[q_emb], n_results=n_results)
-            
-            docs = results["documents"][0]
-            distances = results["distances"][0]
-            
-            print(f"📊 [DEBUG] Raw distances: {[f'{d:.3f}' for d in distances]}")
-            
-            # --- PHASE 1: STRICT FILTERING (Your original preference) ---
-            strict_limit = 1.5
-            filtered_docs = []
-            
-            for doc, dist in zip(docs, distances):
-                if dist <= strict_limit:
-                    filtered_docs.append(doc)
-            
-            if filtered_docs:
-                print(f"✅ Found {len(filtered_docs)} high-relevance docs (Threshold <= {strict_limit})")
-                return filtered_docs[:5] # Return top 5 strict matches
-            
-            # --- PHASE 2: FALLBACK (Broad Search) ---
-            print(f"⚠️ No strict matches (<= {strict_limit}). Switching to FALLBACK mode...")
-            
-            fallback_limit = 1.8
-            for doc, dist in zip(docs, distances):
-                if dist <= fallback_limit:
-                    filtered_docs.append(doc)
-
-            
-            print(f"[RAG] Retrieved {len(filtered_docs)} chunks from DB.")
-            return filtered_docs
-            
-            if filtered_docs:
-                print(f"✅ Found {len(filtered_docs)} fallback docs (Threshold <= {fallback_limit})")
-                return filtered_docs[:5] # Return top 5 loose matches
-            
-            print("❌ No relevant docs found even in fallback.")
-            return []
+            hits = self.retrieve(query, n_results)
+            print(f"📊 [DEBUG] Raw distances: {[f'{d:.3f}' for _, d, _ in hits]}")
+            return select_context(hits, strict_limit, fallback_limit, max_docs, verbose=True)
             
         except Exception as e:
             print(f"[DEBUG] Error in search: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+def select_context(hits: list, strict_limit: float = STRICT_DISTANCE, fallback_limit: float = FALLBACK_DISTANCE,
+                   max_docs: int = MAX_CONTEXT_DOCS, verbose: bool = False) -> List[str]:
+    """The distance filter of Rag.search, on (document, distance, ...) hits."""
+    # --- PHASE 1: STRICT FILTERING (Your original preference) ---
+    filtered_docs = [hit[0] for hit in hits if hit[1] <= strict_limit]
+    
+    if filtered_docs:
+        if verbose:
+            print(f"✅ Found {len(filtered_docs)} high-relevance docs (Threshold <= {strict_limit})")
+        return filtered_docs[:max_docs] # Return top strict matches
+    
+    # --- PHASE 2: FALLBACK (Broad Search) ---
+    if verbose:
+        print(f"⚠️ No strict matches (<= {strict_limit}). Switching to FALLBACK mode...")
+    
+    filtered_docs = [hit[0] for hit in hits if hit[1] <= fallback_limit]
+    
+    if verbose:
+        print(f"[RAG] Retrieved {len(filtered_docs)} chunks from DB.")
+    return filtered_docs
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) >= 3 and sys.argv[1] == "export-onnx":
+        export_onnx_int8(_backends[sys.argv[2]])
+    else:
+        print("Usage: python app/rag.py export-onnx <backend>")
+        print("Backends: " + ", ".join(n for n, b in _backends.items() if isinstance(b, OnnxInt8Backend)))
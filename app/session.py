@@ -0,0 +1,172 @@
+import re
+import time
+import datetime
+
+# Token budget for the rendered conversation (system prompt excluded). Past
+# it, the oldest turns are folded into a short summary.
+HISTORY_TOKEN_BUDGET = 3072
+SUMMARY_MAX_TURNS = 6
+
+# A session ends when nobody has talked to Bearnard for this long
+SESSION_IDLE_TIMEOUT = 60.0
+
+# Sent once at the top of a conversation; every turn then adds its own
+# context, time and question (see ConversationSession below)
+SYSTEM_PROMPT = """You are Bearnard, the AI Concierge of iACADEMY (The Nexus), You are located at the Ground Floor - Lobby.
+
+SPECIAL RULES:
+- If asked about NEAREST location, answer based on your location at Ground Floor - Lobby.
+- If asked for actions (greet, say hello), respond with a short greeting only.
+- If asked for the time, respond with the current time only.
+
+### INSTRUCTIONS:
+1. **SOURCE OF TRUTH:** Answer questions using ONLY the information in the [CONTEXT] block below. Check for slang words or abbrevations used in iACADEMY. (CR for Comfort Room, CL for Computer Lab, etc.). check for lower case of the abreveations as well. the CONTEXT is your only source of truth. you must base your answers SOLELY on that information.
+2. **UNKNOWN INFO:** If the [CONTEXT] contains "NO_DATA_FOUND", say: "I'm sorry, I don't have that information in my current records." or If the [CONTEXT] doesn't make sense or logical, answer based on your knowledge regarding the CONTEXT. Make sure to analyze the CONTEXT properly and follows the appropriate questions. avoid making up answers. This doesn't apply on Special Rules.
+3. **OFF-TOPIC:** If the user asks about math, coding, or general world trivia (not related to iACADEMY), politely decline.
+4. **VOICE OPTIMIZATION:** You are speaking to the user.
+    - Keep answers **short** (under 2 sentences if possible).
+    - Do NOT use lists, bullet points, or markdown formatting.
+    - If listing items, separate them with commas for natural speech.
+5. **FOLLOW-UPS:** A [CONTEXT] of "SAME AS ABOVE" means the question follows up on the earlier turns; use the context given there."""
+
+_FOLLOW_UP_START = ("and ", "what about", "how about", "also ", "then ", "so ")
+_FOLLOW_UP_WORDS = {"it", "its", "it's", "there", "that", "those", "these", "they", "them",
+                    "their", "he", "she", "his", "her", "same"}
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+class Turn:
+    def __init__(self, user: str, docs: list):
+        self.user = user
+        self.docs = docs
+        self.answer = ""
+        self.time = datetime.datetime.now().strftime("%A, %I:%M %p")
+        self.tokens = 0
+
+
+class ConversationSession:
+    """
+    Multi-turn memory for one visitor.
+
+    The prompt is rendered as Mistral chat turns, append-only:
+
+        [INST] system, turn 1 context + question [/INST] answer 1</s>[INST] turn 2 ... [/INST]
+
+    so turn N's prompt starts with exactly the text llama.cpp already has in
+    its KV cache from turn N-1 (prompt + generated answer). llama-cpp-python
+    keeps the longest common token prefix, and a follow-up only prefills its
+    own new tokens. Chunks that an earlier turn already showed are not
+    repeated, and a follow-up question is retrieved together with the
+    previous question ("and what time does it close?").
+
+    When the rendered history exceeds the token budget, the oldest turns are
+    folded into a one-line-per-turn summary until half the budget is left
+    (this re-prefills once). The latest turn is never folded.
+    """
+
+    def __init__(self, llm, system_prompt: str, history_budget: int = HISTORY_TOKEN_BUDGET,
+                 idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        self.llm = llm
+        self.system_prompt = system_prompt
+        self.history_budget = history_budget
+        self.idle_timeout = idle_timeout
+        self.reset()
+
+    def reset(self):
+        self.turns = []
+        self.summary = []
+        self.last_active = time.monotonic()
+
+    def expired(self) -> bool:
+        return bool(self.turns) and time.monotonic() - self.last_active > self.idle_timeout
+
+    def is_follow_up(self, user_text: str) -> bool:
+        if not self.turns:
+            return False
+        text = user_text.lower().strip()
+        words = re.findall(r"[\w']+", text)
+        # Length alone says nothing: "Where is the clinic?" is short and new
+        return text.startswith(_FOLLOW_UP_START) or any(w in _FOLLOW_UP_WORDS for w in words)
+
+    def retrieval_query(self, user_text: str) -> str:
+        """What to search for: follow-ups carry the previous question along."""
+        if self.is_follow_up(user_text):
+            return f"{self.turns[-1].user} {user_text}"
+        return user_text
+
+    def _shown_docs(self) -> set:
+        return {d for t in self.turns for d in t.docs}
+
+    def _render_turn(self, turn: Turn, first: bool) -> str:
+        head = ""
+        if first:
+            head = self.system_prompt.strip() + "\n\n"
+            if self.summary:
+                head += "### [EARLIER IN THIS CONVERSATION]\n" + "\n".join(self.summary) + "\n\n"
+        if turn.docs:
+            context = "\n---\n".join(turn.docs)
+        elif not first and any(t.docs for t in self.turns):
+            context = "SAME AS ABOVE"
+        else:
+            context = "NO_DATA_FOUND"
+        text = (f"[INST] {head}Current Time: {turn.time}\n\n"
+                f"### [CONTEXT]\n{context}\n\n"
+                f"### [USER QUESTION]\n{turn.user}\n\n"
+                f"### [BEARNARD'S ANSWER]\n[/INST]")
+        if turn.answer:
+            text += f" {turn.answer}</s>"
+        return text
+
+    def build_prompt(self) -> str:
+        return "".join(self._render_turn(t, i == 0) for i, t in enumerate(self.turns))
+
+    def _fold_history(self):
+        for i, t in enumerate(self.turns):
+            t.tokens = self.llm.count_tokens(self._render_turn(t, i == 0))
+        if sum(t.tokens for t in self.turns) <= self.history_budget:
+            return
+        # Fold down to half the budget, so the prefix (and the KV cache) stays
+        # stable for the next few turns instead of shifting on every one
+        while len(self.turns) > 1 and sum(t.tokens for t in self.turns) > self.history_budget // 2:
+            old = self.turns.pop(0)
+            first_sentence = _SENTENCE_END.split(old.answer.strip(), 1)[0]
+            self.summary.append(f"- The user asked: {old.user} You answered: {first_sentence}")
+            self.summary = self.summary[-SUMMARY_MAX_TURNS:]
+            self.turns[0].tokens = self.llm.count_tokens(self._render_turn(self.turns[0], True))
+
+    def ask_stream(self, user_text: str, docs: list, max_tokens: int = 256):
+        """
+        Adds a turn and yields its answer as it is generated, on top of the
+        cached history. Whatever was generated when the generator finishes
+        (or is closed, e.g. on barge-in) is remembered as the answer.
+        """
+        turn = Turn(user_text, [d for d in docs if d not in self._shown_docs()])
+        self.turns.append(turn)
+        self._fold_history()
+        # Chunks of folded turns are gone from the prompt; show them again
+        shown = {d for t in self.turns[:-1] for d in t.docs}
+        turn.docs = [d for d in docs if d not in shown]
+
+        parts = []
+        pieces = self.llm.stream(self.build_prompt(), max_tokens=max_tokens)
+        try:
+            for piece in pieces:
+                parts.append(piece)
+                yield piece
+        finally:
+            pieces.close()
+            turn.answer = "".join(parts).strip()
+            if turn.answer:
+                self.last_active = time.monotonic()
+            else:
+                self.turns.remove(turn)
+
+    def ask(self, user_text: str, docs: list, max_tokens: int = 256) -> str:
+        """Adds a turn, answers it on top of the cached history and remembers the answer."""
+        return "".join(self.ask_stream(user_text, docs, max_tokens=max_tokens)).strip()
+
+    def describe(self) -> str:
+        stats = getattr(self.llm, "last_stats", None) or {}
+        return (f"Session: turn {len(self.turns) + len(self.summary)}, "
+                f"prompt {stats.get('prompt_tokens', '?')} tokens, "
+                f"{stats.get('reused_tokens', '?')} reused from the KV cache")
@@ -0,0 +1,204 @@
+"""
+Prebuilt embedding snapshot, so a new kiosk can fill its index without
+running the embedding model.
+
+One file, memory-mappable:
+
+    b"BEARSNP1" | uint64 header length | JSON header | pad to 64
+    float16 vectors [count, dim]      (64-byte aligned)
+    uint64 text offsets [count + 1]
+    UTF-8 chunk texts
+
+The header holds the encoder tag (backend:model:version), chunker settings,
+one record per chunk (id, source file, chunk index, content hash) and a
+sha1 of the vectors.
+Chunk ids and content hashes are the ones Rag uses (rag._id_for), so an
+import can check every chunk of the current data/ folder against the
+snapshot and re-embed only what changed.
+
+Usage (from the repo root, on a machine that has the embedding model):
+    python app/snapshot.py export [--out index_snapshot.bin]
+    python app/snapshot.py info [--path index_snapshot.bin]
+"""
+import os
+import json
+import time
+import struct
+import hashlib
+import argparse
+
+import numpy as np
+
+SNAPSHOT_PATH = "index_snapshot.bin"
+MAGIC = b"BEARSNP1"
+ALIGN = 64
+
+
+def _align(n: int, to: int = ALIGN) -> int:
+    return (n + to - 1) // to * to
+
+
+class EmbeddingSnapshot:
+    """Read side. Vectors and texts stay on disk (np.memmap) until used."""
+
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an embedding snapshot")
+            try:
+                (header_len,) = struct.unpack("<Q", fh.read(8))
+            except struct.error:
+                raise ValueError(f"{path}: truncated snapshot header") from None
+            self.header = json.loads(fh.read(header_len).decode("utf-8"))
+
+        h = self.header
+        base = _align(len(MAGIC) + 8 + header_len)
+        self.model = h["model"]
+        self.chunker = h["chunker"]
+        self.count = h["count"]
+        self.dim = h["dim"]
+        self.records = h["records"]
+        self._rows = {r["id"]: i for i, r in enumerate(self.records)}
+
+        self.vectors = np.memmap(path, dtype=np.float16, mode="r",
+                                 offset=base + h["vectors_offset"], shape=(self.count, self.dim))
+        self._offsets = np.memmap(path, dtype=np.uint64, mode="r",
+                                  offset=base + h["offsets_offset"], shape=(self.count + 1,))
+        self._texts = np.memmap(path, dtype=np.uint8, mode="r", offset=base + h["texts_offset"],
+                                shape=(int(self._offsets[-1]),)) if self._offsets[-1] else b""
+
+    def verify(self):
+        """Raises ValueError if the vectors were truncated or corrupted."""
+        if hashlib.sha1(self.vectors.tobytes()).hexdigest() != self.header["vectors_sha1"]:
+            raise ValueError(f"{self.path}: vector checksum mismatch")
+
+    def row_for(self, chunk_id: str, content_hash: str):
+        """Row of an up-to-date chunk, or None if it is missing or changed."""
+        row = self._rows.get(chunk_id)
+        if row is None or self.records[row]["sha1"] != content_hash:
+            return None
+        return row
+
+    def vectors_for(self, rows) -> np.ndarray:
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+    def text(self, row: int) -> str:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return bytes(self._texts[start:end]).decode("utf-8")
+
+    def describe(self) -> str:
+        size = os.path.getsize(self.path) / 1e6
+        return (f"{self.path}: {self.count} chunks x {self.dim} (float16), model {self.model}, "
+                f"chunker {self.chunker}, built {self.header.get('created', '?')}, "
+                f"{size:.1f} MB")
+
+
+def write_snapshot(path: str, model: str, chunker: str, records: list, texts: list, vectors: np.ndarray):
+    """records[i] = {"id", "source_file", "chunk_index", "sha1"} for texts[i] / vectors[i]."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float16)
+    blobs = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.uint64)
+    if blobs:
+        offsets[1:] = np.cumsum([len(b) for b in blobs])
+
+    vectors_offset = 0
+    offsets_offset = _align(vectors.nbytes)
+    texts_offset = offsets_offset + offsets.nbytes
+    header = json.dumps({
+        "model": model,
+        "chunker": chunker,
+        "count": len(records),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "vectors_sha1": hashlib.sha1(vectors.tobytes()).hexdigest(),
+        "vectors_offset": vectors_offset,
+        "offsets_offset": offsets_offset,
+        "texts_offset": texts_offset,
+        "records": records,
+    }).encode("utf-8")
+
+    base = _align(len(MAGIC) + 8 + len(header))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        fh.write(b"\0" * (base - fh.tell()))
+        fh.write(vectors.tobytes())
+        fh.write(b"\0" * (base + offsets_offset - fh.tell()))
+        fh.write(offsets.tobytes())
+        for b in blobs:
+            fh.write(b)
+    os.replace(tmp, path)
+
+
+def export(path: str = SNAPSHOT_PATH, file_list: list = None, backend: str = None):
+    """Chunks and embeds data/ exactly like Rag.build_from_data_folder, then writes the snapshot."""
+    from rag import (DATA_FOLDER, EMBED_WINDOW_BATCHES, IngestReport, get_backend, chunker_tag,
+                     _iter_index_chunks, _windows, _id_for)
+    from dedup import ChunkDeduper
+    from tuning import get_budget
+
+    emb = get_backend(backend).load()
+    files = file_list or sorted(
+        [f for f in os.listdir(DATA_FOLDER) if os.path.isfile(os.path.join(DATA_FOLDER, f))]
+    )
+    report = IngestReport(len(files))
+    batch_size = get_budget().embed_batch()
+
+    records, texts, vectors = [], [], []
+    chunks = _iter_index_chunks(files, report=report, deduper=ChunkDeduper())
+    for window in _windows(chunks, batch_size * EMBED_WINDOW_BATCHES):
+        window.sort(key=lambda item: len(item[0]))
+        docs = [doc for doc, _, _ in window]
+        start = time.perf_counter()
+        vectors.append(emb.encode(docs, batch_size=batch_size).astype(np.float16))
+        report.add_time("embed", time.perf_counter() - start)
+        report.embedded(len(docs))
+        for doc, _id, meta in window:
+            records.append({"id": _id, "source_file": meta["source_file"],
+                            "chunk_index": meta["chunk_index"], "sha1": _id_for(doc)})
+            texts.append(doc)
+
+    matrix = np.concatenate(vectors) if vectors else np.zeros((0, emb.dim), dtype=np.float16)
+    write_snapshot(path, emb.tag, chunker_tag(), records, texts, matrix)
+    report.summary()
+    print(EmbeddingSnapshot(path).describe())
+
+
+def info(path: str = SNAPSHOT_PATH):
+    """Header summary plus how many chunks of the current data/ folder it covers."""
+    from rag import DATA_FOLDER, _iter_index_chunks, _id_for
+    from dedup import ChunkDeduper
+
+    snap = EmbeddingSnapshot(path)
+    print(snap.describe())
+    try:
+        snap.verify()
+        print("Vector checksum: OK")
+    except ValueError as e:
+        print(f"Vector checksum: FAILED ({e})")
+
+    files = sorted(f for f in os.listdir(DATA_FOLDER) if os.path.isfile(os.path.join(DATA_FOLDER, f)))
+    fresh = stale = 0
+    for doc, _id, _ in _iter_index_chunks(files, workers=1, deduper=ChunkDeduper()):
+        if snap.row_for(_id, _id_for(doc)) is None:
+            stale += 1
+        else:
+            fresh += 1
+    print(f"data/: {fresh} chunks up to date, {stale} would be re-embedded")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="embed data/ and write a snapshot")
+    p_export.add_argument("--out", default=SNAPSHOT_PATH)
+    p_export.add_argument("--backend", default=None, help="embedding backend (default: BEARNARD_EMBED or st-mpnet)")
+    p_info = sub.add_parser("info", help="describe a snapshot and check it against data/")
+    p_info.add_argument("--path", default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.out, backend=args.backend)
+    else:
+        info(args.path)
@@ -5,4 +5,6 @@ class State(Enum):
     WAKE_DETECTED = 1     
     LISTENING = 2         
     THINKING = 3          
-    SPEAKING = 4
\ No newline at end of file
+    SPEAKING = 4
+    LOADING = 5
+    CALIBRATING = 6
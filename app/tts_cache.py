@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+import numpy as np
+
+TTS_CACHE_DIR = "tts_cache"
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+TTS_PHRASES_FILE = "tts_phrases.txt"   # optional, one phrase per line
+
+# Things Bearnard says all the time. Rendered once at startup so they play
+# without waiting on the speech engine.
+PREWARM_PHRASES = [
+    "I'm sorry, I don't have that information in my current records.",
+    "Hello! I'm Bearnard, the AI Concierge of iACADEMY.",
+    "Hi there! How can I help you today?",
+    "Sorry, I didn't catch that.",
+    "The OSAS is located on the Mezzanine level.",
+    "The Clinic is located on the Ground Floor.",
+    "The Registrar's Office is located on the Ground Floor.",
+    "The Cafeteria is on the 5th Floor.",
+]
+
+
+def normalize_phrase(text: str) -> str:
+    return " ".join(text.split())
+
+
+def load_phrase_list(path: str = TTS_PHRASES_FILE) -> list:
+    phrases = list(PREWARM_PHRASES)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            phrases += [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+    except OSError:
+        pass
+    return phrases
+
+
+class PhraseCache:
+    """
+    Content-addressed on-disk audio cache. Key = sha1(voice | rate | text);
+    each entry is an int16 .npy file, with sample rate, size and last use
+    kept in index.json. Least recently used entries are evicted above
+    max_bytes.
+    """
+
+    def __init__(self, root: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self._dirty = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fh:
+                self.index = json.load(fh)
+        except (OSError, ValueError):
+            self.index = {}
+
+    @staticmethod
+    def key(text: str, voice: str, rate: int) -> str:
+        raw = f"{voice}|{rate}|{normalize_phrase(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".npy")
+
+    def contains(self, text: str, voice: str, rate: int) -> bool:
+        return self.key(text, voice, rate) in self.index
+
+    def get(self, text: str, voice: str, rate: int):
+        """Returns (pcm float32, sample_rate) or None."""
+        key = self.key(text, voice, rate)
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                samples = np.load(self._path(key))
+            except (OSError, ValueError):
+                del self.index[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["last_used"] = time.time()
+            entry["uses"] = entry.get("uses", 0) + 1
+            self._dirty += 1
+            if self._dirty >= 20:
+                self._save()
+        return samples.astype(np.float32) / 32768.0, entry["sample_rate"]
+
+    def put(self, text: str, voice: str, rate: int, pcm: np.ndarray, sample_rate: int):
+        key = self.key(text, voice, rate)
+        samples = np.clip(pcm * 32768.0, -32768, 32767).astype(np.int16)
+        with self._lock:
+            np.save(self._path(key), samples)
+            self.index[key] = {
+                "text": normalize_phrase(text),
+                "sample_rate": int(sample_rate),
+                "bytes": int(samples.nbytes),
+                "last_used": time.time(),
+                "uses": 0,
+            }
+            self._evict()
+            self._save()
+
+    def _evict(self):
+        total = sum(e["bytes"] for e in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]["last_used"]):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= entry["bytes"]
+            del self.index[key]
+            if total <= self.max_bytes:
+                break
+
+    def _save(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.index, fh)
+        os.replace(tmp, self.index_path)
+        self._dirty = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.index),
+            "bytes": sum(e["bytes"] for e in self.index.values()),
+        }
+
+    def describe(self) -> str:
+        st = self.stats()
+        return (f"TTS cache: {st['hit_rate']:.0%} hit rate ({st['hits']}/{st['hits'] + st['misses']}), "
+                f"{st['entries']} phrases, {st['bytes'] / 1e6:.1f} MB")
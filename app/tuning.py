@@ -0,0 +1,340 @@
+import os
+import sys
+import json
+import time
+import platform
+
+# Where the startup probe stores its measurements (one entry per host + model)
+TUNING_CACHE = "tuning_cache.json"
+LLM_MODEL_PATH = "models/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+ASR_PROBE_MODEL = "distil-medium.en"
+EMBED_PROBE_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+# Fallbacks when the probe has never run on this host
+DEFAULT_LLM_BATCH = 512
+LLM_BATCH_CANDIDATES = [128, 256, 512]
+DEFAULT_EMBED_BATCH = 32
+EMBED_BATCH_CANDIDATES = [16, 32, 64, 128]
+
+# Cores kept free for the audio callbacks and the Qt main thread
+RESERVED_CORES = 1
+
+# Stages that can be busy at the same moment. Every group must fit inside the
+# core budget, so a stage never gets more threads than it can have while its
+# busiest neighbour is also running.
+CONCURRENT_GROUPS = [
+    {"llm", "asr_wake"},       # barge-in / wake check while an answer is generated
+    {"asr_query", "embed"},    # query encode can start while the tail is transcribed
+    {"embed", "llm"},          # follow-up retrieval while the previous answer finishes
+]
+STAGES = ["llm", "asr_query", "asr_wake", "embed"]
+
+
+def physical_cores() -> int:
+    """
+    Best guess at physical cores. Hyper-threads do not help llama.cpp or
+    CTranslate2 much, so we budget against real cores when we can see them.
+    """
+    try:
+        import psutil
+        n = psutil.cpu_count(logical=False)
+        if n:
+            return n
+    except ImportError:
+        pass
+    return os.cpu_count() or 4
+
+
+def _host_key(model_path: str) -> str:
+    try:
+        st = os.stat(model_path)
+        model_sig = f"{os.path.basename(model_path)}:{st.st_size}"
+    except OSError:
+        model_sig = os.path.basename(model_path)
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}|{model_sig}"
+
+
+def load_tuning(model_path: str = LLM_MODEL_PATH) -> dict:
+    """Returns the cached probe results for this host, or {} if it never ran."""
+    try:
+        with open(TUNING_CACHE, "r", encoding="utf-8") as fh:
+            cache = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return cache.get(_host_key(model_path), {})
+
+
+def save_tuning(results: dict, model_path: str = LLM_MODEL_PATH):
+    try:
+        with open(TUNING_CACHE, "r", encoding="utf-8") as fh:
+            cache = json.load(fh)
+    except (OSError, ValueError):
+        cache = {}
+    cache[_host_key(model_path)] = results
+    with open(TUNING_CACHE, "w", encoding="utf-8") as fh:
+        json.dump(cache, fh, indent=2)
+
+
+class ThreadBudget:
+    """
+    Shared thread policy. Each stage asks for its preferred thread count
+    (measured by the probe, or a sane default), then every group of stages
+    that can overlap is scaled down until it fits inside the core budget.
+    """
+
+    def __init__(self, total_cores: int = None, tuning: dict = None):
+        cores = total_cores or physical_cores()
+        self.total = max(1, cores - RESERVED_CORES)
+        self.tuning = tuning if tuning is not None else load_tuning()
+
+        preferred = {
+            "llm": self.tuning.get("llm", {}).get("best_threads", self.total),
+            "asr_query": self.tuning.get("asr", {}).get("best_threads", min(4, self.total)),
+            "asr_wake": min(2, self.total),
+            "embed": min(4, self.total),
+        }
+        self.threads = self._fit(preferred)
+
+    def _fit(self, preferred: dict) -> dict:
+        assigned = dict(preferred)
+        for group in CONCURRENT_GROUPS:
+            wanted = sum(preferred[s] for s in group)
+            if wanted <= self.total:
+                continue
+            scale = self.total / wanted
+            for stage in group:
+                assigned[stage] = min(assigned[stage], max(1, int(preferred[stage] * scale)))
+        return assigned
+
+    def threads_for(self, stage: str) -> int:
+        return self.threads.get(stage, 1)
+
+    def llm_batch(self) -> int:
+        return self.tuning.get("llm", {}).get("best_batch", DEFAULT_LLM_BATCH)
+
+    def embed_batch(self) -> int:
+        return self.tuning.get("embed", {}).get("best_batch", DEFAULT_EMBED_BATCH)
+
+    def describe(self) -> str:
+        parts = [f"{s}={self.threads_for(s)}" for s in STAGES]
+        return f"Thread budget ({self.total} cores): " + ", ".join(parts)
+
+
+_budget = None
+
+
+def get_budget() -> ThreadBudget:
+    global _budget
+    if _budget is None:
+        _budget = ThreadBudget()
+    return _budget
+
+
+def apply_torch_threads(stage: str = "embed"):
+    """Caps torch's intra-op pool (used by sentence-transformers) to the stage budget."""
+    n = get_budget().threads_for(stage)
+    os.environ.setdefault("OMP_NUM_THREADS", str(n))
+    try:
+        import torch
+        torch.set_num_threads(n)
+    except ImportError:
+        pass
+
+
+def llm_gpu_layers() -> int:
+    """Layers LLM offloads to the GPU: all of them on macOS (Metal), none elsewhere."""
+    return -1 if platform.system() == "Darwin" else 0
+
+
+# --- PROBES ---
+
+def _thread_candidates(total: int) -> list:
+    cands = {max(1, total // 2), max(1, total - 1), total}
+    return sorted(cands)
+
+
+def probe_llm(model_path: str = LLM_MODEL_PATH, total: int = None, decode_tokens: int = 32) -> dict:
+    """
+    Loads the GGUF once per thread count and measures prefill and decode speed.
+    Decode tok/s picks n_threads (it dominates spoken answers), prefill tok/s
+    picks n_batch. The context is created with the largest batch candidate;
+    smaller batches only change how many prompt tokens each eval call takes,
+    so they are tried on the same instance. Layers are offloaded exactly as
+    LLM does it, so the numbers describe the real runtime.
+    """
+    from llama_cpp import Llama
+
+    total = total or max(1, physical_cores() - RESERVED_CORES)
+    prompt = "[INST] " + ("The OSAS is located on the Mezzanine level. " * 24) + "Where is the OSAS? [/INST]"
+    runs = []
+
+    for n_threads in _thread_candidates(total):
+        model = Llama(model_path=model_path, n_ctx=2048, n_threads=n_threads,
+                      n_batch=max(LLM_BATCH_CANDIDATES), n_gpu_layers=llm_gpu_layers(), verbose=False)
+        for n_batch in LLM_BATCH_CANDIDATES:
+            model.n_batch = n_batch
+            model.reset()
+            n_prompt = len(model.tokenize(prompt.encode("utf-8")))
+
+            start = time.perf_counter()
+            first = None
+            n_out = 0
+            for _ in model(prompt, max_tokens=decode_tokens, temperature=0.0, stream=True):
+                if first is None:
+                    first = time.perf_counter()
+                n_out += 1
+            end = time.perf_counter()
+
+            prefill_s = (first or end) - start
+            decode_s = end - (first or end)
+            runs.append({
+                "n_threads": n_threads,
+                "n_batch": n_batch,
+                "prefill_tok_s": n_prompt / prefill_s if prefill_s > 0 else 0.0,
+                "decode_tok_s": (n_out - 1) / decode_s if decode_s > 0 and n_out > 1 else 0.0,
+            })
+            print(f"  llm threads={n_threads:<2} batch={n_batch:<4} "
+                  f"prefill={runs[-1]['prefill_tok_s']:.1f} tok/s decode={runs[-1]['decode_tok_s']:.1f} tok/s")
+        del model
+
+    best_threads = max(runs, key=lambda r: r["decode_tok_s"])["n_threads"]
+    same_threads = [r for r in runs if r["n_threads"] == best_threads]
+    best_batch = max(same_threads, key=lambda r: r["prefill_tok_s"])["n_batch"]
+    return {"best_threads": best_threads, "best_batch": best_batch, "runs": runs}
+
+
+def probe_asr(model_name: str = ASR_PROBE_MODEL, total: int = None, seconds: float = 5.0) -> dict:
+    """Measures Whisper real-time factor (processing time / audio time) per thread count."""
+    from faster_whisper import WhisperModel
+    from asr import synthetic_clip
+
+    total = total or max(1, physical_cores() - RESERVED_CORES)
+    audio = synthetic_clip(seconds)
+    runs = []
+
+    for n_threads in _thread_candidates(total):
+        model = WhisperModel(model_name, device="cpu", compute_type="int8", cpu_threads=n_threads)
+        start = time.perf_counter()
+        segments, _ = model.transcribe(audio, beam_size=1, language="en", vad_filter=False)
+        list(segments)
+        elapsed = time.perf_counter() - start
+        runs.append({"n_threads": n_threads, "rtf": elapsed / seconds})
+        print(f"  asr threads={n_threads:<2} rtf={runs[-1]['rtf']:.3f}")
+        del model
+
+    best = min(runs, key=lambda r: r["rtf"])
+    return {"model": model_name, "best_threads": best["n_threads"], "runs": runs}
+
+
+def probe_embed(model_name: str = EMBED_PROBE_MODEL, n_chunks: int = 256) -> dict:
+    """
+    Measures sentence-transformers ingestion throughput (chunks/sec) per
+    encode batch size, on chunks of the length the chunker produces.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    apply_torch_threads("embed")
+    model = SentenceTransformer(model_name)
+    sentence = "The OSAS office is on the Mezzanine level, open 9 AM to 5 PM. "
+    chunks = [sentence * (1 + i % 15) for i in range(n_chunks)]
+    chunks.sort(key=len)
+    runs = []
+
+    for batch in EMBED_BATCH_CANDIDATES:
+        start = time.perf_counter()
+        model.encode(chunks, batch_size=batch)
+        elapsed = time.perf_counter() - start
+        runs.append({"batch": batch, "chunks_s": n_chunks / elapsed})
+        print(f"  embed batch={batch:<4} {runs[-1]['chunks_s']:.1f} chunks/s")
+
+    best = max(runs, key=lambda r: r["chunks_s"])
+    return {"model": model_name, "best_batch": best["batch"], "runs": runs}
+
+
+def run_probe(model_path: str = LLM_MODEL_PATH, force: bool = False) -> dict:
+    """Runs whichever probes are missing from the cache (all of them if force)."""
+    global _budget
+    results = {} if force else dict(load_tuning(model_path))
+
+    if "llm" not in results and os.path.exists(model_path):
+        print("Tuning llama.cpp threads/batch...")
+        try:
+            results["llm"] = probe_llm(model_path)
+        except Exception as e:
+            print(f"LLM probe failed: {e}")
+
+    if "asr" not in results:
+        print("Tuning Whisper threads...")
+        try:
+            results["asr"] = probe_asr()
+        except Exception as e:
+            print(f"ASR probe failed: {e}")
+
+    if "embed" not in results:
+        print("Tuning embedding batch size...")
+        try:
+            results["embed"] = probe_embed()
+        except Exception as e:
+            print(f"Embedding probe failed: {e}")
+
+    results["probed_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    save_tuning(results, model_path)
+    _budget = None
+    return results
+
+
+def ensure_tuned(model_path: str = LLM_MODEL_PATH) -> ThreadBudget:
+    """
+    Startup hook: probe once per host (results land in TUNING_CACHE), then hand
+    back the budget. Set BEARNARD_AUTOTUNE=0 to skip the probe on boot.
+    """
+    if os.environ.get("BEARNARD_AUTOTUNE", "1") != "0" and "probed_at" not in load_tuning(model_path):
+        run_probe(model_path)
+    return get_budget()
+
+
+def report(results: dict, budget: ThreadBudget):
+    print("\nHOST TUNING REPORT")
+    print("--------------------------------")
+    print(f"Host: {platform.node()} ({platform.machine()}), physical cores: {physical_cores()}")
+
+    llm = results.get("llm")
+    if llm:
+        print("\nllama.cpp (GGUF)")
+        print(f"  {'threads':>7} {'batch':>6} {'prefill tok/s':>14} {'decode tok/s':>13}")
+        for r in llm["runs"]:
+            mark = " <" if (r["n_threads"], r["n_batch"]) == (llm["best_threads"], llm["best_batch"]) else ""
+            print(f"  {r['n_threads']:>7} {r['n_batch']:>6} {r['prefill_tok_s']:>14.1f} {r['decode_tok_s']:>13.1f}{mark}")
+    else:
+        print("\nllama.cpp: not measured (model missing?)")
+
+    asr = results.get("asr")
+    if asr:
+        print(f"\nWhisper ({asr['model']}, int8)")
+        print(f"  {'threads':>7} {'RTF':>7}")
+        for r in asr["runs"]:
+            mark = " <" if r["n_threads"] == asr["best_threads"] else ""
+            print(f"  {r['n_threads']:>7} {r['rtf']:>7.3f}{mark}")
+    else:
+        print("\nWhisper: not measured")
+
+    embed = results.get("embed")
+    if embed:
+        print(f"\nEmbeddings ({embed['model']})")
+        print(f"  {'batch':>7} {'chunks/s':>9}")
+        for r in embed["runs"]:
+            mark = " <" if r["batch"] == embed["best_batch"] else ""
+            print(f"  {r['batch']:>7} {r['chunks_s']:>9.1f}{mark}")
+    else:
+        print("\nEmbeddings: not measured")
+
+    print("\n" + budget.describe())
+
+
+if __name__ == "__main__":
+    force = "--force" in sys.argv
+    if "--report" in sys.argv and not force:
+        results = load_tuning()
+    else:
+        results = run_probe(force=force)
+    report(results, get_budget())
@@ -1,17 +1,22 @@
 import sounddevice as sd
 import numpy as np
 import queue
-import time
+from audio_channel import AudioChannel, DROP_NEWEST, mic_meter, PCMBuffer, as_float32, normalize_peak_inplace
 
 class VoiceInput:
-    def __init__(self, model, device=None, sample_rate=16000):
+    def __init__(self, engine, device=None, sample_rate=16000):
         self.device = device
         self.sample_rate = sample_rate
-        self.model = model 
+        self.engine = engine
         
         self.silence_threshold = 0.01   
         self.silence_duration = 1.2
 
+        # The callback writes samples straight into `recording`; the channel
+        # only carries per-block levels for the silence check (~5 s of slack).
+        self.audio_queue = AudioChannel("record", maxsize=50, policy=DROP_NEWEST)
+        self.recording = PCMBuffer(initial_samples=sample_rate * 10)
+
     def adjust_for_ambient_noise(self, duration=1.0):
         print(f"\nCalibrating background noise on Device {self.device}...")
         try:
@@ -30,18 +35,27 @@ class VoiceInput:
             print(f"Calibration failed: {e}. Using default threshold.")
             self.silence_threshold = 0.01
 
-    def record_until_silence(self, callback=None, max_seconds=30):
-        audio_queue = queue.Queue(maxsize=50)
-        
+    def record_until_silence(self, max_seconds=30):
+        """
+        Returns a float32 view of the recording. The memory is reused by the
+        next call, so transcribe (or copy) it before recording again.
+        """
+        audio_queue = self.audio_queue
+        audio_queue.clear()
+        recording = self.recording
+        recording.reset()
+        recording.max_samples = int(self.sample_rate * max_seconds)
+
         def audio_callback(indata, frames, time, status):
             if status:
                 print(status)
-            try:
-                audio_queue.put_nowait(indata.copy())
-            except queue.Full:
-                pass 
+            # RMS is computed here, once, and also feeds the GUI meter
+            block = indata[:, 0]
+            vol = float(np.sqrt(np.dot(block, block) / len(block)))
+            mic_meter.update(vol)
+            recording.append(block)
+            audio_queue.put(vol, status)
 
-        audio_buffer = []
         silence_timer = 0
         total_duration = 0
         chunk_duration = 0.1
@@ -53,17 +67,11 @@ class VoiceInput:
             
             while True:
                 try:
-                    chunk = audio_queue.get(timeout=0.5)
+                    vol = audio_queue.get(timeout=0.5)
                 except queue.Empty:
                     continue
 
-                chunk = chunk.flatten()
-                audio_buffer.append(chunk)
                 total_duration += chunk_duration
-
-                vol = np.sqrt(np.mean(chunk**2))
-                if callback:
-                    callback(vol)
                 
                 is_talking = vol > self.silence_threshold
                 if is_talking:
@@ -78,29 +86,27 @@ class VoiceInput:
                     print("\nMax recording duration reached.")
                     break
 
-        return np.concatenate(audio_buffer, axis=0)
+        return recording.view()
 
     def transcribe(self, audio_data):
+        """
+        Accepts an ndarray view, memoryview or bytes of float32 samples. Peak
+        normalisation happens in place when the buffer is writable, so the
+        caller's buffer is modified; read-only buffers are left untouched.
+        """
         if audio_data is None or len(audio_data) == 0: 
             return ""
         
-        max_val = np.max(np.abs(audio_data))
-        if max_val > 0:
-            audio_data = audio_data / max_val
+        audio_data = normalize_peak_inplace(as_float32(audio_data))
         
         try:
-            segments, _ = self.model.transcribe(
-                audio_data, 
+            return self.engine.transcribe(
+                audio_data,
                 beam_size=1,
                 language="en",
-                condition_on_previous_text=False, 
                 vad_filter=True,
-                vad_parameters=dict(min_silence_duration_ms=500), 
                 initial_prompt="Hello, I am asking a question to the AI concierge."
             )
-            
-            text = " ".join([s.text for s in segments]).strip()
-            return text
         except Exception as e:
             print(f"Transcription Error: {e}")
             return ""
\ No newline at end of file
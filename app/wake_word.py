@@ -1,19 +1,29 @@
 import sounddevice as sd
 import numpy as np
-import collections
+import threading
 import queue
 import time
+from audio_channel import AudioChannel, DROP_OLDEST, mic_meter
+
+# Longest the listener blocks on a quiet room before it checks whether the
+# stream was stopped (the energy gate posts nothing while it is silent)
+POLL_INTERVAL = 0.1
 
 class WakeWordDetector:
-    def __init__(self, model, device=None):
+    def __init__(self, engine, device=None):
         self.sample_rate = 16000
         self.device = device
-        self.model = model
+        self.engine = engine
         
         # Reduced variants list
         self.wake_variants = [
             "hey bearnard", "hey bernard", "ok bearnard", "okay bernard", "bearnard"
         ]
+
+        # CONSTRAINED DECODE: bias the small wake model towards the name and
+        # stop after a few tokens, since we only care about a short phrase.
+        self.hotwords = "Hey Bearnard, Okay Bearnard, Bernard"
+        self.max_new_tokens = 8
         
         # BUFFER SETTINGS
         self.buffer_duration = 2.0  
@@ -22,25 +32,79 @@ class WakeWordDetector:
         # INFERENCE INTERVAL: Run inference every 3 chunks (approx 0.6s)
         self.inference_interval = 3 
         self.chunk_counter = 0
+        self.low_power = False
+
+        # Optional callable; while it returns True (our own voice is playing)
+        # the stream keeps running but nothing is transcribed, so capture can
+        # be re-armed during playback without waking on ourselves.
+        self.suppress = None
+        self._suppressed = False
         
         chunks_in_buffer = int(self.buffer_duration / self.chunk_duration)
-        self.audio_buffer = collections.deque(maxlen=chunks_in_buffer)
+
+        # RING BUFFER: the callback writes audio straight into a preallocated
+        # array and computes the block RMS there, so silence never wakes the
+        # Python worker.
+        self._ring = np.zeros(int(self.sample_rate * self.buffer_duration), dtype=np.float32)
+        self._written = 0
+        self._ring_lock = threading.Lock()
         
         self.energy_threshold = 0.002 
         
         self.stream = None
-        self.audio_queue = queue.Queue()
+        # Only loud blocks are posted here (their RMS), so the consumer wakes
+        # on speech, not on every 200 ms of lobby silence.
+        self.audio_queue = AudioChannel("wake", maxsize=chunks_in_buffer, policy=DROP_OLDEST)
         self.is_listening = False
 
     def _callback(self, indata, frames, time, status):
         if status:
             print(f"Audio Status: {status}")
-        self.audio_queue.put(indata.copy())
+        block = indata[:, 0]
+        vol = float(np.sqrt(np.dot(block, block) / len(block)))
+
+        with self._ring_lock:
+            n = len(self._ring)
+            start = self._written % n
+            end = start + len(block)
+            if end <= n:
+                self._ring[start:end] = block
+            else:
+                split = n - start
+                self._ring[start:] = block[:split]
+                self._ring[:end - n] = block[split:]
+            self._written += len(block)
+
+        mic_meter.update(vol)
+        if vol >= self.energy_threshold:
+            self.audio_queue.put(vol, status)
+
+    def _snapshot(self) -> np.ndarray:
+        """Last `buffer_duration` seconds of audio, oldest first (a copy)."""
+        with self._ring_lock:
+            n = len(self._ring)
+            if self._written < n:
+                return self._ring[:self._written].copy()
+            start = self._written % n
+            return np.concatenate((self._ring[start:], self._ring[:start]))
+
+    def set_low_power(self, on: bool):
+        """
+        Idle mode: infer every 6 loud chunks (~1.2s) instead of every 3.
+        "Hey Bearnard" takes about a second to say, so it still lands inside
+        the 2s window.
+        """
+        self.low_power = on
+        self.inference_interval = 6 if on else 3
+
+    def clear_buffer(self):
+        with self._ring_lock:
+            self._written = 0
+        self.audio_queue.clear()
 
     def start_stream(self):
         if self.is_listening: return
-        self.audio_queue = queue.Queue()
-        self.audio_buffer.clear()
+        self.clear_buffer()
         self.chunk_counter = 0
         try:
             self.stream = sd.InputStream(
@@ -64,58 +128,64 @@ class WakeWordDetector:
             self.stream = None
         self.is_listening = False
 
-    def listen_for_wake_word(self, timeout=None, volume_callback=None, transcript_callback=None):
+    def listen_for_wake_word(self, timeout=None, transcript_callback=None):
+        """
+        True once the wake word is heard; False after `timeout` seconds or as
+        soon as stop_stream() is called from another thread.
+        """
         if not self.is_listening:
             self.start_stream()
 
         start_time = time.time()
 
-        while True:
+        while self.is_listening:
             # 1. Timeout Check
-            if timeout and (time.time() - start_time > timeout):
-                return False
+            wait = POLL_INTERVAL
+            if timeout:
+                wait = min(wait, timeout - (time.time() - start_time))
+                if wait <= 0:
+                    return False
 
             try:
-                # 2. NON-BLOCKING GET
-                chunk = self.audio_queue.get_nowait()
-                chunk = chunk.flatten()
-                
-                self.audio_buffer.append(chunk)
-                
-                vol = np.sqrt(np.mean(chunk**2))
-                if volume_callback:
-                    volume_callback(vol)
+                # 2. BLOCKING GET: only loud blocks arrive (energy gate runs
+                #    in the callback), so we sleep through silence.
+                self.audio_queue.get(timeout=wait)
+
+                if self.suppress is not None:
+                    if self.suppress():
+                        self._suppressed = True
+                        continue
+                    if self._suppressed:
+                        # Playback just ended: forget the echo of it
+                        self._suppressed = False
+                        self.clear_buffer()
+                        self.chunk_counter = 0
+                        continue
 
                 # 3. LAG PROTECTION
                 # If queue is backing up, skip processing to catch up
                 if self.audio_queue.qsize() > 2:
                     continue
 
-                # 4. ENERGY CHECK
-                if vol < self.energy_threshold:
-                    continue 
-
-                # 5. INTERVAL CHECK
+                # 4. INTERVAL CHECK
                 self.chunk_counter += 1
                 if self.chunk_counter % self.inference_interval != 0:
                     continue
 
-                # 6. RUN INFERENCE
-                full_audio = np.concatenate(self.audio_buffer)
+                # 5. RUN INFERENCE
+                full_audio = self._snapshot()
                 
                 if len(full_audio) < 16000:
                     continue
 
-                segments, _ = self.model.transcribe(
-                    full_audio, 
-                    beam_size=1, 
-                    language="en", 
-                    condition_on_previous_text=False,
-                    vad_filter=True, 
-                    vad_parameters=dict(min_silence_duration_ms=500)
-                )
-                
-                text = " ".join(s.text for s in segments).strip().lower()
+                text = self.engine.transcribe(
+                    full_audio,
+                    beam_size=1,
+                    language="en",
+                    vad_filter=True,
+                    hotwords=self.hotwords,
+                    max_new_tokens=self.max_new_tokens
+                ).lower()
                 clean_text = text.replace(",", "").replace(".", "").replace("!", "").strip()
 
                 # --- NEW FILTER APPLIED HERE ---
@@ -137,8 +207,8 @@ class WakeWordDetector:
                     return True
 
             except queue.Empty:
-                time.sleep(0.02)
                 continue
             except Exception as e:
                 print(f"Wake Word Error: {e}")
-                continue
\ No newline at end of file
+                continue
+        return False
@@ -0,0 +1,160 @@
+"""
+Ingestion memory benchmark (CPU).
+
+Writes a synthetic N-page handbook PDF (LOCATION: blocks, long paragraphs,
+no external tools needed) and ingests it in a fresh interpreter per mode,
+reporting peak RSS:
+  - legacy:    pages concatenated into one string, _chunk_text on the whole
+               document, embeddings kept as Python lists (.tolist())
+  - streaming: rag._iter_text -> rag._iter_chunks -> bounded windows, one
+               numpy batch per window (what build_from_data_folder does)
+
+The embedding model is replaced by a 768-dim float32 stand-in (the size of
+all-mpnet-base-v2 vectors), so the numbers measure the pipeline, not torch.
+
+Usage (from the repo root):
+    python bench/chunker.py [--pages 500] [--pdf /tmp/handbook.pdf]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+EMBED_DIM = 768
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 48):
+    """Minimal uncompressed PDF: one Helvetica text stream per page."""
+    sentence = ("Students may request documents at the window during office hours, "
+                "bring a valid ID and the claim stub. ")
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+
+    for p in range(pages):
+        lines = []
+        for n in range(lines_per_page):
+            if n % 12 == 0:
+                lines.append(f"LOCATION: Building {p % 7}, Room {p}-{n}")
+            elif n % 12 == 11:
+                lines.append("")
+            else:
+                lines.append(sentence[(n * 7) % 40:] + f"Ref {p}.{n}.")
+        text = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*"
+            for line in lines
+        ) + " ET"
+        stream = text.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    with open(path, "wb") as fh:
+        fh.write(b"%PDF-1.4\n")
+        offsets = []
+        for i, body in enumerate(objects, start=1):
+            offsets.append(fh.tell())
+            fh.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+        xref = fh.tell()
+        fh.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for off in offsets:
+            fh.write(b"%010d 00000 n \n" % off)
+        fh.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                 % (len(objects) + 1, xref))
+
+
+def _fake_encode(chunks, rng):
+    return rng.standard_normal((len(chunks), EMBED_DIM), dtype="float32")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def run_legacy(pdf: str, rng) -> int:
+    import pypdf
+    from rag import _chunk_text
+
+    text = ""
+    for page in pypdf.PdfReader(pdf).pages:
+        extracted = page.extract_text()
+        if extracted:
+            text += extracted + "\n"
+    chunks = _chunk_text(text)
+    embeddings = _fake_encode(chunks, rng).tolist()
+    return len(embeddings)
+
+
+def run_streaming(pdf: str, rng) -> int:
+    from rag import _iter_text, _iter_chunks, _windows, EMBED_WINDOW_BATCHES
+    from tuning import DEFAULT_EMBED_BATCH
+
+    n = 0
+    for window in _windows(_iter_chunks(_iter_text(pdf)), DEFAULT_EMBED_BATCH * EMBED_WINDOW_BATCHES):
+        window.sort(key=len)
+        embeddings = _fake_encode(window, rng)
+        embeddings.tolist()   # what one index write hands to chromadb
+        n += len(window)
+    return n
+
+
+def child(mode: str, pdf: str):
+    import numpy as np
+    import pypdf  # noqa: F401  (import cost is common to both modes)
+    import rag    # noqa: F401
+
+    rng = np.random.default_rng(0)
+    base = _peak_rss_mb()
+    start = time.perf_counter()
+    n = (run_legacy if mode == "legacy" else run_streaming)(pdf, rng)
+    print(json.dumps({"mode": mode, "chunks": n, "seconds": time.perf_counter() - start,
+                      "base_mb": base, "peak_mb": _peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--pdf", default=None, help="where to write the synthetic PDF (default: temp dir)")
+    parser.add_argument("--child", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.pdf)
+        return
+
+    import tempfile
+    pdf = args.pdf or os.path.join(tempfile.gettempdir(), f"bearnard_handbook_{args.pages}p.pdf")
+    write_synthetic_pdf(pdf, args.pages)
+    print(f"Synthetic PDF: {pdf} ({args.pages} pages, {os.path.getsize(pdf) / 1e6:.1f} MB)")
+
+    results = []
+    for mode in ("legacy", "streaming"):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--pdf", pdf],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{mode} failed: {proc.stderr.strip().splitlines()[-1]}")
+            sys.exit(1)
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print("\nINGESTION MEMORY")
+    print("--------------------------------")
+    print(f"{'mode':<10} {'chunks':>7} {'seconds':>8} {'peak RSS MB':>12} {'over base MB':>13}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['chunks']:>7} {r['seconds']:>8.2f} {r['peak_mb']:>12.1f} "
+              f"{r['peak_mb'] - r['base_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Embedding backend benchmark (CPU).
+
+Loads each embedding backend in a fresh interpreter, encodes the chunks of
+data/ as an in-memory index, then times single-query encodes (the part that
+sits on the critical path of every question) and reports:
+  - load time and peak RSS after load / after the run
+  - query-encode latency p50 / p95
+  - recall@k against the reference backend: how many of the reference
+    top-k chunks the backend also returns for the same question
+
+Usage (from the repo root):
+    python bench/embed_backends.py [--backends st-mpnet,onnx-mpnet-int8,onnx-minilm-int8]
+                                   [--reference st-mpnet] [--k 5] [--repeats 5]
+
+ONNX backends must be exported first: python app/rag.py export-onnx <backend>
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+QUERIES = [
+    "Where is the OSAS office?",
+    "What time does the library open?",
+    "Is the registrar open on Saturday?",
+    "Where can I eat on campus?",
+    "Who created Bearnard?",
+    "Where is the clinic?",
+    "Who do I talk to about scholarships?",
+    "What is on the 6th floor?",
+    "Where do employees park?",
+    "What programs does iAcademy offer?",
+    "Where are the comfort rooms?",
+    "When is the registrar lunch break?",
+]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def child(name: str, k: int, repeats: int):
+    import numpy as np
+    import rag
+
+    backend = rag.get_backend(name)
+    if backend.name != name:
+        print(json.dumps({"backend": name, "error": "not available"}))
+        return
+
+    start = time.perf_counter()
+    backend.load()
+    load_s = time.perf_counter() - start
+    rss_loaded = _peak_rss_mb()
+
+    files = sorted(f for f in os.listdir(rag.DATA_FOLDER) if os.path.isfile(os.path.join(rag.DATA_FOLDER, f)))
+    chunks = list(rag._iter_index_chunks(files, workers=1, deduper=rag.ChunkDeduper()))
+    ids = [_id for _, _id, _ in chunks]
+    index = backend.encode([doc for doc, _, _ in chunks])
+
+    for q in QUERIES[:2]:   # warm-up
+        backend.encode_query(q)
+    latencies, top = [], {}
+    for q in QUERIES:
+        for _ in range(repeats):
+            t = time.perf_counter()
+            vec = backend.encode_query(q)
+            latencies.append(time.perf_counter() - t)
+        # Same ranking as the L2 search in chromadb (vectors are normalised)
+        order = np.argsort(-(index @ vec))[:k]
+        top[q] = [ids[i] for i in order]
+
+    latencies.sort()
+    print(json.dumps({
+        "backend": name, "tag": backend.tag, "dim": int(index.shape[1]), "load_s": load_s,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "rss_loaded_mb": rss_loaded, "rss_peak_mb": _peak_rss_mb(), "top": top,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="st-mpnet,onnx-mpnet-int8,onnx-minilm-int8")
+    parser.add_argument("--reference", default="st-mpnet")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.k, args.repeats)
+        return
+
+    names = args.backends.split(",")
+    if args.reference not in names:
+        names.insert(0, args.reference)
+
+    results = {}
+    for name in names:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name,
+                               "--k", str(args.k), "--repeats", str(args.repeats)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{name} failed: {proc.stderr.strip().splitlines()[-1]}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        if "error" in r:
+            print(f"{name}: {r['error']}")
+            continue
+        results[name] = r
+
+    ref = results.get(args.reference)
+    print("\nEMBEDDING BACKENDS")
+    print("--------------------------------")
+    print(f"{'backend':<18} {'dim':>4} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'RSS load MB':>12} {'RSS peak MB':>12} {f'recall@{args.k}':>9}")
+    for name, r in results.items():
+        if ref:
+            hits = [len(set(r["top"][q]) & set(ref["top"][q])) / args.k for q in QUERIES]
+            recall = f"{sum(hits) / len(hits):.2f}"
+        else:
+            recall = "n/a"
+        print(f"{name:<18} {r['dim']:>4} {r['load_s']:>7.1f} {r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} "
+              f"{r['rss_loaded_mb']:>12.0f} {r['rss_peak_mb']:>12.0f} {recall:>9}")
+    if ref:
+        print(f"\nrecall@{args.k} = share of {args.reference}'s top-{args.k} chunks also retrieved, "
+              f"averaged over {len(QUERIES)} questions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Startup import-time report.
+
+Runs `python -X importtime` on a fresh interpreter importing the GUI module
+(nothing else is executed) and prints the slowest top-level imports. Heavy
+engines (torch, chromadb, llama_cpp, faster_whisper, sentence_transformers)
+must not show up here: they are loaded lazily once the AI worker starts.
+
+Optionally times how long it takes to build the mic-selection dialog
+(offscreen Qt), which is what a cold kiosk shows first.
+
+Usage (from the repo root):
+    python bench/import_time.py [--module gui] [--top 15] [--budget-ms 1000] [--dialog]
+
+Exits with status 1 if the total import time exceeds --budget-ms or a
+forbidden heavy module got imported, so it can gate CI / release builds.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+HEAVY_MODULES = ["torch", "chromadb", "llama_cpp", "faster_whisper", "sentence_transformers", "ctranslate2"]
+
+
+def profile_imports(module: str):
+    """Returns [(cumulative_us, self_us, depth, name)] from -X importtime."""
+    code = f"import sys; sys.path.insert(0, {APP_DIR!r}); import {module}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=os.path.join(APP_DIR, ".."))
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:      1234 |       5678 |   package.module"
+        self_us, cum_us, name = line.split(":", 1)[1].split("|", 2)
+        name = name.rstrip()[1:]   # one separator space, then 2 spaces per nesting level
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((int(cum_us), int(self_us), depth, name.strip()))
+    if proc.returncode != 0:
+        print(proc.stderr.splitlines()[-1] if proc.stderr else "import failed")
+    return rows, proc.returncode
+
+
+def time_dialog() -> float:
+    """Seconds from interpreter start to a constructed DeviceSelectionDialog."""
+    code = (
+        "import time, sys; t0 = time.perf_counter(); "
+        f"sys.path.insert(0, {APP_DIR!r}); "
+        "from PyQt6.QtWidgets import QApplication; app = QApplication([]); "
+        "import gui; gui.DeviceSelectionDialog(); print(time.perf_counter() - t0)"
+    )
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env,
+                          cwd=os.path.join(APP_DIR, ".."))
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="gui")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--dialog", action="store_true", help="also time the mic dialog (offscreen Qt)")
+    args = parser.parse_args()
+
+    rows, rc = profile_imports(args.module)
+    if rc != 0:
+        sys.exit(1)
+
+    top_level = [r for r in rows if r[2] == 0]
+    total_ms = sum(r[0] for r in top_level) / 1000
+
+    print(f"\nIMPORT TIME: import {args.module}")
+    print("--------------------------------")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cum, own, _, name in sorted(top_level, reverse=True)[:args.top]:
+        print(f"{cum / 1000:>14.1f} {own / 1000:>9.1f}  {name}")
+    print(f"\nTotal: {total_ms:.0f} ms across {len(rows)} modules")
+
+    failed = False
+    imported = {r[3] for r in rows}
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+
+    if args.dialog:
+        try:
+            print(f"Mic dialog ready after {time_dialog() * 1000:.0f} ms (cold interpreter, offscreen)")
+        except RuntimeError as e:
+            print(f"Dialog timing failed: {e}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+"""
+Per-module microbenchmarks with stored baselines (CPU, no network, no mic).
+
+  chunk.text           rag._chunk_text on a synthetic handbook            chars/s
+  rag.id_for           rag._id_for over index-sized chunks                ids/s
+  ingest.chunks        parse -> chunk -> dedup -> id of synthetic files   chunks/s
+                       (rag._iter_index_chunks, one worker, no encoder)
+  rag.search@N         Rag.search on a synthetic N-chunk chroma index     queries/s
+                       (hashing encoder, so the time is the index + filter)
+  wake.block           WakeWordDetector callback: RMS gate + ring write   blocks/s
+  wake.snapshot        WakeWordDetector buffer assembly (2 s window)      snapshots/s
+  voice.prep           VoiceInput.transcribe on a 6 s clip, stub ASR      clips/s
+                       (the float32 / peak-normalise pre-processing)
+  prompt.build         ConversationSession.build_prompt, 6 turns          prompts/s
+  llm.ask              LLM.ask: stub model (wrapper overhead), or a tiny  tokens/s
+                       local GGUF with --gguf
+
+Every benchmark is warmed up once, then timed in rounds long enough to
+outlast the timer's resolution; the median time per operation is what gets
+stored and compared. Benchmarks whose dependency is not installed are
+reported as skipped, not failed.
+
+Usage (from the repo root):
+    python bench/micro.py run [--only chunk,rag] [--quick] [--corpus 1000,10000] [--gguf tiny.gguf]
+                              [--save bench/baselines/kiosk.json]
+    python bench/micro.py compare bench/baselines/kiosk.json [--against new.json] [--threshold 0.15]
+
+compare reruns the benchmarks in the baseline (or reads --against, a file
+saved with run --save) and exits with status 1 if any of them got more
+than --threshold slower, so it can gate a performance change.
+"""
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import contextlib
+import subprocess
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+import numpy as np
+
+DEFAULT_CORPUS_SIZES = [1000, 10000]
+DEFAULT_THRESHOLD = 0.15
+
+_VOCAB = ("library clinic registrar cashier canteen lobby elevator stairs office room floor building "
+          "tower hall open close monday friday saturday hours window students faculty guidance "
+          "admission enrollment documents id card claim stub payment schedule computer lab comfort "
+          "room printing scholarship counseling events auditorium gym parking entrance exit").split()
+
+_BENCHMARKS = []
+
+
+def benchmark(name: str, unit: str):
+    """
+    Registers a setup function. It gets the parsed args and returns
+    (op, items per op, variant); op() is what gets timed. Setups that need
+    more than one size return a list of (name, op, items, variant).
+    """
+    def register(setup):
+        _BENCHMARKS.append((name, unit, setup))
+        return setup
+    return register
+
+
+# --- SYNTHETIC DATA ---
+
+def synthetic_handbook(blocks: int, seed: int = 0) -> str:
+    """LOCATION: blocks of prose separated by blank lines, like data/."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for b in range(blocks):
+        sentences = []
+        for _ in range(int(rng.integers(3, 9))):
+            words = rng.choice(_VOCAB, size=int(rng.integers(8, 20)))
+            sentences.append(" ".join(words).capitalize() + ".")
+        out.append(f"LOCATION: Building {b % 7}, Room {b}\n" + " ".join(sentences))
+    return "\n\n".join(out) + "\n"
+
+
+def synthetic_chunks(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [f"LOCATION: Room {i}. " + " ".join(rng.choice(_VOCAB, size=int(rng.integers(60, 160))))
+            for i in range(n)]
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Rag and the ingestion report print progress; keep it out of the table."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# --- STAND-INS (no downloads, no model files) ---
+
+def _hash_backend():
+    import rag
+
+    class HashEmbeddingBackend(rag.EmbeddingBackend):
+        """Bag-of-words hashing encoder: deterministic, numpy only, no download."""
+        name = "bench-hash"
+        model = "crc32-bow"
+
+        def __init__(self, dim: int = 384):
+            super().__init__()
+            self._dim = dim
+
+        def _load(self):
+            pass
+
+        @property
+        def dim(self) -> int:
+            return self._dim
+
+        def encode(self, texts, batch_size: int = 32):
+            out = np.zeros((len(texts), self._dim), dtype=np.float32)
+            for i, text in enumerate(texts):
+                for word in text.lower().split():
+                    out[i, zlib.crc32(word.encode("utf-8")) % self._dim] += 1.0
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+            return out
+
+    backend = HashEmbeddingBackend()
+    rag.register_backend(backend)
+    return backend
+
+
+class _StubLlama:
+    """Stands in for llama_cpp.Llama: whitespace tokens, echoes the end of the prompt."""
+
+    def __init__(self):
+        self.draft_model = None
+
+    def tokenize(self, data: bytes, add_bos: bool = True, special: bool = False):
+        return data.split()
+
+    def reset(self):
+        pass
+
+    def __call__(self, prompt, max_tokens=256, stream=False, **kwargs):
+        words = prompt.split()[-max_tokens:]
+        return ({"choices": [{"text": " " + w}]} for w in words)
+
+
+# --- BENCHMARKS ---
+
+@benchmark("chunk.text", "chars")
+def bench_chunk_text(args):
+    from rag import _chunk_text
+    text = synthetic_handbook(200 if args.quick else 1000)
+    return (lambda: _chunk_text(text)), len(text), ""
+
+
+@benchmark("rag.id_for", "ids")
+def bench_id_for(args):
+    from rag import _id_for
+    chunks = synthetic_chunks(1000)
+    return (lambda: [_id_for(c) for c in chunks]), len(chunks), ""
+
+
+@benchmark("ingest.chunks", "chunks")
+def bench_ingest(args):
+    import rag
+    from dedup import ChunkDeduper
+
+    folder = tempfile.mkdtemp(prefix="bearnard_micro_data_")
+    files = []
+    for i in range(4 if args.quick else 16):
+        fname = f"handbook_{i}.txt"
+        with open(os.path.join(folder, fname), "w", encoding="utf-8") as fh:
+            fh.write(synthetic_handbook(100, seed=i))
+        files.append(fname)
+
+    def op():
+        rag.DATA_FOLDER, saved = folder, rag.DATA_FOLDER
+        try:
+            n = 0
+            with _quiet():
+                for _ in rag._iter_index_chunks(files, workers=1, deduper=ChunkDeduper()):
+                    n += 1
+            return n
+        finally:
+            rag.DATA_FOLDER = saved
+
+    items = op()
+    _cleanup.append(folder)
+    return op, items, ""
+
+
+@benchmark("rag.search", "queries")
+def bench_rag_search(args):
+    import rag
+
+    backend = _hash_backend()
+    rng = np.random.default_rng(1)
+    queries = [" ".join(rng.choice(_VOCAB, size=8)) for _ in range(16)]
+    runs = []
+    for size in args.corpus:
+        folder = tempfile.mkdtemp(prefix="bearnard_micro_chroma_")
+        _cleanup.append(folder)
+        with _quiet():
+            r = rag.Rag(backend=backend.name, chroma_path=folder)
+        chunks = synthetic_chunks(size, seed=size)
+        batch = rag.INDEX_WRITE_BATCH
+        for b in range(0, size, batch):
+            part = chunks[b:b + batch]
+            r.col.add(documents=part, embeddings=backend.encode(part).tolist(),
+                      ids=[rag._id_for(f"{b + i}:{c}") for i, c in enumerate(part)],
+                      metadatas=[{"source_file": "synthetic.txt", "chunk_index": b + i} for i in range(len(part))])
+
+        def op(r=r):
+            with _quiet():
+                for q in queries:
+                    r.search(q)
+
+        runs.append((f"rag.search@{size}", op, len(queries), backend.tag))
+    return runs
+
+
+def _wake_detector():
+    import asr
+    from wake_word import WakeWordDetector
+    return WakeWordDetector(engine=asr.StubEngine())
+
+
+@benchmark("wake.block", "blocks")
+def bench_wake_block(args):
+    det = _wake_detector()
+    det.energy_threshold = 0.01
+    samples = int(det.sample_rate * det.chunk_duration)
+    rng = np.random.default_rng(2)
+    # Mostly lobby noise below the gate, every fourth block loud enough to be posted
+    blocks = [(level * rng.standard_normal(samples)).astype(np.float32).reshape(-1, 1)
+              for level in (0.003, 0.003, 0.003, 0.05) * 8]
+
+    def op():
+        for block in blocks:
+            det._callback(block, samples, None, None)
+        det.audio_queue.clear()
+
+    return op, len(blocks), ""
+
+
+@benchmark("wake.snapshot", "snapshots")
+def bench_wake_snapshot(args):
+    det = _wake_detector()
+    samples = int(det.sample_rate * det.chunk_duration)
+    block = np.full((samples, 1), 0.05, dtype=np.float32)
+    # Wrap the ring once, so the snapshot has to stitch two halves
+    for _ in range(int(det.buffer_duration / det.chunk_duration) + 3):
+        det._callback(block, samples, None, None)
+    det.audio_queue.clear()
+    return det._snapshot, 1, ""
+
+
+@benchmark("voice.prep", "clips")
+def bench_voice_prep(args):
+    import asr
+    from voice_input import VoiceInput
+
+    ear = VoiceInput(engine=asr.StubEngine())
+    with _quiet():
+        ear.engine.load()
+    clip = asr.synthetic_clip(6.0)
+    work = np.empty_like(clip)
+
+    def op():
+        # transcribe normalises in place, like it does the recording buffer
+        np.copyto(work, clip)
+        ear.transcribe(work)
+
+    return op, 1, ""
+
+
+@benchmark("prompt.build", "prompts")
+def bench_prompt(args):
+    from session import ConversationSession, Turn, SYSTEM_PROMPT
+
+    class CharCounter:
+        def count_tokens(self, text):
+            return (len(text) + 3) // 4
+
+    session = ConversationSession(CharCounter(), SYSTEM_PROMPT)
+    chunks = synthetic_chunks(30, seed=3)
+    for i in range(6):
+        turn = Turn(f"Where is the {_VOCAB[i]}?", chunks[i * 5:i * 5 + 5] if i % 2 == 0 else [])
+        turn.answer = f"The {_VOCAB[i]} is on the {i + 2}th floor of the tower, open until five."
+        session.turns.append(turn)
+    return session.build_prompt, 1, ""
+
+
+@benchmark("llm.ask", "tokens")
+def bench_llm(args):
+    import llm
+
+    prompt = ("[INST] " + synthetic_handbook(6, seed=4) +
+              "\n### [USER QUESTION]\nWhere is the clinic?\n\n### [BEARNARD'S ANSWER]\n[/INST]")
+    if args.gguf:
+        llm.LLM_MODEL_PATH = args.gguf
+        with _quiet():
+            model = llm.LLM(speculative="off")
+        variant = os.path.basename(args.gguf)
+    else:
+        class StubLLM(llm.LLM):
+            def _load(self):
+                self.model = _StubLlama()
+                self.draft = None
+                self.speculative = "off"
+
+        model = StubLLM(speculative="off")
+        variant = "stub"
+
+    tokens = 32
+    model.ask(prompt, max_tokens=tokens)
+    return (lambda: model.ask(prompt, max_tokens=tokens)), model.last_stats["completion_tokens"], variant
+
+
+# --- RUNNER ---
+
+_cleanup = []
+
+
+def measure(op, min_time: float, rounds: int) -> dict:
+    """Median / min seconds per op over `rounds` rounds of `number` calls each."""
+    op()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed < min_time / 4 else 1 + int(min_time / max(elapsed, 1e-9))
+    times = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        times.append((time.perf_counter() - start) / number)
+    times.sort()
+    return {"median_s": times[len(times) // 2], "min_s": times[0], "max_s": times[-1],
+            "number": number, "rounds": rounds}
+
+
+def host_info() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "system": platform.system(), "cpus": os.cpu_count(), "commit": commit}
+
+
+def run_suite(args, only=None) -> dict:
+    """{"results": {name: stats}, "skipped": {name: reason}, ...} for the selected benchmarks."""
+    results, skipped = {}, {}
+    for name, unit, setup in _BENCHMARKS:
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        try:
+            runs = setup(args)
+        except ImportError as e:
+            skipped[name] = f"{e.name or e} not installed"
+            print(f"{name:<22} skipped ({skipped[name]})")
+            continue
+        if not isinstance(runs, list):
+            runs = [(name,) + tuple(runs)]
+        for run_name, op, items, variant in runs:
+            if only and not any(run_name.startswith(o) for o in only):
+                continue
+            stats = measure(op, args.min_time, args.rounds)
+            stats.update(unit=unit, items=items, variant=variant,
+                         rate=items / stats["median_s"] if stats["median_s"] else 0.0)
+            results[run_name] = stats
+            print(f"{run_name:<22} {stats['median_s'] * 1000:>10.3f} ms/op  {stats['rate']:>12,.0f} {unit}/s"
+                  f"  (min {stats['min_s'] * 1000:.3f}, {stats['rounds']}x{stats['number']})"
+                  + (f"  [{variant}]" if variant else ""))
+    for folder in _cleanup:
+        shutil.rmtree(folder, ignore_errors=True)
+    _cleanup.clear()
+    return {"created": datetime.datetime.now().isoformat(timespec="seconds"), "host": host_info(),
+            "settings": {"min_time": args.min_time, "rounds": args.rounds, "quick": args.quick,
+                         "corpus": args.corpus},
+            "results": results, "skipped": skipped}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Prints the comparison; returns the number of regressions."""
+    if baseline.get("host", {}).get("machine") != current.get("host", {}).get("machine") or \
+            baseline.get("host", {}).get("cpus") != current.get("host", {}).get("cpus"):
+        print(f"Note: baseline host {baseline.get('host')} differs from this one {current.get('host')}\n")
+
+    print(f"{'benchmark':<22} {'baseline ms':>12} {'current ms':>12} {'change':>8}  status")
+    regressions = 0
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            reason = current.get("skipped", {}).get(name.split("@")[0], "not run")
+            print(f"{name:<22} {base['median_s'] * 1000:>12.3f} {'-':>12} {'':>8}  skipped ({reason})")
+            continue
+        if cur.get("variant") != base.get("variant"):
+            print(f"{name:<22} {base['median_s'] * 1000:>12.3f} {cur['median_s'] * 1000:>12.3f} {'':>8}  "
+                  f"not comparable ({base.get('variant') or '-'} vs {cur.get('variant') or '-'})")
+            continue
+        change = cur["median_s"] / base["median_s"] - 1 if base["median_s"] else 0.0
+        if change > threshold:
+            status = "REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        print(f"{name:<22} {base['median_s'] * 1000:>12.3f} {cur['median_s'] * 1000:>12.3f} "
+              f"{change:>+8.1%}  {status}")
+    for name in current["results"]:
+        if name not in baseline["results"]:
+            print(f"{name:<22} {'-':>12} {current['results'][name]['median_s'] * 1000:>12.3f} {'':>8}  new")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def _save(data: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+    print(f"\nSaved {len(data['results'])} results to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(p):
+        p.add_argument("--only", default=None, help="comma-separated name prefixes, e.g. chunk,wake")
+        p.add_argument("--quick", action="store_true", help="smaller inputs and shorter rounds")
+        p.add_argument("--corpus", default=None, help="rag.search corpus sizes (default 1000,10000)")
+        p.add_argument("--gguf", default=None, help="time LLM.ask on this GGUF instead of the stub")
+        p.add_argument("--min-time", type=float, default=None, help="seconds per timing round")
+        p.add_argument("--rounds", type=int, default=None)
+
+    p_run = sub.add_parser("run", help="run the benchmarks")
+    add_run_options(p_run)
+    p_run.add_argument("--save", default=None, help="write the results as a JSON baseline")
+
+    p_cmp = sub.add_parser("compare", help="compare against a stored baseline")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("--against", default=None, help="saved results to compare instead of running")
+    p_cmp.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="allowed slow-down of the median, as a fraction (default 0.15)")
+    p_cmp.add_argument("--save", default=None, help="also write the fresh results here")
+    add_run_options(p_cmp)
+
+    args = parser.parse_args()
+
+    baseline = None
+    if args.command == "compare":
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        # Rerun with the baseline's own settings unless told otherwise
+        settings = baseline.get("settings", {})
+        args.quick = args.quick or settings.get("quick", False)
+        args.corpus = args.corpus or ",".join(str(n) for n in settings.get("corpus", DEFAULT_CORPUS_SIZES))
+        args.min_time = args.min_time or settings.get("min_time")
+        args.rounds = args.rounds or settings.get("rounds")
+
+    args.corpus = [int(n) for n in args.corpus.split(",")] if args.corpus else \
+        ([1000] if args.quick else DEFAULT_CORPUS_SIZES)
+    args.min_time = args.min_time or (0.05 if args.quick else 0.2)
+    args.rounds = args.rounds or (3 if args.quick else 7)
+    only = args.only.split(",") if args.only else None
+
+    if args.command == "run":
+        current = run_suite(args, only)
+        if args.save:
+            _save(current, args.save)
+        return
+
+    if args.against:
+        with open(args.against, "r", encoding="utf-8") as fh:
+            current = json.load(fh)
+    else:
+        names = {n.split("@")[0] for n in baseline["results"]}
+        current = run_suite(args, only or sorted(names))
+        if args.save:
+            _save(current, args.save)
+        print()
+    sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
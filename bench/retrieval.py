@@ -0,0 +1,160 @@
+"""
+Retrieval quality / latency benchmark with a parameter sweep.
+
+For every chunker setting (chunk size x overlap) builds a throwaway index of
+data/ with Rag, runs the gold questions at every top-k, applies every
+strict/fallback distance pair exactly like Rag.search, and reports:
+  - recall      share of gold facts found in the chunks handed to the prompt
+  - raw@k       the same over the top-k before the distance filter
+  - MRR         1 / rank of the first delivered chunk that has a gold fact
+  - docs        chunks delivered per question
+  - tokens      prompt tokens those chunks cost (llama tokenizer of the GGUF
+                when it is available, else chars / 4)
+  - p50 ms      Rag.retrieve latency (query encode + vector search)
+
+Gold set: bench/gold/retrieval.jsonl, one {"question", "facts", "source_file"}
+per line; facts are substrings (case-insensitive) the answer needs.
+
+Usage (from the repo root):
+    python bench/retrieval.py [--chunk-sizes 500,1000] [--overlaps 100,200] [--top-k 5,10,15]
+                              [--strict 1.2,1.5] [--fallback 1.8] [--max-docs 5]
+                              [--backend st-mpnet] [--no-dedup] [--json bench/results/retrieval.jsonl]
+
+--json appends one line per row (with date and encoder tag), so the table
+can be tracked over time.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import rag
+from tuning import LLM_MODEL_PATH
+
+GOLD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gold", "retrieval.jsonl")
+
+
+def _floats(text):
+    return [float(x) for x in text.split(",")]
+
+
+def _ints(text):
+    return [int(x) for x in text.split(",")]
+
+
+def load_gold(path: str = GOLD_PATH) -> list:
+    with open(path, "r", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def token_counter(model_path: str = LLM_MODEL_PATH):
+    """(count(text) -> int, name): the GGUF's own tokenizer if we can load just its vocab."""
+    try:
+        from llama_cpp import Llama
+        llm = Llama(model_path=model_path, vocab_only=True, verbose=False)
+        return (lambda text: len(llm.tokenize(text.encode("utf-8"), add_bos=False))), "llama"
+    except Exception:
+        return (lambda text: (len(text) + 3) // 4), "chars/4"
+
+
+def score(docs: list, facts: list):
+    """(fact recall, reciprocal rank of the first chunk holding a fact)."""
+    lowered = [d.lower() for d in docs]
+    found = sum(1 for f in facts if any(f.lower() in d for d in lowered))
+    rr = 0.0
+    for rank, d in enumerate(lowered, start=1):
+        if any(f.lower() in d for f in facts):
+            rr = 1.0 / rank
+            break
+    return found / len(facts), rr
+
+
+def sweep_chunker(chunk_size, overlap, args, gold, count_tokens) -> list:
+    tmp = tempfile.mkdtemp(prefix="bearnard_retrieval_")
+    try:
+        r = rag.Rag(build_if_empty=True, backend=args.backend, chroma_path=tmp,
+                    chunk_size=chunk_size, overlap=overlap, dedup=not args.no_dedup)
+        n_chunks = r.col.count()
+        rows = []
+        for k in args.top_k:
+            runs = []
+            for g in gold:
+                start = time.perf_counter()
+                hits = r.retrieve(g["question"], k)
+                runs.append((g, hits, time.perf_counter() - start))
+            latencies = sorted(t for _, _, t in runs)
+
+            for strict in args.strict:
+                for fallback in args.fallback:
+                    recall = raw = mrr = docs_n = tokens = 0.0
+                    for g, hits, _ in runs:
+                        docs = rag.select_context(hits, strict, fallback, args.max_docs)
+                        rec, rr = score(docs, g["facts"])
+                        raw += score([h[0] for h in hits], g["facts"])[0]
+                        recall += rec
+                        mrr += rr
+                        docs_n += len(docs)
+                        tokens += count_tokens("\n---\n".join(docs)) if docs else 0
+                    n = len(gold)
+                    rows.append({
+                        "chunk_size": chunk_size, "overlap": overlap, "chunks": n_chunks,
+                        "top_k": k, "strict": strict, "fallback": fallback, "max_docs": args.max_docs,
+                        "recall": recall / n, "raw_recall": raw / n, "mrr": mrr / n,
+                        "docs": docs_n / n, "tokens": tokens / n,
+                        "p50_ms": latencies[len(latencies) // 2] * 1000,
+                        "encoder": r.emb.tag, "chunker": r._chunker_tag,
+                    })
+        return rows
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gold", default=GOLD_PATH)
+    parser.add_argument("--chunk-sizes", type=_ints, default=[rag.CHUNK_SIZE])
+    parser.add_argument("--overlaps", type=_ints, default=[rag.OVERLAP])
+    parser.add_argument("--top-k", type=_ints, default=[5, 10, 15])
+    parser.add_argument("--strict", type=_floats, default=[rag.STRICT_DISTANCE])
+    parser.add_argument("--fallback", type=_floats, default=[rag.FALLBACK_DISTANCE])
+    parser.add_argument("--max-docs", type=int, default=rag.MAX_CONTEXT_DOCS)
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--no-dedup", action="store_true", help="index raw chunks (no normalisation / near-dup drop)")
+    parser.add_argument("--json", default=None, help="append result rows to this JSONL file")
+    args = parser.parse_args()
+
+    gold = load_gold(args.gold)
+    count_tokens, tokenizer = token_counter()
+
+    rows = []
+    for chunk_size in args.chunk_sizes:
+        for overlap in args.overlaps:
+            if overlap >= chunk_size:
+                continue
+            rows.extend(sweep_chunker(chunk_size, overlap, args, gold, count_tokens))
+
+    print(f"\nRETRIEVAL SWEEP ({len(gold)} gold questions, tokens: {tokenizer})")
+    print("--------------------------------")
+    print(f"{'chunk':>6} {'ovl':>4} {'#chunks':>7} {'k':>3} {'strict':>6} {'fallbk':>6} "
+          f"{'recall':>6} {'raw@k':>6} {'MRR':>5} {'docs':>5} {'tokens':>7} {'p50 ms':>7}")
+    for r in rows:
+        print(f"{r['chunk_size']:>6} {r['overlap']:>4} {r['chunks']:>7} {r['top_k']:>3} "
+              f"{r['strict']:>6.2f} {r['fallback']:>6.2f} {r['recall']:>6.2f} {r['raw_recall']:>6.2f} "
+              f"{r['mrr']:>5.2f} {r['docs']:>5.1f} {r['tokens']:>7.0f} {r['p50_ms']:>7.1f}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(args.json, "a", encoding="utf-8") as fh:
+            for r in rows:
+                fh.write(json.dumps(dict(r, date=stamp, tokenizer=tokenizer)) + "\n")
+        print(f"\nAppended {len(rows)} rows to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Wake-check benchmark (CPU).
+
+Feeds synthetic 200 ms blocks into WakeWordDetector at real-time rate, no
+microphone needed, and reports per-check latency and process CPU usage for:
+  - the dedicated wake engine with the constrained short decode
+  - the query engine doing the same job (the old shared-model behaviour)
+
+Usage (from the repo root):
+    python bench/wake_check.py [--seconds 20] [--wake fw-tiny.en-wake] [--query fw-distil-medium.en-int8]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import numpy as np
+
+import asr
+from wake_word import WakeWordDetector
+
+
+def _feed(detector, level, seconds, stop):
+    rng = np.random.default_rng(1)
+    block = int(detector.sample_rate * detector.chunk_duration)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline and not stop.is_set():
+        chunk = (level * rng.standard_normal(block)).astype(np.float32).reshape(-1, 1)
+        detector._callback(chunk, block, None, None)
+        time.sleep(detector.chunk_duration)
+
+
+def run(engine_name, level, seconds, constrained):
+    engine = asr.acquire(engine_name)
+    engine.load()
+    latencies = []
+    transcribe = engine.transcribe
+
+    def timed(*args, **kwargs):
+        if not constrained:
+            kwargs.pop("hotwords", None)
+            kwargs.pop("max_new_tokens", None)
+        start = time.perf_counter()
+        try:
+            return transcribe(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    engine.transcribe = timed
+    detector = WakeWordDetector(engine=engine)
+    detector.energy_threshold = 0.002
+    detector.is_listening = True   # we drive the callback ourselves, no stream
+
+    stop = threading.Event()
+    feeder = threading.Thread(target=_feed, args=(detector, level, seconds, stop), daemon=True)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    feeder.start()
+    detector.listen_for_wake_word(timeout=seconds)
+    stop.set()
+    feeder.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    del engine.transcribe
+    asr.release(engine)
+    return latencies, 100.0 * cpu / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--wake", default=None, help="wake engine (default: auto-selected)")
+    parser.add_argument("--query", default="fw-distil-medium.en-int8")
+    args = parser.parse_args()
+
+    wake_name = args.wake or asr.select_engine("wake")
+    configs = [
+        (f"{wake_name} (constrained)", wake_name, True),
+        (f"{args.query} (shared, full decode)", args.query, False),
+    ]
+
+    print(f"\n{'engine':<44} {'scenario':<8} {'checks':>6} {'p50 ms':>8} {'p95 ms':>8} {'CPU %':>7}")
+    for label, name, constrained in configs:
+        for scenario, level in [("silent", 0.0005), ("lobby", 0.02)]:
+            lat, cpu = run(name, level, args.seconds, constrained)
+            if lat:
+                p50, p95 = np.percentile(lat, 50) * 1000, np.percentile(lat, 95) * 1000
+            else:
+                p50 = p95 = 0.0
+            print(f"{label:<44} {scenario:<8} {len(lat):>6} {p50:>8.1f} {p95:>8.1f} {cpu:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()